@@ -1,3 +1,334 @@
-from django.contrib import admin
+"""
+Admin de Django para los modelos de la API, pensado para tablas grandes.
 
-# Register your models here.
+- Ningún listado hace COUNT(*) sobre la tabla completa: show_full_result_count
+  está apagado y PaginadorEstimado usa la estimación del motor (o cuenta con
+  tope si hay filtros).
+- Los listados no hacen N+1: list_select_related en las FK que se muestran
+  (Clase ya trae los nombres en sus propias columnas).
+- Las FK se eligen con autocompletado en vez de un <select> con toda la tabla.
+- Los filtros laterales van sobre columnas indexadas.
+- Las acciones masivas son UPDATE por lotes; las de Clase además dejan su
+  ClaseEvento y todas invalidan la caché de respuestas.
+"""
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import cache_respuestas
+from .historial import actuando_como
+from .models import (
+    Clase,
+    ClaseEvento,
+    Cliente,
+    Profesional,
+    SystemConfig,
+    Trabajo,
+    UserProfile,
+    normalizar_busqueda,
+)
+
+
+LOTE_ACCIONES = 1000
+
+
+class PaginadorEstimado(Paginator):
+    """
+    Paginator sin COUNT(*) exacto en tablas grandes.
+
+    - Sin filtros: estimación del motor (pg_class.reltuples en PostgreSQL,
+      MAX(id) en SQLite/MySQL). Si la tabla es chica se cuenta de verdad.
+    - Con filtros: se cuenta hasta TOPE filas (COUNT sobre una subconsulta
+      con LIMIT).
+
+    Cuando el total es estimado o llegó al tope, el número de página no se
+    valida contra num_pages: page() trae una fila de más para saber si hay
+    otra página después, y si la página es la última (o se pasa del final,
+    ej. MAX(id) con filas borradas) corrige el total con lo que encontró.
+    Una página vacía más allá del final muestra la última de verdad, con un
+    COUNT exacto que solo se hace en ese caso.
+    """
+    TOPE = 10000
+
+    @cached_property
+    def _conteo(self):
+        """(total, si es exacto)"""
+        qs = self.object_list
+        if not qs.query.where:
+            estimado = self._estimar(qs)
+            if estimado is not None and estimado > self.TOPE:
+                return estimado, False
+        total = qs.order_by().values("pk")[: self.TOPE].count()
+        return total, total < self.TOPE
+
+    @cached_property
+    def count(self):
+        return self._conteo[0]
+
+    @property
+    def exacto(self):
+        return self._conteo[1]
+
+    def validate_number(self, number):
+        if self.exacto:
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages["invalid_page"])
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.exacto:
+            return super().page(number)
+
+        inicio = (number - 1) * self.per_page
+        filas = list(self.object_list[inicio:inicio + self.per_page + 1])
+        if not filas and number > 1:
+            # Más allá del final: se cuenta de verdad y se sirve la última
+            self._fijar_total(self.object_list.count())
+            return super().page(self.num_pages)
+
+        hay_mas = len(filas) > self.per_page
+        filas = filas[: self.per_page]
+        if hay_mas:
+            self._fijar_total(max(self.count, inicio + self.per_page + 1), exacto=False)
+        else:
+            # Última página: el total ya se sabe
+            self._fijar_total(inicio + len(filas))
+        return self._get_page(filas, number, self)
+
+    def _fijar_total(self, total, exacto=True):
+        self.__dict__["_conteo"] = (total, exacto)
+        self.__dict__.pop("count", None)
+        self.__dict__.pop("num_pages", None)
+
+    def _estimar(self, qs):
+        conexion = connections[qs.db]
+        if conexion.vendor == "postgresql":
+            with conexion.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [qs.model._meta.db_table],
+                )
+                fila = cursor.fetchone()
+            return fila[0] if fila and fila[0] >= 0 else None
+        # Con ids autoincrementales MAX(id) sale del índice de la PK
+        return qs.model._default_manager.using(qs.db).order_by("-pk").values_list("pk", flat=True).first()
+
+
+class ChangeListEstimado(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+        # PaginadorEstimado puede haber servido otra página (la última de
+        # verdad) que la pedida en ?p=
+        if self.multi_page and not (self.show_all and self.can_show_all):
+            self.page_num = min(self.page_num, self.paginator.num_pages)
+
+
+class AdminEscalable(admin.ModelAdmin):
+    paginator = PaginadorEstimado
+    show_full_result_count = False
+    list_per_page = 50
+
+    def get_changelist(self, request, **kwargs):
+        return ChangeListEstimado
+
+
+def _en_lotes(queryset, **cambios):
+    """UPDATE de `cambios` sobre `queryset` de a LOTE_ACCIONES filas; devuelve cuántas cambió."""
+    total = 0
+    ultimo = 0
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=ultimo).order_by("pk").values_list("pk", flat=True)[:LOTE_ACCIONES]
+        )
+        if not ids:
+            return total
+        total += queryset.model.objects.filter(pk__in=ids).update(**cambios)
+        ultimo = ids[-1]
+
+
+def _accion_estado_clase(estado, etiqueta):
+    @admin.action(description=f"Marcar como {etiqueta}", permissions=["change"])
+    def accion(modeladmin, request, queryset):
+        ahora = timezone.now()
+        total = 0
+        ultimo = 0
+        with transaction.atomic():
+            while True:
+                filas = list(
+                    queryset.filter(pk__gt=ultimo)
+                    .exclude(estado=estado)
+                    .order_by("pk")
+                    .values_list("pk", "estado", "profesional_asignado_id")[:LOTE_ACCIONES]
+                )
+                if not filas:
+                    break
+                ids = [pk for pk, _, _ in filas]
+                Clase.objects.filter(pk__in=ids).update(estado=estado, actualizado_en=ahora)
+                # update() no dispara post_save: el historial se escribe aquí
+                ClaseEvento.objects.bulk_create(
+                    ClaseEvento(
+                        clase_id=pk,
+                        estado_anterior=anterior,
+                        estado_nuevo=estado,
+                        profesional_id=profesional_id,
+                        actor_id=request.user.pk,
+                        ts=ahora,
+                    )
+                    for pk, anterior, profesional_id in filas
+                )
+                total += len(filas)
+                ultimo = ids[-1]
+            transaction.on_commit(lambda: cache_respuestas.invalidar("clases"))
+        modeladmin.message_user(request, f"{total} clases marcadas como {etiqueta}.", messages.SUCCESS)
+
+    accion.__name__ = f"marcar_{estado.lower()}"
+    return accion
+
+
+@admin.register(Clase)
+class ClaseAdmin(AdminEscalable):
+    # Nombres desnormalizados: el listado no necesita JOIN
+    list_display = (
+        "id", "titulo", "estado", "cliente_nombre", "profesional_nombre",
+        "solicitante_nombre", "fecha_solicitada", "creado_en",
+    )
+    list_filter = ("estado", "creado_en")
+    search_fields = ("=id", "titulo")
+    autocomplete_fields = ("cliente", "profesional_asignado", "solicitada_por")
+    readonly_fields = ("cliente_nombre", "profesional_nombre", "solicitante_nombre", "creado_en", "actualizado_en")
+    actions = [_accion_estado_clase(estado, etiqueta) for estado, etiqueta in Clase.ESTADOS]
+
+    def save_model(self, request, obj, form, change):
+        # El cambio de estado queda en el historial a nombre de quien lo hizo
+        with actuando_como(request.user):
+            super().save_model(request, obj, form, change)
+
+
+@admin.register(Cliente)
+class ClienteAdmin(AdminEscalable):
+    list_display = ("nombre", "rut", "email", "telefono", "usuario", "activo")
+    list_select_related = ("usuario",)
+    list_filter = ("activo",)
+    search_fields = ("nombre", "=rut")
+    autocomplete_fields = ("usuario",)
+    actions = ["activar", "desactivar"]
+
+    def _marcar_activo(self, request, queryset, activo):
+        total = _en_lotes(queryset.exclude(activo=activo), activo=activo)
+        cache_respuestas.invalidar("clientes")
+        self.message_user(request, f"{total} clientes actualizados.", messages.SUCCESS)
+
+    @admin.action(description="Activar", permissions=["change"])
+    def activar(self, request, queryset):
+        self._marcar_activo(request, queryset, True)
+
+    @admin.action(description="Desactivar", permissions=["change"])
+    def desactivar(self, request, queryset):
+        self._marcar_activo(request, queryset, False)
+
+
+@admin.register(Profesional)
+class ProfesionalAdmin(AdminEscalable):
+    list_display = ("__str__", "especialidad", "registro_profesional", "disponible")
+    list_select_related = ("user",)
+    list_filter = ("disponible", "especialidad")
+    search_fields = ("user__username", "user__first_name", "user__last_name", "especialidad")
+    autocomplete_fields = ("user",)
+    actions = ["marcar_disponible", "marcar_no_disponible"]
+
+    def get_queryset(self, request):
+        # __str__ usa el usuario (autocompletado y páginas de detalle)
+        return super().get_queryset(request).select_related("user")
+
+    def _marcar_disponible(self, request, queryset, disponible):
+        total = _en_lotes(queryset.exclude(disponible=disponible), disponible=disponible)
+        cache_respuestas.invalidar("profesionales")
+        self.message_user(request, f"{total} profesionales actualizados.", messages.SUCCESS)
+
+    @admin.action(description="Marcar como disponible", permissions=["change"])
+    def marcar_disponible(self, request, queryset):
+        self._marcar_disponible(request, queryset, True)
+
+    @admin.action(description="Marcar como no disponible", permissions=["change"])
+    def marcar_no_disponible(self, request, queryset):
+        self._marcar_disponible(request, queryset, False)
+
+
+@admin.register(UserProfile)
+class UserProfileAdmin(AdminEscalable):
+    list_display = ("user", "rol", "rut", "telefono")
+    list_select_related = ("user",)
+    list_filter = ("rol",)
+    # Una sola columna ya normalizada (ver UserProfile.busqueda)
+    search_fields = ("busqueda",)
+    autocomplete_fields = ("user",)
+    readonly_fields = ("busqueda",)
+
+    def get_search_results(self, request, queryset, search_term):
+        return super().get_search_results(request, queryset, normalizar_busqueda(search_term))
+
+
+@admin.register(SystemConfig)
+class SystemConfigAdmin(admin.ModelAdmin):
+    list_display = ("nombre_sistema", "razon_social", "email_contacto", "actualizado_en")
+
+    def has_add_permission(self, request):
+        # Un solo registro (ver api/config.py)
+        return not SystemConfig.objects.exists()
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ClaseEvento)
+class ClaseEventoAdmin(AdminEscalable):
+    """Solo lectura: el historial no se modifica (ver ClaseEvento)."""
+    list_display = ("ts", "clase_id", "estado_anterior", "estado_nuevo", "profesional_id", "actor")
+    list_select_related = ("actor",)
+    list_filter = ("ts",)
+    search_fields = ("=clase__id",)
+    # Mismo orden que el índice (ts, id)
+    ordering = ("-ts", "-id")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Trabajo)
+class TrabajoAdmin(AdminEscalable):
+    list_display = (
+        "id", "tarea", "estado", "prioridad", "ejecutar_desde", "intentos",
+        "tomado_por", "terminado_en",
+    )
+    list_filter = ("estado",)
+    search_fields = ("=id", "tarea")
+    readonly_fields = ("tomado_por", "tomado_en", "ultimo_error", "creado_en", "terminado_en")
+    actions = ["reintentar"]
+
+    @admin.action(description="Reintentar ahora", permissions=["change"])
+    def reintentar(self, request, queryset):
+        total = _en_lotes(
+            queryset.exclude(estado=Trabajo.EN_CURSO),
+            estado=Trabajo.PENDIENTE,
+            ejecutar_desde=timezone.now(),
+            intentos=0,
+            tomado_por="",
+            tomado_en=None,
+            terminado_en=None,
+        )
+        self.message_user(request, f"{total} trabajos vuelven a la cola.", messages.SUCCESS)
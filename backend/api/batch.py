@@ -0,0 +1,187 @@
+"""
+Ejecución de varios requests de la API en un solo viaje (POST /api/batch/).
+
+Cada sub-request se resuelve con el resolver de URLs de Django y se
+despacha en el mismo proceso a la vista correspondiente (ViewSets
+incluidos), como si hubiera llegado por HTTP, pero:
+
+- La autenticación se hace una sola vez (en el request del batch) y se
+  fuerza en los sub-requests, sin volver a validar el JWT.
+- Con "transaccion": true todo corre dentro de una transacción, que se
+  revierte si algún sub-request responde con status >= 400.
+- Si todos los sub-requests son GET (y no se pidió transacción) se ejecutan
+  en paralelo en un pool de hilos (BATCH_HILOS), cada uno con su conexión
+  a la BD (BATCH_HILOS=1 lo desactiva). Si hay escrituras se ejecutan en
+  orden, uno tras otro.
+
+Los sub-requests no pasan por los middlewares, pero sí por los permisos,
+el rate limiting y la idempotencia de cada vista. Dentro de una
+transacción (la del batch o la del perfil SQLite de producción) no usan la
+caché de respuestas: las invalidaciones recién se publican al confirmar, así
+que podrían leer una respuesta vieja o guardar una que después se revierte.
+
+Si una vista lanza una excepción, ese sub-request responde 500 y el resto
+del batch sigue (con "transaccion": true, se revierte todo).
+"""
+import io
+import json
+import logging
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections, transaction
+from django.urls import Resolver404, resolve
+
+from . import idempotencia, instrumentacion
+
+
+logger = logging.getLogger("api.batch")
+
+METODOS = {"GET", "POST", "PUT", "PATCH", "DELETE"}
+
+# Headers del batch que se copian a cada sub-request
+HEADERS_HEREDADOS = ("HTTP_ACCEPT_LANGUAGE", "HTTP_USER_AGENT", "HTTP_X_FORWARDED_FOR")
+
+_pool = None
+
+
+def _hilos():
+    return getattr(settings, "BATCH_HILOS", 4)
+
+
+def _obtener_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=_hilos(), thread_name_prefix="batch")
+    return _pool
+
+
+class ErrorBatch(ValueError):
+    pass
+
+
+def validar(operaciones):
+    """Valida la lista de sub-requests; devuelve [(metodo, ruta, cuerpo, headers)]."""
+    if not isinstance(operaciones, list) or not operaciones:
+        raise ErrorBatch("Se espera una lista no vacía de sub-requests.")
+    maximo = getattr(settings, "BATCH_MAXIMO", 50)
+    if len(operaciones) > maximo:
+        raise ErrorBatch(f"Máximo {maximo} sub-requests por batch.")
+
+    validadas = []
+    for i, op in enumerate(operaciones):
+        if not isinstance(op, dict):
+            raise ErrorBatch(f"Sub-request {i}: se espera un objeto.")
+        metodo = str(op.get("method", "GET")).upper()
+        ruta = op.get("path")
+        if metodo not in METODOS:
+            raise ErrorBatch(f"Sub-request {i}: método no permitido.")
+        if not isinstance(ruta, str) or not ruta.startswith("/api/"):
+            raise ErrorBatch(f"Sub-request {i}: path debe empezar con /api/.")
+        if urlsplit(ruta).path.rstrip("/") == "/api/batch":
+            raise ErrorBatch(f"Sub-request {i}: no se puede anidar /api/batch/.")
+        headers = op.get("headers") or {}
+        if not isinstance(headers, dict):
+            raise ErrorBatch(f"Sub-request {i}: headers debe ser un objeto.")
+        validadas.append((metodo, ruta, op.get("body"), headers))
+    return validadas
+
+
+def _sub_request(request, metodo, ruta, cuerpo, headers):
+    partes = urlsplit(ruta)
+    datos = b"" if cuerpo is None else json.dumps(cuerpo).encode()
+    environ = {
+        "REQUEST_METHOD": metodo,
+        "PATH_INFO": partes.path,
+        "SCRIPT_NAME": "",
+        "QUERY_STRING": partes.query,
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(datos)),
+        "SERVER_NAME": request.META.get("SERVER_NAME", "localhost"),
+        "SERVER_PORT": request.META.get("SERVER_PORT", "80"),
+        "REMOTE_ADDR": request.META.get("REMOTE_ADDR", ""),
+        "HTTP_HOST": request.get_host(),
+        "HTTP_ACCEPT": "application/json",
+        "wsgi.input": io.BytesIO(datos),
+        "wsgi.url_scheme": request.scheme,
+    }
+    for clave in HEADERS_HEREDADOS:
+        if clave in request.META:
+            environ[clave] = request.META[clave]
+    for nombre, valor in headers.items():
+        environ["HTTP_" + nombre.upper().replace("-", "_")] = str(valor)
+
+    sub = WSGIRequest(environ)
+    # Autenticación compartida: DRF usa este usuario sin pasar por el JWT
+    sub._force_auth_user = request.user
+    sub._force_auth_token = request.auth
+    # Ver api/cache_respuestas.py
+    sub.cache_respuestas = not transaction.get_connection().in_atomic_block
+    return sub
+
+
+def _cuerpo_respuesta(respuesta):
+    if hasattr(respuesta, "render") and not respuesta.is_rendered:
+        respuesta.render()
+    if not respuesta.content:
+        return None
+    if "json" in respuesta.get("Content-Type", ""):
+        return json.loads(respuesta.content)
+    return respuesta.content.decode(errors="replace")
+
+
+def ejecutar_uno(request, metodo, ruta, cuerpo, headers):
+    sub = _sub_request(request, metodo, ruta, cuerpo, headers)
+    try:
+        match = resolve(sub.path_info)
+    except Resolver404:
+        return {"status": 404, "body": {"detail": "No encontrado."}}
+    sub.resolver_match = match
+    # Dentro de una transacción, un savepoint por sub-request: si la vista
+    # falla, la transacción sigue usable para los demás
+    en_bloque = transaction.get_connection().in_atomic_block
+    try:
+        with transaction.atomic() if en_bloque else nullcontext():
+            respuesta = match.func(sub, *match.args, **match.kwargs)
+    except Exception:
+        logger.exception("Falló el sub-request %s %s", metodo, ruta)
+        return {"status": 500, "body": {"detail": "Error interno del servidor."}}
+    resultado = {"status": respuesta.status_code, "body": _cuerpo_respuesta(respuesta)}
+    for header in ("Location", "Retry-After", "Idempotent-Replayed"):
+        if respuesta.has_header(header):
+            resultado.setdefault("headers", {})[header] = respuesta[header]
+    return resultado
+
+
+def _en_hilo(request, operacion, medicion):
+    close_old_connections()
+    try:
+        with instrumentacion.en_hilo(medicion):
+            return ejecutar_uno(request, *operacion)
+    finally:
+        close_old_connections()
+
+
+def ejecutar(request, operaciones, en_transaccion=False):
+    """Ejecuta los sub-requests; devuelve (resultados, revertido)."""
+    if en_transaccion:
+        resultados = []
+        # Si se revierte, las Idempotency-Key de los sub-requests se sueltan
+        with idempotencia.atomic():
+            for operacion in operaciones:
+                resultado = ejecutar_uno(request, *operacion)
+                resultados.append(resultado)
+                if resultado["status"] >= 400:
+                    transaction.set_rollback(True)
+                    return resultados, True
+        return resultados, False
+
+    if _hilos() > 1 and len(operaciones) > 1 and all(op[0] == "GET" for op in operaciones):
+        pool = _obtener_pool()
+        medicion = instrumentacion.actual()
+        return list(pool.map(lambda op: _en_hilo(request, op, medicion), operaciones)), False
+
+    return [ejecutar_uno(request, *op) for op in operaciones], False
@@ -0,0 +1,404 @@
+"""
+Backend de caché de Django en memoria compartida entre procesos.
+
+Todos los workers de gunicorn del mismo host mapean el mismo archivo
+(LOCATION, idealmente en /dev/shm), así que lo que calcula uno lo
+aprovechan los demás sin Redis ni Memcached:
+
+    CACHES = {"default": {
+        "BACKEND": "api.cache_compartida.CacheMemoriaCompartida",
+        "LOCATION": "/dev/shm/nma_cache",
+        "OPTIONS": {"SLOTS": 4096, "TAMANO_SLOT": 65536, "VIAS": 8},
+    }}
+
+Formato del archivo:
+  cabecera (64 bytes): magia, SLOTS, VIAS, TAMANO_SLOT
+  SLOTS slots de TAMANO_SLOT bytes:
+      hash de la clave (uint64), expira (float64, 0 = nunca),
+      largo de los datos (uint32, 0 = libre), bit de referencia, manecilla
+      datos: largo de la clave (uint16) + clave + formato (1 byte: 0 pickle,
+      1 pickle comprimido con zlib) + valor
+
+Los slots se agrupan en conjuntos de VIAS slots: una clave solo puede vivir
+en el conjunto que le toca por hash, así que buscarla es recorrer VIAS
+cabeceras. Al llenarse un conjunto se expulsa con CLOCK (segunda
+oportunidad): cada lectura marca el bit de referencia y la manecilla del
+conjunto avanza limpiando bits hasta encontrar un slot sin marcar.
+
+Concurrencia: cada conjunto tiene un candado fcntl sobre un byte del
+archivo (entre procesos) más un threading.Lock (entre hilos del proceso,
+porque los candados fcntl son por proceso). clear() toma el archivo entero.
+
+Un valor que no cabe en un slot se guarda comprimido (zlib, nivel rápido):
+las respuestas JSON de los listados (api/cache_respuestas.py) se reducen
+varias veces y con el TAMANO_SLOT por defecto (64 KB) entran listados de
+varios cientos de KB. Si aun comprimido no cabe, no se guarda (set() no
+falla: la próxima lectura es un fallo de caché), se cuenta en
+nma_cache_compartida_descartes_total (por prefijo de la clave, ver
+/api/metrics/) y la primera vez por prefijo se avisa en el logger
+"api.cache". Si esos descartes son frecuentes, subir TAMANO_SLOT
+(DJANGO_CACHE_TAMANO_SLOT): el archivo ocupa SLOTS * TAMANO_SLOT, pero como
+se crea disperso solo ocupa memoria lo que se escribe.
+"""
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .metricas import contar
+
+
+logger = logging.getLogger("api.cache")
+
+MAGIA = b"NMACACH2"
+CABECERA = struct.Struct("<8sIII")
+TAMANO_CABECERA = 64
+# hash, expira, largo, bit de referencia, manecilla (solo en la vía 0)
+SLOT = struct.Struct("<QdIBB2x")
+LARGO_CLAVE = struct.Struct("<H")
+
+# Bandas de los candados de hilo: suficientes para que casi no compitan
+BANDAS = 64
+
+PICKLE = b"\x00"
+COMPRIMIDO = b"\x01"
+
+# Prefijos de clave ya avisados en el log (una vez por proceso)
+_avisados = set()
+
+
+class _Archivo:
+    """Mapeo del archivo compartido, único por proceso y LOCATION."""
+
+    def __init__(self, ruta, slots, vias, tamano_slot):
+        self.slots = slots - slots % vias
+        self.vias = vias
+        self.conjuntos = self.slots // vias
+        self.tamano_slot = tamano_slot
+        self.tamano = TAMANO_CABECERA + self.slots * tamano_slot
+
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self.fd = os.open(ruta, os.O_RDWR | os.O_CREAT, 0o600)
+        self.hilos = [threading.Lock() for _ in range(BANDAS)]
+        self.global_ = threading.Lock()
+
+        # Crear o reinicializar (si cambió la configuración) con el archivo
+        # entero bloqueado, para no pisar a otro proceso que arranca a la vez
+        fcntl.lockf(self.fd, fcntl.LOCK_EX)
+        try:
+            esperada = CABECERA.pack(MAGIA, self.slots, vias, tamano_slot)
+            actual = os.pread(self.fd, CABECERA.size, 0)
+            if actual != esperada or os.fstat(self.fd).st_size != self.tamano:
+                os.ftruncate(self.fd, 0)
+                os.ftruncate(self.fd, self.tamano)
+                os.pwrite(self.fd, esperada, 0)
+            self.mmap = mmap.mmap(self.fd, self.tamano)
+        finally:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN)
+
+    @contextmanager
+    def bloqueo(self, conjunto, exclusivo=True):
+        # Byte 0 reservado: clear() bloquea el archivo entero
+        with self.hilos[conjunto % BANDAS]:
+            modo = fcntl.LOCK_EX if exclusivo else fcntl.LOCK_SH
+            fcntl.lockf(self.fd, modo, 1, conjunto + 1)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, conjunto + 1)
+
+    @contextmanager
+    def bloqueo_total(self):
+        with self.global_:
+            for candado in self.hilos:
+                candado.acquire()
+            try:
+                fcntl.lockf(self.fd, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.lockf(self.fd, fcntl.LOCK_UN)
+            finally:
+                for candado in self.hilos:
+                    candado.release()
+
+    def desplazamiento(self, slot):
+        return TAMANO_CABECERA + slot * self.tamano_slot
+
+
+_archivos = {}
+_archivos_lock = threading.Lock()
+
+
+def _reiniciar_en_hijo():
+    # Los candados de hilo copiados en el fork pueden quedar tomados
+    global _archivos_lock
+    _archivos.clear()
+    _archivos_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reiniciar_en_hijo)
+
+
+def _abrir(ruta, slots, vias, tamano_slot):
+    archivo = _archivos.get(ruta)
+    if archivo is None:
+        with _archivos_lock:
+            archivo = _archivos.get(ruta)
+            if archivo is None:
+                archivo = _archivos[ruta] = _Archivo(ruta, slots, vias, tamano_slot)
+    return archivo
+
+
+class CacheMemoriaCompartida(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        opciones = params.get("OPTIONS", {})
+        self._ruta = location
+        self._slots = int(opciones.get("SLOTS", 4096))
+        self._vias = int(opciones.get("VIAS", 8))
+        self._tamano_slot = int(opciones.get("TAMANO_SLOT", 65536))
+
+    @property
+    def _archivo(self):
+        return _abrir(self._ruta, self._slots, self._vias, self._tamano_slot)
+
+    # --- Acceso a slots (siempre con el candado del conjunto tomado) ---
+
+    @staticmethod
+    def _hash(clave):
+        return int.from_bytes(hashlib.blake2b(clave, digest_size=8).digest(), "little")
+
+    def _buscar(self, archivo, conjunto, h, clave, ahora):
+        """Slot vigente con la clave, o None."""
+        m = archivo.mmap
+        for slot in range(conjunto * archivo.vias, (conjunto + 1) * archivo.vias):
+            inicio = archivo.desplazamiento(slot)
+            hash_slot, expira, largo, _, _ = SLOT.unpack_from(m, inicio)
+            if not largo or hash_slot != h:
+                continue
+            if expira and expira <= ahora:
+                return None
+            datos = inicio + SLOT.size
+            (largo_clave,) = LARGO_CLAVE.unpack_from(m, datos)
+            inicio_clave = datos + LARGO_CLAVE.size
+            if m[inicio_clave:inicio_clave + largo_clave] == clave:
+                return slot
+        return None
+
+    def _leer(self, archivo, slot):
+        m = archivo.mmap
+        inicio = archivo.desplazamiento(slot)
+        _, _, largo, _, _ = SLOT.unpack_from(m, inicio)
+        datos = inicio + SLOT.size
+        (largo_clave,) = LARGO_CLAVE.unpack_from(m, datos)
+        return m[datos + LARGO_CLAVE.size + largo_clave:datos + largo]
+
+    def _marcar(self, archivo, slot):
+        # Bit de referencia para CLOCK (offset 20 de la cabecera del slot)
+        archivo.mmap[archivo.desplazamiento(slot) + 20] = 1
+
+    def _elegir_slot(self, archivo, conjunto, ahora):
+        """Slot libre o expirado del conjunto; si no hay, víctima de CLOCK."""
+        m = archivo.mmap
+        primero = conjunto * archivo.vias
+        for slot in range(primero, primero + archivo.vias):
+            _, expira, largo, _, _ = SLOT.unpack_from(m, archivo.desplazamiento(slot))
+            if not largo or (expira and expira <= ahora):
+                return slot
+
+        cabecera = archivo.desplazamiento(primero)
+        mano = m[cabecera + 21] % archivo.vias
+        while True:
+            slot = primero + mano
+            referencia = archivo.desplazamiento(slot) + 20
+            mano = (mano + 1) % archivo.vias
+            if m[referencia]:
+                m[referencia] = 0
+                continue
+            m[cabecera + 21] = mano
+            return slot
+
+    def _escribir(self, archivo, slot, h, clave, valor, expira):
+        inicio = archivo.desplazamiento(slot)
+        datos = LARGO_CLAVE.pack(len(clave)) + clave + valor
+        m = archivo.mmap
+        mano = m[inicio + 21]
+        # Primero se libera el slot: un lector nunca ve datos a medio escribir
+        # con una cabecera válida (aunque además tiene el candado)
+        SLOT.pack_into(m, inicio, 0, 0.0, 0, 0, mano)
+        m[inicio + SLOT.size:inicio + SLOT.size + len(datos)] = datos
+        SLOT.pack_into(m, inicio, h, expira, len(datos), 1, mano)
+
+    def _liberar(self, archivo, slot):
+        inicio = archivo.desplazamiento(slot)
+        mano = archivo.mmap[inicio + 21]
+        SLOT.pack_into(archivo.mmap, inicio, 0, 0.0, 0, 0, mano)
+
+    def _preparar(self, key, version):
+        clave = self.make_and_validate_key(key, version=version).encode()
+        h = self._hash(clave)
+        archivo = self._archivo
+        return archivo, clave, h, h % archivo.conjuntos
+
+    def _cabe(self, archivo, clave, valor):
+        return SLOT.size + LARGO_CLAVE.size + len(clave) + len(valor) <= archivo.tamano_slot
+
+    def _codificar(self, archivo, key, clave, value):
+        """Bytes a guardar para `value`, o None si ni comprimido cabe en un slot."""
+        valor = PICKLE + pickle.dumps(value, self.pickle_protocol)
+        if self._cabe(archivo, clave, valor):
+            return valor
+        comprimido = COMPRIMIDO + zlib.compress(memoryview(valor)[1:], 1)
+        if self._cabe(archivo, clave, comprimido):
+            return comprimido
+        self._descartar(key, len(valor))
+        return None
+
+    @staticmethod
+    def _decodificar(valor):
+        if valor[:1] == COMPRIMIDO:
+            return pickle.loads(zlib.decompress(valor[1:]))
+        return pickle.loads(valor[1:])
+
+    def _descartar(self, key, largo):
+        # "api:resp:clases:..." -> "api:resp": acota las etiquetas de la métrica
+        prefijo = ":".join(str(key).split(":")[:2])
+        contar("nma_cache_compartida_descartes_total", prefijo=prefijo)
+        if prefijo not in _avisados:
+            _avisados.add(prefijo)
+            logger.warning(
+                "Valor de %s bytes no cabe en un slot de %s (clave %s...): no se guarda. "
+                "Ver DJANGO_CACHE_TAMANO_SLOT.",
+                largo, self._tamano_slot, prefijo,
+            )
+
+    def _expira(self, timeout):
+        expira = self.get_backend_timeout(timeout)
+        return 0.0 if expira is None else expira
+
+    def _guardar(self, archivo, conjunto, h, clave, valor, timeout, ahora):
+        slot = self._buscar(archivo, conjunto, h, clave, ahora)
+        if slot is None:
+            slot = self._elegir_slot(archivo, conjunto, ahora)
+        self._escribir(archivo, slot, h, clave, valor, self._expira(timeout))
+
+    # --- API de BaseCache ---
+
+    def get(self, key, default=None, version=None):
+        archivo, clave, h, conjunto = self._preparar(key, version)
+        with archivo.bloqueo(conjunto, exclusivo=False):
+            slot = self._buscar(archivo, conjunto, h, clave, time.time())
+            if slot is None:
+                return default
+            valor = self._leer(archivo, slot)
+            # Escribir un byte con candado compartido es inofensivo
+            self._marcar(archivo, slot)
+        return self._decodificar(valor)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        archivo, clave, h, conjunto = self._preparar(key, version)
+        valor = self._codificar(archivo, key, clave, value)
+        with archivo.bloqueo(conjunto):
+            if valor is None:
+                # No cabe: que no quede el valor anterior como vigente
+                slot = self._buscar(archivo, conjunto, h, clave, time.time())
+                if slot is not None:
+                    self._liberar(archivo, slot)
+                return
+            self._guardar(archivo, conjunto, h, clave, valor, timeout, time.time())
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        archivo, clave, h, conjunto = self._preparar(key, version)
+        valor = self._codificar(archivo, key, clave, value)
+        if valor is None:
+            return False
+        with archivo.bloqueo(conjunto):
+            ahora = time.time()
+            if self._buscar(archivo, conjunto, h, clave, ahora) is not None:
+                return False
+            self._guardar(archivo, conjunto, h, clave, valor, timeout, ahora)
+            return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        archivo, clave, h, conjunto = self._preparar(key, version)
+        with archivo.bloqueo(conjunto):
+            slot = self._buscar(archivo, conjunto, h, clave, time.time())
+            if slot is None:
+                return False
+            inicio = archivo.desplazamiento(slot)
+            # expira está en el offset 8 de la cabecera del slot
+            struct.pack_into("<d", archivo.mmap, inicio + 8, self._expira(timeout))
+            return True
+
+    def delete(self, key, version=None):
+        archivo, clave, h, conjunto = self._preparar(key, version)
+        with archivo.bloqueo(conjunto):
+            slot = self._buscar(archivo, conjunto, h, clave, time.time())
+            if slot is None:
+                return False
+            self._liberar(archivo, slot)
+            return True
+
+    def has_key(self, key, version=None):
+        archivo, clave, h, conjunto = self._preparar(key, version)
+        with archivo.bloqueo(conjunto, exclusivo=False):
+            return self._buscar(archivo, conjunto, h, clave, time.time()) is not None
+
+    def incr(self, key, delta=1, version=None):
+        # Atómico entre procesos: lectura y escritura con el mismo candado
+        archivo, clave, h, conjunto = self._preparar(key, version)
+        with archivo.bloqueo(conjunto):
+            ahora = time.time()
+            slot = self._buscar(archivo, conjunto, h, clave, ahora)
+            if slot is None:
+                raise ValueError("Key '%s' not found" % key)
+            nuevo = self._decodificar(self._leer(archivo, slot)) + delta
+            inicio = archivo.desplazamiento(slot)
+            _, expira, _, _, _ = SLOT.unpack_from(archivo.mmap, inicio)
+            valor = self._codificar(archivo, key, clave, nuevo)
+            self._escribir(archivo, slot, h, clave, valor, expira)
+        return nuevo
+
+    def actualizar(self, key, funcion, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Lee, transforma y guarda una clave de forma atómica entre procesos.
+        funcion(valor actual o None) -> (valor nuevo, resultado); devuelve
+        el resultado. Lo usa el rate limiting (api/throttling.py).
+        """
+        archivo, clave, h, conjunto = self._preparar(key, version)
+        with archivo.bloqueo(conjunto):
+            ahora = time.time()
+            slot = self._buscar(archivo, conjunto, h, clave, ahora)
+            actual = None if slot is None else self._decodificar(self._leer(archivo, slot))
+            nuevo, resultado = funcion(actual)
+            valor = self._codificar(archivo, key, clave, nuevo)
+            if valor is not None:
+                if slot is None:
+                    slot = self._elegir_slot(archivo, conjunto, ahora)
+                self._escribir(archivo, slot, h, clave, valor, self._expira(timeout))
+        return resultado
+
+    def clear(self):
+        archivo = self._archivo
+        with archivo.bloqueo_total():
+            vacio = SLOT.pack(0, 0.0, 0, 0, 0)
+            for slot in range(archivo.slots):
+                archivo.mmap[archivo.desplazamiento(slot):archivo.desplazamiento(slot) + SLOT.size] = vacio
+
+    def close(self, **kwargs):
+        # El mapeo se comparte entre hilos y requests: no se cierra
+        pass
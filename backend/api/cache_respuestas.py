@@ -0,0 +1,166 @@
+"""
+Caché de respuestas para las acciones list/retrieve de los ViewSets.
+
+La clave de cada respuesta incluye el "contador de generación" de los
+recursos de los que depende (ej. /api/clases/ muestra nombres de clientes,
+usuarios y profesionales). Cada post_save/post_delete de esos modelos
+reemplaza la generación (ver api/signals.py), así que las entradas viejas
+dejan de encontrarse sin tener que borrarlas: expiran solas por TTL.
+
+La clave también varía por path + query params, por formato de respuesta y
+por rol; para los roles con alcance restringido (ALCANCE en permissions.py)
+además por usuario, porque cada uno ve filas distintas.
+
+Se guarda el JSON ya renderizado, de modo que un acierto no toca la BD, ni
+los serializers, ni el renderer. Solo se cachean respuestas 200 de los
+formatos en FORMATOS (la API navegable incluye datos de la sesión). Los
+requests con `cache_respuestas = False` (sub-requests de un batch dentro de
+una transacción, ver api/batch.py) no leen ni guardan. Tampoco se guardan
+las respuestas leídas de una réplica: pueden ir atrasadas respecto de la
+generación vigente, y quedarían servidas como frescas hasta el TTL (ver
+api/replicas.py).
+
+Con LocMemCache cada worker tiene su propia caché y las invalidaciones no
+cruzan de proceso, por eso el TTL se limita a CACHE_RESPUESTAS_TTL_LOCAL.
+Con una caché compartida (archivo, memoria compartida, Redis...) vale
+CACHE_RESPUESTAS_TTL.
+
+Aciertos y fallos se cuentan en /api/metrics/ (nma_cache_respuestas_total).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+
+from .metricas import contar
+from .permissions import ALCANCE, rol_de
+from .replicas import leyo_de_replica
+
+
+# recurso -> recursos cuyos cambios alteran sus respuestas
+DEPENDENCIAS = {
+    "usuarios": ("usuarios",),
+    # PROFESIONAL ve los clientes de sus clases
+    "clientes": ("clientes", "clases"),
+    # nombre/email del usuario y carga de clases (?con_carga=1)
+    "profesionales": ("profesionales", "usuarios", "clases"),
+    "clases": ("clases", "clientes", "profesionales", "usuarios"),
+    # api/dashboard.py: me, config, clases y roster
+    "dashboard_admin": ("clases", "clientes", "profesionales", "usuarios", "config"),
+    "dashboard_profesional": ("clases", "clientes", "profesionales", "usuarios", "config"),
+    "dashboard_cliente": ("clases", "clientes", "profesionales", "usuarios", "config"),
+}
+
+PREFIJO = "api:resp:"
+
+# Formatos de respuesta cacheables (la clave incluye el media type)
+FORMATOS = ("json", "columnar")
+
+
+def _cache():
+    return caches[getattr(settings, "CACHE_RESPUESTAS_ALIAS", "default")]
+
+
+def activa():
+    return getattr(settings, "CACHE_RESPUESTAS_ACTIVA", True)
+
+
+def _ttl(cache):
+    ttl = getattr(settings, "CACHE_RESPUESTAS_TTL", 300)
+    if isinstance(cache, LocMemCache):
+        return min(ttl, getattr(settings, "CACHE_RESPUESTAS_TTL_LOCAL", 5))
+    return ttl
+
+
+def _clave_generacion(recurso):
+    return f"{PREFIJO}gen:{recurso}"
+
+
+def invalidar(*recursos):
+    """
+    Nueva generación para los recursos dados. Se usa un valor nuevo (no
+    incr) para que dos workers que invalidan a la vez no puedan dejar la
+    generación anterior en pie con backends sin incr atómico.
+    """
+    cache = _cache()
+    generacion = time.time_ns()
+    cache.set_many({_clave_generacion(r): generacion for r in recursos}, timeout=None)
+
+
+def _generaciones(cache, recurso):
+    dependencias = DEPENDENCIAS.get(recurso, (recurso,))
+    claves = [_clave_generacion(r) for r in dependencias]
+    encontradas = cache.get_many(claves)
+    faltantes = {c: time.time_ns() for c in claves if c not in encontradas}
+    if faltantes:
+        # Caché vacía o generación expulsada: cualquier valor nuevo sirve
+        cache.set_many(faltantes, timeout=None)
+        encontradas.update(faltantes)
+    return ".".join(str(encontradas[c]) for c in claves)
+
+
+def _clave(request, recurso, accion, generaciones, por_usuario):
+    rol = rol_de(request)
+    if por_usuario or rol in ALCANCE.get(recurso, {}):
+        quien = f"{rol}:{request.user.pk}"
+    else:
+        quien = rol
+    ruta = request.get_full_path()
+    formato = request.accepted_media_type
+    resumen = hashlib.sha1(f"{ruta}|{formato}".encode()).hexdigest()
+    return f"{PREFIJO}{recurso}:{accion}:{generaciones}:{quien}:{resumen}"
+
+
+class CacheRespuestasMixin:
+    """
+    Mixin para ViewSets con `recurso`: cachea list y retrieve.
+    Los permisos ya se chequearon en initial(), antes de llegar aquí.
+    Otras vistas pueden llamar a _respuesta_cacheada() desde su handler;
+    con `cache_por_usuario = True` cada usuario tiene su propia entrada.
+    """
+    cache_por_usuario = False
+
+    def list(self, request, *args, **kwargs):
+        return self._respuesta_cacheada(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._respuesta_cacheada(super().retrieve, request, *args, **kwargs)
+
+    def _respuesta_cacheada(self, accion, request, *args, **kwargs):
+        if (
+            not activa()
+            or not getattr(request, "cache_respuestas", True)
+            or getattr(request.accepted_renderer, "format", None) not in FORMATOS
+        ):
+            return accion(request, *args, **kwargs)
+
+        cache = _cache()
+        clave = _clave(
+            request,
+            self.recurso,
+            getattr(self, "action", None) or request.method.lower(),
+            _generaciones(cache, self.recurso),
+            self.cache_por_usuario,
+        )
+        guardada = cache.get(clave)
+        if guardada is not None:
+            contar("nma_cache_respuestas_total", recurso=self.recurso, resultado="hit")
+            contenido, tipo = guardada
+            respuesta = HttpResponse(contenido, content_type=tipo)
+            respuesta["X-Cache"] = "HIT"
+            return respuesta
+
+        contar("nma_cache_respuestas_total", recurso=self.recurso, resultado="miss")
+        respuesta = accion(request, *args, **kwargs)
+        if respuesta.status_code == 200 and not leyo_de_replica():
+            ttl = _ttl(cache)
+
+            def guardar(r):
+                cache.set(clave, (r.content, r["Content-Type"]), timeout=ttl)
+
+            respuesta.add_post_render_callback(guardar)
+        respuesta["X-Cache"] = "MISS"
+        return respuesta
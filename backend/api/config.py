@@ -0,0 +1,94 @@
+"""
+Acceso a la configuración global (SystemConfig) con memo por proceso.
+
+obtener_config() devuelve siempre el mismo objeto mientras siga vigente,
+sin tocar la base de datos. Cada SYSTEM_CONFIG_REVALIDAR_SEGUNDOS se
+comprueba si otro worker la modificó:
+
+- Con una caché compartida (Redis, Memcached, archivo, BD) se compara un
+  contador de versión guardado en la caché.
+- Con LocMemCache (propia de cada proceso) o DummyCache no hay nada
+  compartido, así que se compara `actualizado_en` contra la BD (una consulta por PK).
+
+Al guardar la configuración (signal post_save) el memo local se descarta
+al instante y se incrementa la versión compartida.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .models import SystemConfig
+
+
+CLAVE_VERSION = "api:systemconfig:version"
+
+# (config, version, actualizado_en, revalidado_en)
+_memo = None
+
+
+def _revalidar_cada():
+    return getattr(settings, "SYSTEM_CONFIG_REVALIDAR_SEGUNDOS", 5)
+
+
+def _cache_compartida():
+    # `cache` es un proxy: el isinstance tiene que ser sobre el backend real
+    return not isinstance(caches["default"], (LocMemCache, DummyCache))
+
+
+def _version_compartida():
+    if not _cache_compartida():
+        return None
+    return cache.get_or_set(CLAVE_VERSION, time.time_ns, timeout=None)
+
+
+def _cargar():
+    global _memo
+    version = _version_compartida()
+    config, _ = SystemConfig.objects.get_or_create(id=1)
+    _memo = (config, version, config.actualizado_en, time.monotonic())
+    return config
+
+
+def obtener_config():
+    """
+    Configuración global del sistema (el único registro de SystemConfig).
+    El objeto devuelto se comparte dentro del proceso: solo lectura.
+    """
+    global _memo
+    memo = _memo
+    if memo is None:
+        return _cargar()
+
+    config, version, actualizado_en, revalidado_en = memo
+    ahora = time.monotonic()
+    if ahora - revalidado_en < _revalidar_cada():
+        return config
+
+    if _cache_compartida():
+        vigente = _version_compartida() == version
+    else:
+        vigente = SystemConfig.objects.filter(
+            id=1, actualizado_en=actualizado_en
+        ).exists()
+
+    if not vigente:
+        return _cargar()
+
+    _memo = (config, version, actualizado_en, ahora)
+    return config
+
+
+def invalidar_config():
+    """Descarta el memo local y avisa al resto de los workers."""
+    global _memo
+    _memo = None
+    if _cache_compartida():
+        try:
+            cache.incr(CLAVE_VERSION)
+        except ValueError:
+            # La clave no existía (caché vacía o expulsada): un valor nuevo
+            # que no pueda coincidir con versiones anteriores
+            cache.set(CLAVE_VERSION, time.time_ns(), timeout=None)
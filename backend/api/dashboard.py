@@ -0,0 +1,92 @@
+"""
+Datos de arranque de cada página en una sola respuesta (GET /api/dashboard/<rol>/).
+
+Cada dashboard trae:
+- me:       el usuario autenticado (mismo formato que /api/auth/me/)
+- config:   configuración global (memo del proceso, sin consulta)
+- clases:   primera página (CLASES_POR_PAGINA) de las clases que ve el rol,
+            más recientes primero
+- conteos:  cantidad de clases por estado (una consulta agregada)
+- roster:   listas para los selects del rol (ADMIN: profesionales y
+            clientes; CLIENTE: sus empresas; PROFESIONAL: nada). Las del
+            ADMIN traen a lo más ROSTER_MAXIMO filas cada una; si quedaron
+            filas afuera, "completo" es false y el resto se pide paginado a
+            /api/profesionales/?page= y /api/clientes/?page=
+
+Las vistas (ver DashboardAdminView y compañía) lo cachean por usuario con
+la caché de respuestas, así que un dashboard repetido no toca la BD hasta
+que cambie alguno de los recursos de los que depende.
+"""
+from django.db.models import Count
+
+from .config import obtener_config
+from .models import Clase, Cliente, Profesional
+from .permissions import ADMIN, CLIENTE, filtrar_por_rol
+from .serializers import ClaseSerializer, SystemConfigSerializer, UserSerializer
+
+
+CLASES_POR_PAGINA = 50
+# El dashboard se cachea por usuario: no se guardan tablas completas
+ROSTER_MAXIMO = 200
+
+
+def _clases(request):
+    return filtrar_por_rol(Clase.objects.all(), request, "clases")
+
+
+def _conteos(qs):
+    conteos = {estado: 0 for estado, _ in Clase.ESTADOS}
+    for fila in qs.order_by().values("estado").annotate(total=Count("id")):
+        conteos[fila["estado"]] = fila["total"]
+    return conteos
+
+
+def _roster_admin():
+    profesionales = [
+        {
+            "id": p["id"],
+            "nombre": f"{p['user__first_name']} {p['user__last_name']}".strip()
+            or p["user__username"],
+            "especialidad": p["especialidad"],
+            "disponible": p["disponible"],
+        }
+        for p in Profesional.objects.order_by("user__first_name", "user__last_name", "id").values(
+            "id", "user__username", "user__first_name", "user__last_name",
+            "especialidad", "disponible",
+        )[:ROSTER_MAXIMO + 1]
+    ]
+    clientes = list(Cliente.objects.order_by("nombre", "id").values("id", "nombre")[:ROSTER_MAXIMO + 1])
+    # Una fila de más basta para saber si hay otras sin contar la tabla
+    completo = len(profesionales) <= ROSTER_MAXIMO and len(clientes) <= ROSTER_MAXIMO
+    return {
+        "profesionales": profesionales[:ROSTER_MAXIMO],
+        "clientes": clientes[:ROSTER_MAXIMO],
+        "completo": completo,
+    }
+
+
+def _roster_cliente(user):
+    return {"clientes": list(Cliente.objects.filter(usuario=user).order_by("nombre").values("id", "nombre"))}
+
+
+def armar(request, rol):
+    """Payload del dashboard de `rol` para el usuario del request."""
+    clases = _clases(request)
+    pagina = clases.order_by("-creado_en")[:CLASES_POR_PAGINA]
+
+    if rol == ADMIN:
+        roster = _roster_admin()
+    elif rol == CLIENTE:
+        roster = _roster_cliente(request.user)
+    else:
+        roster = {}
+
+    conteos = _conteos(clases)
+    return {
+        "me": UserSerializer(request.user).data,
+        "config": SystemConfigSerializer(obtener_config()).data,
+        "clases": ClaseSerializer(pagina, many=True).data,
+        "conteos": conteos,
+        "total_clases": sum(conteos.values()),
+        "roster": roster,
+    }
@@ -0,0 +1,228 @@
+"""
+Historial de estados de Clase (ClaseEvento).
+
+Cada vez que se guarda una Clase con un estado distinto al leído de la BD
+(o se crea), el signal post_save llama a registrar(). Por defecto el evento
+se inserta en la misma transacción que el cambio de estado: si uno se
+confirma, el otro también, y el historial sirve para probar quién cambió
+qué.
+
+Con HISTORIAL_DIFERIDO=True (opcional) el evento no se inserta en ese
+momento:
+
+1. Se agrega a la transacción en curso con transaction.on_commit(), así
+   solo quedan eventos de cambios que efectivamente se confirmaron.
+2. Tras el commit pasa a un buffer del proceso. Un hilo lo vacía con un
+   único bulk_create cada HISTORIAL_INTERVALO_MS, o antes si junta
+   HISTORIAL_LOTE eventos. El request no paga ningún INSERT.
+
+Si el INSERT falla, los eventos vuelven al buffer y el hilo reintenta con
+espera creciente. Los que llegan a HISTORIAL_MAX_INTENTOS se prueban uno por
+uno (un evento inválido no arrastra al resto del lote) y los que siguen
+fallando se descartan al logger "api.historial" como JSON, para poder
+recuperarlos. El buffer tiene tope (HISTORIAL_MAX_PENDIENTES): con la BD
+caída se descartan los más antiguos, también al log.
+
+Al salir el proceso se vacía lo pendiente, pero un kill -9 (o el SIGKILL de
+gunicorn a un worker colgado) pierde lo que haya en el buffer: el modo
+diferido cambia esa garantía por no pagar el INSERT en el request.
+
+El actor se toma de actuando_como(user), que envuelve los guardados hechos
+desde la API (ver ClaseViewSet).
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import ClaseEvento
+
+
+logger = logging.getLogger("api.historial")
+
+_actor = contextvars.ContextVar("historial_actor", default=None)
+
+_buffer = []
+_lock = threading.Lock()
+_hay_eventos = threading.Event()
+_hilo = None
+# Vaciados fallidos seguidos (alarga la espera del hilo)
+_fallos = 0
+
+# Espera máxima entre reintentos del hilo, en segundos
+ESPERA_MAXIMA = 30
+
+
+@contextmanager
+def actuando_como(user):
+    """Los cambios de estado dentro del bloque se atribuyen a `user`."""
+    token = _actor.set(user if user and user.is_authenticated else None)
+    try:
+        yield
+    finally:
+        _actor.reset(token)
+
+
+def _diferido():
+    return getattr(settings, "HISTORIAL_DIFERIDO", False)
+
+
+def registrar(clase, estado_anterior):
+    """Inserta el evento de `clase` (ya guardada), o en modo diferido lo agenda para después del commit."""
+    actor = _actor.get()
+    evento = ClaseEvento(
+        clase_id=clase.pk,
+        estado_anterior=estado_anterior or "",
+        estado_nuevo=clase.estado,
+        profesional_id=clase.profesional_asignado_id,
+        actor_id=actor.pk if actor else None,
+        ts=timezone.now(),
+    )
+    if not _diferido():
+        # En la transacción del cambio de estado: se confirman juntos
+        ClaseEvento.objects.bulk_create([evento])
+        return
+    transaction.on_commit(lambda: _agregar(evento))
+
+
+def _agregar(evento):
+    with _lock:
+        _buffer.append(evento)
+        descartados = _recortar()
+        cantidad = len(_buffer)
+    _descartar(descartados, "buffer lleno")
+    _asegurar_hilo()
+    if cantidad >= getattr(settings, "HISTORIAL_LOTE", 500):
+        _hay_eventos.set()
+
+
+def _recortar():
+    """Saca (y devuelve) los eventos más antiguos que excedan el tope. Con _lock tomado."""
+    global _buffer
+    exceso = len(_buffer) - getattr(settings, "HISTORIAL_MAX_PENDIENTES", 50000)
+    if exceso <= 0:
+        return []
+    descartados, _buffer = _buffer[:exceso], _buffer[exceso:]
+    return descartados
+
+
+def _descartar(eventos, motivo):
+    if not eventos:
+        return
+    logger.error(
+        "Historial: %s eventos de clases descartados (%s): %s",
+        len(eventos),
+        motivo,
+        json.dumps([
+            {
+                "clase_id": e.clase_id,
+                "estado_anterior": e.estado_anterior,
+                "estado_nuevo": e.estado_nuevo,
+                "profesional_id": e.profesional_id,
+                "actor_id": e.actor_id,
+                "ts": e.ts.isoformat(),
+            }
+            for e in eventos
+        ]),
+    )
+
+
+def _ultimo_intento(eventos):
+    """Inserta uno por uno; descarta al log los que fallan. Devuelve cuántos guardó."""
+    fallidos = []
+    for evento in eventos:
+        try:
+            ClaseEvento.objects.bulk_create([evento])
+        except Exception:
+            evento.pk = None
+            fallidos.append(evento)
+    _descartar(fallidos, "sin guardar tras los reintentos")
+    return len(eventos) - len(fallidos)
+
+
+def vaciar():
+    """
+    Inserta ya todo lo pendiente de este proceso (un bulk_create) y devuelve
+    cuántos eventos guardó. No lanza excepciones: lo que falla vuelve al
+    buffer o, agotados los intentos, se descarta al log.
+    """
+    global _buffer, _fallos
+    with _lock:
+        pendientes, _buffer = _buffer, []
+    if not pendientes:
+        return 0
+    try:
+        ClaseEvento.objects.bulk_create(pendientes, batch_size=500)
+    except Exception:
+        logger.exception("No se pudieron guardar %s eventos de clases", len(pendientes))
+        _fallos += 1
+        maximo = getattr(settings, "HISTORIAL_MAX_INTENTOS", 10)
+        reintentar, agotados = [], []
+        for evento in pendientes:
+            # El lote se revirtió entero: las pk asignadas no existen
+            evento.pk = None
+            evento._intentos = getattr(evento, "_intentos", 0) + 1
+            (agotados if evento._intentos >= maximo else reintentar).append(evento)
+        guardados = _ultimo_intento(agotados)
+        with _lock:
+            _buffer = reintentar + _buffer
+            descartados = _recortar()
+        _descartar(descartados, "buffer lleno")
+        return guardados
+    _fallos = 0
+    return len(pendientes)
+
+
+def _bucle():
+    intervalo = getattr(settings, "HISTORIAL_INTERVALO_MS", 200) / 1000
+    while True:
+        # Tras fallos seguidos se espera más: no se martilla una BD caída
+        _hay_eventos.wait(min(intervalo * 2 ** _fallos, ESPERA_MAXIMA))
+        _hay_eventos.clear()
+        try:
+            vaciar()
+        except Exception:
+            logger.exception("Error inesperado en el hilo del historial")
+        finally:
+            close_old_connections()
+
+
+def _asegurar_hilo():
+    global _hilo
+    if _hilo is not None:
+        return
+    with _lock:
+        if _hilo is None:
+            _hilo = threading.Thread(target=_bucle, name="historial-clases", daemon=True)
+            _hilo.start()
+
+
+def _al_salir():
+    try:
+        vaciar()
+    except Exception:
+        logger.exception("No se pudo vaciar el historial al salir")
+    # Lo que no se pudo guardar no tiene otra oportunidad
+    with _lock:
+        pendientes = list(_buffer)
+    _descartar(pendientes, "fin del proceso")
+
+
+def _reiniciar_en_hijo():
+    # El hilo no sobrevive al fork y el buffer del padre no es del hijo
+    global _hilo, _buffer, _lock, _fallos
+    _hilo = None
+    _buffer = []
+    _lock = threading.Lock()
+    _fallos = 0
+
+
+atexit.register(_al_salir)
+os.register_at_fork(after_in_child=_reiniciar_en_hijo)
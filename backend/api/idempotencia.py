@@ -0,0 +1,221 @@
+"""
+Soporte para el header Idempotency-Key en acciones POST.
+
+    @idempotente
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+La primera vez que llega una clave se ejecuta la vista y su respuesta se
+guarda en la caché IDEMPOTENCIA_CACHE_ALIAS por IDEMPOTENCIA_TTL_SEGUNDOS:
+en la clave, una marca chica de "ya ejecutado" (status y Location), y
+aparte el cuerpo ya renderizado con su content type. Los reintentos con la
+misma clave reciben esa respuesta sin volver a ejecutar la vista y con el
+header Idempotent-Replayed: true. Si el cuerpo no entró en la caché (ej.
+más grande que un slot de CacheMemoriaCompartida) la marca sigue ahí: el
+reintento recibe el status, el Location y un detalle, pero no se ejecuta
+dos veces.
+
+- Duplicados concurrentes: el primero toma la clave con cache.add(); los
+  demás esperan (hasta IDEMPOTENCIA_ESPERA_SEGUNDOS) a que termine y
+  devuelven su respuesta. Si se agota la espera: 409.
+- Misma clave con otro cuerpo: 422. Los multipart se comparan por sus
+  campos y el contenido de sus archivos (el boundary cambia en cada envío).
+- Respuestas 5xx o excepciones no se guardan: el reintento vuelve a ejecutar.
+- Dentro de una transacción la respuesta se guarda recién al confirmarse
+  (transaction.on_commit). Si se revierte, la clave se suelta cuando la
+  transacción la abrió atomic() de este módulo (batch, SQLite en modo
+  producción); si no, queda tomada hasta que vence IDEMPOTENCIA_ESPERA_SEGUNDOS.
+- La clave se separa por usuario (o anónimo) y ruta.
+
+Para que los duplicados que caen en distintos workers se vean entre sí la
+caché tiene que ser compartida (DJANGO_CACHE_BACKEND=compartida o archivo);
+con LocMemCache solo se deduplican dentro de cada worker.
+"""
+import contextvars
+import functools
+import hashlib
+import json
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import RequestDataTooBig
+from django.db import transaction
+from django.http import HttpResponse
+from django.http.request import RawPostDataException
+from rest_framework.response import Response
+
+
+HEADER = "HTTP_IDEMPOTENCY_KEY"
+LARGO_MAXIMO = 255
+
+EN_CURSO = "en_curso"
+LISTO = "listo"
+# Sufijo de la clave donde va el cuerpo de la respuesta
+RESPUESTA = ":respuesta"
+
+# Claves tomadas dentro del atomic() en curso
+_tomadas = contextvars.ContextVar("idempotencia_tomadas", default=None)
+
+
+def _cache():
+    return caches[getattr(settings, "IDEMPOTENCIA_CACHE_ALIAS", "default")]
+
+
+def _huella(request):
+    """Hash del cuerpo del request, para detectar una clave reutilizada."""
+    if not request.content_type.startswith("multipart/"):
+        try:
+            return hashlib.sha256(request._request.body).hexdigest()
+        except (RawPostDataException, RequestDataTooBig):
+            # Ya consumido al parsear, o más grande que
+            # DATA_UPLOAD_MAX_MEMORY_SIZE: se usa lo parseado
+            pass
+
+    huella = hashlib.sha256()
+    datos = request.data
+    if not hasattr(datos, "lists"):
+        huella.update(json.dumps(datos, sort_keys=True, default=str).encode())
+        return huella.hexdigest()
+    for campo, valores in sorted(datos.lists()):
+        for valor in valores:
+            huella.update(json.dumps(campo).encode())
+            if hasattr(valor, "chunks"):
+                # Archivo subido: por contenido, de a bloques
+                huella.update(json.dumps(["archivo", valor.name, valor.size]).encode())
+                for bloque in valor.chunks():
+                    huella.update(bloque)
+                valor.seek(0)
+            else:
+                huella.update(json.dumps(str(valor)).encode())
+    return huella.hexdigest()
+
+
+@contextmanager
+def atomic():
+    """
+    transaction.atomic() que, si se revierte, suelta las Idempotency-Key que
+    tomaron las vistas de adentro: su respuesta nunca se guardó (ver
+    idempotente) y el reintento tiene que volver a ejecutar.
+    """
+    claves = []
+    token = _tomadas.set(claves)
+    revertida = True
+    try:
+        with transaction.atomic():
+            yield
+            revertida = transaction.get_rollback()
+    finally:
+        _tomadas.reset(token)
+        if revertida:
+            for clave in claves:
+                _cache().delete(clave)
+
+
+def _tomar(cache, clave, huella, espera):
+    if not cache.add(clave, (EN_CURSO, huella), timeout=espera):
+        return False
+    tomadas = _tomadas.get()
+    if tomadas is not None:
+        tomadas.append(clave)
+    return True
+
+
+def _error(status, detalle):
+    return Response({"detail": detalle}, status=status)
+
+
+def _repetir(cache, clave, guardado):
+    _, _, status, ubicacion = guardado
+    cuerpo = cache.get(clave + RESPUESTA)
+    if cuerpo is None:
+        respuesta = HttpResponse(
+            json.dumps({"detail": "Ya se ejecutó con esta Idempotency-Key; la respuesta no se conservó."}),
+            status=status,
+            content_type="application/json",
+        )
+    else:
+        contenido, tipo = cuerpo
+        respuesta = HttpResponse(contenido, status=status, content_type=tipo)
+    if ubicacion:
+        respuesta["Location"] = ubicacion
+    respuesta["Idempotent-Replayed"] = "true"
+    return respuesta
+
+
+def idempotente(handler):
+    """Decorador para handlers de vistas DRF (create, post, acciones)."""
+
+    @functools.wraps(handler)
+    def envoltura(self, request, *args, **kwargs):
+        clave_cliente = request.META.get(HEADER)
+        if not clave_cliente:
+            return handler(self, request, *args, **kwargs)
+        if len(clave_cliente) > LARGO_MAXIMO:
+            return _error(400, f"Idempotency-Key no puede superar {LARGO_MAXIMO} caracteres.")
+
+        user = request.user
+        quien = f"u{user.pk}" if user and user.is_authenticated else "anon"
+        resumen = hashlib.sha1(clave_cliente.encode()).hexdigest()
+        clave = f"api:idem:{quien}:{request.path}:{resumen}"
+        huella = _huella(request)
+        cache = _cache()
+        espera = getattr(settings, "IDEMPOTENCIA_ESPERA_SEGUNDOS", 30)
+
+        if not _tomar(cache, clave, huella, espera):
+            # Otro request ya tiene (o tuvo) esta clave
+            limite = time.monotonic() + espera
+            pausa = 0.02
+            while True:
+                guardado = cache.get(clave)
+                if guardado is None:
+                    # El primero falló y liberó la clave: tomamos su lugar
+                    if _tomar(cache, clave, huella, espera):
+                        break
+                    continue
+                if guardado[1] != huella:
+                    return _error(
+                        422, "Idempotency-Key ya usada con un cuerpo distinto."
+                    )
+                if guardado[0] == LISTO:
+                    return _repetir(cache, clave, guardado)
+                if time.monotonic() >= limite:
+                    return _error(
+                        409, "Hay un request en curso con esta Idempotency-Key."
+                    )
+                time.sleep(pausa)
+                pausa = min(pausa * 2, 0.5)
+
+        try:
+            respuesta = handler(self, request, *args, **kwargs)
+        except BaseException:
+            cache.delete(clave)
+            raise
+
+        if respuesta.status_code >= 500:
+            cache.delete(clave)
+            return respuesta
+
+        ttl = getattr(settings, "IDEMPOTENCIA_TTL_SEGUNDOS", 86400)
+
+        def guardar(r):
+            marca = (LISTO, huella, r.status_code, r.get("Location"))
+            cuerpo = (r.content, r["Content-Type"])
+
+            def escribir():
+                # Primero el cuerpo: si no entra en la caché solo se pierde
+                # él, y la marca reemplaza a la de EN_CURSO sin dejar hueco
+                cache.set(clave + RESPUESTA, cuerpo, timeout=ttl)
+                cache.set(clave, marca, timeout=ttl)
+
+            # Fuera de una transacción on_commit ejecuta en el acto
+            transaction.on_commit(escribir)
+
+        if hasattr(respuesta, "add_post_render_callback") and not respuesta.is_rendered:
+            respuesta.add_post_render_callback(guardar)
+        else:
+            guardar(respuesta)
+        return respuesta
+
+    return envoltura
@@ -0,0 +1,255 @@
+"""
+Instrumentación por request (INSTRUMENTACION_ACTIVA=True).
+
+Para cada request mide:
+- db:     cantidad y tiempo de las consultas SQL (connection.execute_wrapper)
+- ser:    tiempo de `.data` en los serializers de la API (SerializacionMedida)
+- render: tiempo del renderer JSON (ver api/renderers.py)
+- total:  tiempo total dentro del middleware
+
+y lo devuelve en el header `Server-Timing` (visible en las DevTools del
+navegador). Una fracción de los requests (INSTRUMENTACION_MUESTREO) se
+registra como JSON en el logger "api.rendimiento", y toda consulta más lenta
+que SQL_LENTO_UMBRAL_MS va al logger "api.sql_lento" junto con la vista y
+la acción que la originó.
+
+Dos caminos corren fuera del middleware y se miden aparte:
+- StreamingHttpResponse (api/streaming.py): las consultas del cuerpo
+  corren después de enviar los headers, así que no entran en
+  Server-Timing; sí van al log de SQL lento y al registro muestreado, que
+  en ese caso se escribe al terminar el cuerpo.
+- Hilos auxiliares (los GET en paralelo de api/batch.py): en_hilo() mide
+  las consultas de cada hilo y las suma al request que lo lanzó. El "db"
+  de Server-Timing es entonces la suma de los hilos, no tiempo de reloj.
+
+Con la instrumentación apagada el middleware solo llama a la vista: no se
+instala el execute_wrapper ni se crea ningún objeto por consulta.
+"""
+import contextvars
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.serializers import ListSerializer
+
+
+logger = logging.getLogger("api.rendimiento")
+logger_sql = logging.getLogger("api.sql_lento")
+
+_medicion_actual = contextvars.ContextVar("medicion_actual", default=None)
+
+# Para sumar las mediciones de los hilos auxiliares (ver en_hilo)
+_lock_suma = threading.Lock()
+
+
+class Medicion:
+    __slots__ = (
+        "consultas", "sql", "ser", "render", "vista", "accion",
+        "umbral_sql", "en_serializer",
+    )
+
+    def __init__(self, umbral_sql):
+        self.consultas = 0
+        self.sql = 0.0
+        self.ser = 0.0
+        self.render = 0.0
+        self.vista = None
+        self.accion = None
+        self.umbral_sql = umbral_sql
+        self.en_serializer = False
+
+    def __call__(self, execute, sql, params, many, context):
+        """execute_wrapper: se llama una vez por consulta SQL."""
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.consultas += 1
+            self.sql += duracion
+            if duracion >= self.umbral_sql:
+                logger_sql.warning(json.dumps({
+                    "ms": round(duracion * 1000, 2),
+                    "vista": self.vista,
+                    "accion": self.accion,
+                    "alias": context["connection"].alias,
+                    "sql": sql[:2000],
+                }, ensure_ascii=False))
+
+
+def activa():
+    return getattr(settings, "INSTRUMENTACION_ACTIVA", False)
+
+
+def actual():
+    """Medición del request en curso (None sin instrumentación)."""
+    return _medicion_actual.get()
+
+
+@contextmanager
+def _consultas_medidas(medicion):
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(medicion))
+        yield
+
+
+@contextmanager
+def en_hilo(medicion):
+    """
+    Mide lo que corre en un hilo auxiliar y lo suma a `medicion` (la de
+    actual() en el hilo que lo lanzó). Las conexiones y el contextvar son
+    propios de cada hilo: sin esto sus consultas no se verían.
+    """
+    if medicion is None:
+        yield
+        return
+    propia = Medicion(medicion.umbral_sql)
+    propia.vista, propia.accion = medicion.vista, medicion.accion
+    token = _medicion_actual.set(propia)
+    try:
+        with _consultas_medidas(propia):
+            yield
+    finally:
+        _medicion_actual.reset(token)
+        with _lock_suma:
+            medicion.consultas += propia.consultas
+            medicion.sql += propia.sql
+            medicion.ser += propia.ser
+            medicion.render += propia.render
+
+
+@contextmanager
+def medir(fase):
+    """Suma el tiempo del bloque a la fase ("ser" o "render") del request actual."""
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(medicion, fase, getattr(medicion, fase) + time.perf_counter() - inicio)
+
+
+@contextmanager
+def _medir_serializacion():
+    # Solo la llamada externa: un .data dentro de otro no se cuenta dos veces
+    medicion = _medicion_actual.get()
+    if medicion is None or medicion.en_serializer:
+        yield
+        return
+    medicion.en_serializer = True
+    try:
+        with medir("ser"):
+            yield
+    finally:
+        medicion.en_serializer = False
+
+
+class ListSerializerMedido(ListSerializer):
+    @property
+    def data(self):
+        with _medir_serializacion():
+            return super().data
+
+
+class SerializacionMedida:
+    """
+    Mixin para los serializers de api/serializers.py: el tiempo de `.data`
+    (también con many=True) se suma a la fase "ser" del request actual.
+    """
+
+    @property
+    def data(self):
+        with _medir_serializacion():
+            return super().data
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        lista = super().many_init(*args, **kwargs)
+        # Sin list_serializer_class propio: la lista por defecto, medida
+        if type(lista) is ListSerializer:
+            lista.__class__ = ListSerializerMedido
+        return lista
+
+
+class InstrumentacionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.activa = activa()
+        self.muestreo = getattr(settings, "INSTRUMENTACION_MUESTREO", 0.01)
+        self.umbral_sql = getattr(settings, "SQL_LENTO_UMBRAL_MS", 200) / 1000
+
+    def __call__(self, request):
+        if not self.activa:
+            return self.get_response(request)
+
+        medicion = Medicion(self.umbral_sql)
+        token = _medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            with _consultas_medidas(medicion):
+                response = self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        total = time.perf_counter() - inicio
+
+        response["Server-Timing"] = (
+            f'db;dur={medicion.sql * 1000:.1f};desc="{medicion.consultas} consultas", '
+            f"ser;dur={medicion.ser * 1000:.1f}, "
+            f"render;dur={medicion.render * 1000:.1f}, "
+            f"total;dur={total * 1000:.1f}"
+        )
+
+        if response.streaming:
+            response.streaming_content = self._medir_cuerpo(
+                response.streaming_content, medicion, request, response, inicio
+            )
+        else:
+            self._registrar(request, response, medicion, total)
+        return response
+
+    def _medir_cuerpo(self, contenido, medicion, request, response, inicio):
+        # Corre mientras el servidor manda el cuerpo, ya fuera de __call__
+        try:
+            with _consultas_medidas(medicion):
+                yield from contenido
+        finally:
+            self._registrar(request, response, medicion, time.perf_counter() - inicio)
+
+    def _registrar(self, request, response, medicion, total):
+        if not self.muestreo or random.random() >= self.muestreo:
+            return
+        logger.info(json.dumps({
+            "metodo": request.method,
+            "ruta": request.path,
+            "vista": medicion.vista,
+            "accion": medicion.accion,
+            "status": response.status_code,
+            "consultas": medicion.consultas,
+            "db_ms": round(medicion.sql * 1000, 2),
+            "ser_ms": round(medicion.ser * 1000, 2),
+            "render_ms": round(medicion.render * 1000, 2),
+            "total_ms": round(total * 1000, 2),
+        }, ensure_ascii=False))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        medicion = _medicion_actual.get()
+        if medicion is None:
+            return None
+        # ViewSets: la clase y el mapa método -> acción vienen en la función
+        clase = getattr(view_func, "cls", None)
+        medicion.vista = clase.__name__ if clase else view_func.__name__
+        acciones = getattr(view_func, "actions", None)
+        if acciones:
+            medicion.accion = acciones.get(request.method.lower())
+        else:
+            medicion.accion = request.method.lower()
+        return None
@@ -0,0 +1,259 @@
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from .bench_sqlite import _percentiles, _preparar_entorno
+
+
+# Payloads de escritura por recurso del router. `n` hace únicos los campos
+# que lo necesitan. Recursos sin entrada en CREAR/ACTUALIZAR no se escriben
+# (usuarios: el username es read-only en UserAdminSerializer).
+CREAR = {
+    "clientes": lambda n, ids: {"nombre": f"Bench {n}", "rut": f"bench-api-{n}"},
+    "profesionales": lambda n, ids: {
+        "username": f"bench_prof_{n}",
+        "password": "bench",
+        "first_name": "Bench",
+        "last_name": f"Profesional {n}",
+        "email": f"bench_prof_{n}@example.com",
+        "especialidad": "Ergonomía",
+    },
+    "clases": lambda n, ids: {
+        "titulo": f"Bench {n}",
+        "descripcion": "bench_api",
+        "cliente": ids["clientes"],
+    },
+}
+ACTUALIZAR = {
+    "usuarios": lambda n: {"first_name": f"Bench {n}"},
+    "clientes": lambda n: {"telefono": f"{n}"},
+    "profesionales": lambda n: {"disponible": bool(n % 2)},
+    "clases": lambda n: {"modalidad": "Online" if n % 2 else "Presencial"},
+}
+
+
+def _volumenes(clases):
+    """Cantidades de cada modelo para un tamaño dado (en clases)."""
+    return {
+        "clases": clases,
+        "clientes": max(10, clases // 100),
+        "usuarios": max(20, clases // 50),
+        "profesionales": max(5, clases // 500),
+    }
+
+
+def _casos(client, ids, contador):
+    """(nombre, función que hace el request y devuelve el status esperado)."""
+    from core.urls import router
+
+    casos = [
+        ("token_obtain_pair", "post", "/api/token/", lambda: {"username": "bench", "password": "bench"}, 200),
+        ("auth_me", "get", "/api/auth/me/", None, 200),
+        ("system_config", "get", "/api/config/", None, 200),
+    ]
+    for prefijo, _, basename in router.registry:
+        base = f"/api/{prefijo}/"
+        detalle = f"{base}{ids[basename]}/"
+        casos.append((f"{basename}-list", "get", base, None, 200))
+        casos.append((f"{basename}-retrieve", "get", detalle, None, 200))
+        if basename in CREAR:
+            casos.append((
+                f"{basename}-create", "post", base,
+                lambda b=basename: CREAR[b](next(contador), ids), 201,
+            ))
+        if basename in ACTUALIZAR:
+            casos.append((
+                f"{basename}-partial_update", "patch", detalle,
+                lambda b=basename: ACTUALIZAR[b](next(contador)), 200,
+            ))
+
+    resultado = []
+    for nombre, metodo, url, payload, esperado in casos:
+        def hacer(metodo=metodo, url=url, payload=payload):
+            datos = payload() if payload else None
+            return getattr(client, metodo)(url, datos, content_type="application/json")
+        resultado.append((nombre, hacer, esperado))
+    return resultado
+
+
+def _medir_tamano(ruta_bd, clases, iteraciones, semilla):
+    _preparar_entorno(ruta_bd, "defecto")
+
+    import itertools
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from api.models import Clase, Cliente, Profesional
+
+    call_command("migrate", verbosity=0)
+    inicio = time.perf_counter()
+    call_command("seed_fake_data", semilla=semilla, verbosity=0, **_volumenes(clases))
+    segundos_seed = time.perf_counter() - inicio
+
+    user = User.objects.create_superuser("bench", "bench@example.com", "bench")
+    token = str(RefreshToken.for_user(user).access_token)
+    client = Client(raise_request_exception=False, HTTP_AUTHORIZATION=f"Bearer {token}")
+    ids = {
+        "usuarios": User.objects.filter(is_staff=False).values_list("pk", flat=True).first(),
+        "clientes": Cliente.objects.values_list("pk", flat=True).first(),
+        "profesionales": Profesional.objects.values_list("pk", flat=True).first(),
+        "clases": Clase.objects.values_list("pk", flat=True).first(),
+    }
+
+    resultados = {}
+    for nombre, hacer, esperado in _casos(client, ids, itertools.count()):
+        # Calentamiento: compila consultas, llena caches de config y permisos
+        hacer()
+
+        tiempos, consultas, errores = [], [], 0
+        for _ in range(iteraciones):
+            with CaptureQueriesContext(connection) as capturadas:
+                t0 = time.perf_counter()
+                respuesta = hacer()
+                tiempos.append(time.perf_counter() - t0)
+            consultas.append(len(capturadas))
+            if respuesta.status_code != esperado:
+                errores += 1
+
+        # La memoria se mide aparte: tracemalloc distorsiona la latencia
+        tracemalloc.start()
+        respuesta = hacer()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        resultados[nombre] = {
+            **_percentiles(tiempos),
+            "consultas": max(consultas),
+            "memoria_kib": round(pico / 1024, 1),
+            "bytes_respuesta": len(respuesta.content),
+            "errores": errores,
+        }
+
+    return {"seed_s": round(segundos_seed, 2), "endpoints": resultados}
+
+
+def _git(*args):
+    try:
+        return subprocess.run(
+            ["git", *args], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _variacion(actual, previo):
+    if not previo or actual is None:
+        return None
+    return (actual - previo) / previo * 100
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de todos los endpoints del router (list/retrieve/create/"
+        "partial_update) más token, me y config, sobre BDs SQLite temporales "
+        "generadas con seed_fake_data. Reporta p50/p95/p99, consultas por "
+        "request y pico de memoria, y puede guardar/comparar resultados en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tamanos",
+            default="1000,10000",
+            help="Cantidades de clases separadas por coma (ej. 1000,10000,100000).",
+        )
+        parser.add_argument("--iteraciones", type=int, default=20)
+        parser.add_argument("--semilla", type=int, default=1)
+        parser.add_argument("--salida", help="Guarda los resultados en este JSON.")
+        parser.add_argument(
+            "--comparar",
+            help="JSON de una corrida anterior (otro commit) para comparar.",
+        )
+        parser.add_argument(
+            "--umbral",
+            type=float,
+            default=10.0,
+            help="%% de empeoramiento de p50/p95 que se marca como regresión.",
+        )
+
+    def handle(self, *args, **options):
+        previo = None
+        if options["comparar"]:
+            try:
+                with open(options["comparar"], encoding="utf-8") as f:
+                    previo = json.load(f)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"No se pudo leer {options['comparar']}: {exc}")
+
+        informe = {
+            "commit": _git("rev-parse", "HEAD"),
+            "rama": _git("rev-parse", "--abbrev-ref", "HEAD"),
+            "cambios_sin_commit": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "fecha": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "iteraciones": options["iteraciones"],
+            "tamanos": {},
+        }
+
+        # spawn: cada tamaño arranca Django contra su propia BD temporal
+        ctx = multiprocessing.get_context("spawn")
+        for clases in [int(x) for x in options["tamanos"].split(",")]:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{clases} clases"))
+            with tempfile.TemporaryDirectory() as tmp:
+                with ctx.Pool(1) as pool:
+                    resultado = pool.apply(
+                        _medir_tamano,
+                        (
+                            os.path.join(tmp, "bench.sqlite3"),
+                            clases,
+                            options["iteraciones"],
+                            options["semilla"],
+                        ),
+                    )
+            informe["tamanos"][str(clases)] = resultado
+            self.stdout.write(f"  seed: {resultado['seed_s']} s")
+            anterior = ((previo or {}).get("tamanos") or {}).get(str(clases), {}).get("endpoints", {})
+            self._imprimir(resultado["endpoints"], anterior, options["umbral"])
+
+        if options["salida"]:
+            with open(options["salida"], "w", encoding="utf-8") as f:
+                json.dump(informe, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['salida']}"))
+
+    def _imprimir(self, endpoints, anterior, umbral):
+        self.stdout.write(
+            f"  {'endpoint':<30} {'p50':>8} {'p95':>8} {'p99':>8} {'SQL':>5} {'KiB':>9} {'err':>4}"
+        )
+        for nombre, r in endpoints.items():
+            linea = (
+                f"  {nombre:<30} {r['p50'] or 0:8.2f} {r['p95'] or 0:8.2f} {r['p99'] or 0:8.2f}"
+                f" {r['consultas']:5d} {r['memoria_kib']:9.1f} {r['errores']:4d}"
+            )
+            previo = anterior.get(nombre)
+            if previo:
+                cambios = []
+                for clave in ("p50", "p95"):
+                    delta = _variacion(r[clave], previo.get(clave))
+                    if delta is not None:
+                        cambios.append(f"{clave} {delta:+.0f}%")
+                if r["consultas"] != previo.get("consultas"):
+                    cambios.append(f"SQL {previo.get('consultas')}->{r['consultas']}")
+                linea += "  (" + ", ".join(cambios) + ")"
+                regresion = any(
+                    (_variacion(r[c], previo.get(c)) or 0) > umbral for c in ("p50", "p95")
+                ) or r["consultas"] > (previo.get("consultas") or 0)
+                if regresion:
+                    linea = self.style.ERROR(linea)
+            self.stdout.write(linea)
@@ -0,0 +1,111 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Lo mismo que hace un worker de gunicorn al arrancar, más el URLconf
+# (que Django carga recién en el primer request).
+CODIGO_ARRANQUE = (
+    "import os;"
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings');"
+    "from core.wsgi import application;"
+    "import core.urls"
+)
+
+# Hace fallar el proceso si algo abre una conexión SQLite. SystemExit no lo
+# atrapa un `except Exception`, así que no se puede silenciar por accidente.
+CODIGO_SIN_BD = (
+    "import sqlite3.dbapi2 as _db;"
+    "_db.connect = lambda *a, **k: (_ for _ in ()).throw("
+    "SystemExit('Acceso a la BD durante el arranque'));"
+)
+
+
+def medir_arranque(importtime=False, sin_bd=False, env=None):
+    """
+    Arranca Django en un proceso nuevo.
+    Con sin_bd=True el arranque falla si intenta conectarse a SQLite.
+    Devuelve (segundos, returncode, stderr).
+    """
+    codigo = CODIGO_ARRANQUE
+    if sin_bd:
+        codigo = CODIGO_SIN_BD + codigo
+
+    comando = [sys.executable]
+    if importtime:
+        comando += ["-X", "importtime"]
+    comando += ["-c", codigo]
+
+    inicio = time.perf_counter()
+    proceso = subprocess.run(
+        comando,
+        cwd=settings.BASE_DIR,
+        env={**os.environ, **(env or {})},
+        capture_output=True,
+        text=True,
+    )
+    return time.perf_counter() - inicio, proceso.returncode, proceso.stderr
+
+
+def parsear_importtime(stderr):
+    """Líneas de -X importtime -> lista de (self_us, cumulative_us, modulo)."""
+    filas = []
+    for linea in stderr.splitlines():
+        if not linea.startswith("import time:") or "[us]" in linea:
+            continue
+        self_us, acumulado_us, modulo = linea[len("import time:"):].split("|", 2)
+        filas.append((int(self_us), int(acumulado_us), modulo.strip()))
+    return filas
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el tiempo de arranque de un worker (settings + apps + URLconf) "
+        "en procesos nuevos y muestra los imports más costosos "
+        "(python -X importtime)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeticiones", type=int, default=5)
+        parser.add_argument("--top", type=int, default=15)
+        parser.add_argument(
+            "--presupuesto-ms",
+            type=float,
+            default=None,
+            help="Falla si la mediana supera este valor.",
+        )
+
+    def handle(self, *args, **options):
+        tiempos = []
+        for _ in range(options["repeticiones"]):
+            segundos, codigo, stderr = medir_arranque()
+            if codigo != 0:
+                raise CommandError(f"El arranque falló:\n{stderr}")
+            tiempos.append(segundos * 1000)
+
+        _, _, stderr = medir_arranque(importtime=True)
+        filas = parsear_importtime(stderr)
+
+        mediana = statistics.median(tiempos)
+        self.stdout.write(
+            f"Arranque: mediana {mediana:.0f} ms, "
+            f"mín {min(tiempos):.0f} ms, máx {max(tiempos):.0f} ms "
+            f"({options['repeticiones']} procesos)"
+        )
+
+        self.stdout.write(f"Imports más costosos (tiempo propio, top {options['top']}):")
+        for self_us, acumulado_us, modulo in sorted(filas, reverse=True)[: options["top"]]:
+            self.stdout.write(
+                f"  {self_us / 1000:8.1f} ms  (acum. {acumulado_us / 1000:8.1f} ms)  {modulo}"
+            )
+
+        presupuesto = options["presupuesto_ms"]
+        if presupuesto is not None and mediana > presupuesto:
+            raise CommandError(
+                f"El arranque ({mediana:.0f} ms) supera el presupuesto de {presupuesto:.0f} ms."
+            )
@@ -0,0 +1,94 @@
+import datetime
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from api import renderers
+from api.models import Clase, Cliente, Profesional
+from api.serializers import ClaseSerializer
+
+
+def generar_clases(n):
+    """Clases en memoria (sin BD) con cliente, solicitante y profesional."""
+    clientes = [
+        Cliente(pk=i, nombre=f"Empresa Constructora Ñuñoa {i}", rut=f"{i}-k")
+        for i in range(1, 51)
+    ]
+    usuarios = [
+        User(pk=i, username=f"user{i}", first_name="José", last_name=f"Pérez {i}")
+        for i in range(1, 101)
+    ]
+    profesionales = [Profesional(pk=u.pk, user=u) for u in usuarios[:30]]
+    estados = [e for e, _ in Clase.ESTADOS]
+    ahora = timezone.now()
+
+    clases = [
+        Clase(
+            pk=i,
+            titulo=f"Capacitación en prevención de riesgos #{i}",
+            descripcion="Uso correcto de EPP y protocolos de trabajo en altura.",
+            fecha_solicitada=datetime.date(2025, 1, 1) + datetime.timedelta(days=i % 365),
+            modalidad="Presencial",
+            estado=estados[i % len(estados)],
+            cliente=clientes[i % len(clientes)],
+            solicitada_por=usuarios[i % len(usuarios)],
+            profesional_asignado=profesionales[i % len(profesionales)] if i % 3 else None,
+            creado_en=ahora,
+            actualizado_en=ahora,
+        )
+        for i in range(1, n + 1)
+    ]
+    for clase in clases:
+        clase.asignar_nombres()
+    return clases
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara tiempo de render y tamaño del JSON del listado de clases "
+        "(1k/10k/100k filas) entre el JSONRenderer de DRF y JSONRendererRapido "
+        "(con orjson y con la librería estándar)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tamanos",
+            default="1000,10000,100000",
+            help="Cantidades de filas separadas por coma.",
+        )
+        parser.add_argument("--repeticiones", type=int, default=3)
+
+    def _medir(self, render, data, repeticiones):
+        mejor, salida = None, b""
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            salida = render(data)
+            duracion = time.perf_counter() - inicio
+            mejor = duracion if mejor is None else min(mejor, duracion)
+        return mejor * 1000, len(salida)
+
+    def handle(self, *args, **options):
+        drf = JSONRenderer()
+        rapido = renderers.JSONRendererRapido()
+
+        def rapido_stdlib(data):
+            with mock.patch.object(renderers, "orjson", None):
+                return rapido.render(data)
+
+        variantes = [("drf", drf.render)]
+        if renderers.orjson is not None:
+            variantes.append(("rapido (orjson)", rapido.render))
+        else:
+            self.stdout.write("orjson no está instalado: se omite esa variante.")
+        variantes.append(("rapido (stdlib)", rapido_stdlib))
+
+        for n in [int(x) for x in options["tamanos"].split(",")]:
+            data = ClaseSerializer(generar_clases(n), many=True).data
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{n} clases"))
+            for nombre, render in variantes:
+                ms, tamano = self._medir(render, data, options["repeticiones"])
+                self.stdout.write(f"  {nombre:<18} {ms:10.1f} ms  {tamano / 1024:10.1f} KiB")
@@ -0,0 +1,172 @@
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+
+PERFILES = {
+    "defecto": "False",
+    "produccion": "True",
+}
+
+
+def _preparar_entorno(ruta_bd, perfil):
+    os.environ["DATABASE_URL"] = f"sqlite:///{ruta_bd}"
+    os.environ["DJANGO_SQLITE_PRODUCCION"] = PERFILES[perfil]
+    os.environ["DJANGO_ALLOWED_HOSTS"] = "testserver"
+    # Todos los requests usan el mismo token: sin rate limiting
+    os.environ["DJANGO_THROTTLE"] = "False"
+    # Se mide el endpoint, no la caché de respuestas (cada GET repetido sería un HIT)
+    os.environ["DJANGO_CACHE_RESPUESTAS"] = "False"
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+
+    import logging
+    import warnings
+    import django
+
+    django.setup()
+    # Los 500 por "database is locked" se cuentan, no se imprimen
+    logging.disable(logging.CRITICAL)
+    warnings.simplefilter("ignore")
+
+
+def _crear_datos(ruta_bd, perfil, clientes, clases):
+    _preparar_entorno(ruta_bd, perfil)
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from api.models import Cliente, Clase
+
+    call_command("migrate", verbosity=0)
+    user = User.objects.create_superuser("bench", "bench@example.com", "bench")
+    lista = Cliente.objects.bulk_create(
+        Cliente(nombre=f"Empresa {i}", rut=f"bench-{i}") for i in range(clientes)
+    )
+    Clase.objects.bulk_create(
+        Clase(
+            titulo=f"Clase {i}",
+            descripcion="bench",
+            cliente=lista[i % clientes],
+            cliente_nombre=lista[i % clientes].nombre,
+        )
+        for i in range(clases)
+    )
+    return str(RefreshToken.for_user(user).access_token), [c.pk for c in lista]
+
+
+def _trabajador(ruta_bd, perfil, token, clientes, segundos, ratio_escritura, semilla):
+    _preparar_entorno(ruta_bd, perfil)
+
+    from django.test import Client
+
+    client = Client(raise_request_exception=False, HTTP_AUTHORIZATION=f"Bearer {token}")
+    rnd = random.Random(semilla)
+    lecturas, escrituras, errores = [], [], 0
+
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        cliente_id = rnd.choice(clientes)
+        inicio = time.perf_counter()
+        if rnd.random() < ratio_escritura:
+            r = client.post(
+                "/api/clases/",
+                {"titulo": "bench", "descripcion": "bench", "cliente": cliente_id},
+                content_type="application/json",
+            )
+            escrituras.append(time.perf_counter() - inicio)
+            ok = r.status_code == 201
+        else:
+            r = client.get(f"/api/clases/?cliente_id={cliente_id}")
+            lecturas.append(time.perf_counter() - inicio)
+            ok = r.status_code == 200
+        if not ok:
+            errores += 1
+
+    return lecturas, escrituras, errores
+
+
+def _percentiles(valores):
+    if len(valores) < 2:
+        return {"p50": None, "p95": None, "p99": None}
+    cortes = statistics.quantiles(valores, n=100)
+    return {
+        "p50": round(cortes[49] * 1000, 2),
+        "p95": round(cortes[94] * 1000, 2),
+        "p99": round(cortes[98] * 1000, 2),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark multiproceso de lecturas/escrituras concurrentes contra "
+        "/api/clases/ sobre una BD SQLite temporal, con el perfil por defecto "
+        "y/o el perfil de producción (WAL, PRAGMAs, BEGIN IMMEDIATE)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--procesos", type=int, default=8)
+        parser.add_argument("--segundos", type=float, default=10)
+        parser.add_argument(
+            "--escrituras",
+            type=float,
+            default=0.2,
+            help="Fracción de requests que son POST (0-1).",
+        )
+        parser.add_argument("--clientes", type=int, default=50)
+        parser.add_argument("--clases", type=int, default=2000)
+        parser.add_argument(
+            "--perfil",
+            choices=list(PERFILES) + ["ambos"],
+            default="ambos",
+        )
+
+    def handle(self, *args, **options):
+        perfiles = list(PERFILES) if options["perfil"] == "ambos" else [options["perfil"]]
+        # spawn: cada proceso arranca Django con su propio perfil y conexión
+        ctx = multiprocessing.get_context("spawn")
+
+        for perfil in perfiles:
+            with tempfile.TemporaryDirectory() as tmp:
+                ruta_bd = os.path.join(tmp, "bench.sqlite3")
+
+                with ctx.Pool(1) as pool:
+                    token, clientes = pool.apply(
+                        _crear_datos,
+                        (ruta_bd, perfil, options["clientes"], options["clases"]),
+                    )
+
+                with ctx.Pool(options["procesos"]) as pool:
+                    resultados = pool.starmap(
+                        _trabajador,
+                        [
+                            (
+                                ruta_bd,
+                                perfil,
+                                token,
+                                clientes,
+                                options["segundos"],
+                                options["escrituras"],
+                                semilla,
+                            )
+                            for semilla in range(options["procesos"])
+                        ],
+                    )
+
+            lecturas = [t for r in resultados for t in r[0]]
+            escrituras = [t for r in resultados for t in r[1]]
+            errores = sum(r[2] for r in resultados)
+            total = len(lecturas) + len(escrituras)
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"Perfil: {perfil}"))
+            self.stdout.write(
+                f"  requests: {total}  ({total / options['segundos']:.1f} req/s)"
+                f"  errores: {errores}"
+            )
+            self.stdout.write(f"  lecturas  ({len(lecturas)}): {_percentiles(lecturas)} ms")
+            self.stdout.write(f"  escrituras ({len(escrituras)}): {_percentiles(escrituras)} ms")
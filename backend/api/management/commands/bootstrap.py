@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import UserProfile, SystemConfig
+
+
+# (username, password) de los administradores por defecto
+USUARIOS_ADMIN = [
+    ("admin", "admin"),
+    ("admin_2", "admin_2"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Deja la BD lista para usar: aplica migraciones (opcional), crea los "
+        "usuarios admin por defecto con rol ADMIN y el registro de "
+        "configuración. Es idempotente: se puede correr en cada deploy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--migrar",
+            action="store_true",
+            help="Ejecutar `migrate` antes de crear los datos iniciales.",
+        )
+
+    def handle(self, *args, **options):
+        if options["migrar"]:
+            call_command("migrate", interactive=False, verbosity=options["verbosity"])
+
+        with transaction.atomic():
+            existentes = set(
+                User.objects.filter(
+                    username__in=[u for u, _ in USUARIOS_ADMIN]
+                ).values_list("username", flat=True)
+            )
+
+            for username, password in USUARIOS_ADMIN:
+                if username in existentes:
+                    continue
+                user = User.objects.create_superuser(
+                    username=username,
+                    email=f"{username}@nomasaccidentes.local",
+                    password=password,
+                )
+                UserProfile.objects.update_or_create(
+                    user=user,
+                    defaults={"rol": "ADMIN"},
+                )
+                self.stdout.write(f"⚙️ Usuario admin creado: {username}")
+
+            _, creada = SystemConfig.objects.get_or_create(id=1)
+            if creada:
+                self.stdout.write("⚙️ Configuración del sistema creada.")
+
+        self.stdout.write(self.style.SUCCESS("Bootstrap completo."))
@@ -0,0 +1,51 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.provisioning import leer_csv, provisionar_profesionales
+
+
+class Command(BaseCommand):
+    help = (
+        "Alta masiva de profesionales desde un archivo CSV o JSON "
+        "(username, password, first_name, last_name, email, rut, telefono, "
+        "direccion, especialidad, registro_profesional, disponible)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo", help="Ruta al archivo .csv o .json")
+        parser.add_argument(
+            "--parcial",
+            action="store_true",
+            help="Crear las filas válidas aunque otras tengan errores.",
+        )
+
+    def handle(self, *args, **options):
+        ruta = options["archivo"]
+        try:
+            with open(ruta, encoding="utf-8-sig") as f:
+                if ruta.lower().endswith(".json"):
+                    filas = json.load(f)
+                else:
+                    filas = leer_csv(f)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"No se pudo leer {ruta}: {exc}")
+
+        if not isinstance(filas, list):
+            raise CommandError("El archivo JSON debe contener una lista de profesionales.")
+
+        creados, errores = provisionar_profesionales(filas, parcial=options["parcial"])
+
+        for error in errores:
+            # Numeración desde 1 (primer registro, sin contar el encabezado)
+            detalle = json.dumps(error["errores"], ensure_ascii=False)
+            self.stderr.write(f"Registro {error['fila'] + 1}: {detalle}")
+
+        if errores and not creados:
+            raise CommandError(
+                f"{len(errores)} fila(s) con errores; no se creó ningún profesional."
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Profesionales creados: {len(creados)}")
+        )
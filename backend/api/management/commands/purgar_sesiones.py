@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.sesiones import purga_aplica, purgar_sesiones_vencidas
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra las sesiones vencidas de django_session en lotes (a diferencia "
+        "de clearsessions, que lo hace con un solo DELETE). Pensado para cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=1000, help="Sesiones por DELETE.")
+        parser.add_argument(
+            "--pausa",
+            type=float,
+            default=0.0,
+            help="Segundos de espera entre lotes.",
+        )
+
+    def handle(self, *args, **options):
+        if not purga_aplica():
+            self.stdout.write(
+                f"{settings.SESSION_ENGINE} no guarda sesiones en la BD: no hay nada que purgar."
+            )
+            return
+        borradas = purgar_sesiones_vencidas(options["lote"], options["pausa"])
+        if options["verbosity"]:
+            self.stdout.write(self.style.SUCCESS(f"Borradas {borradas} sesiones vencidas."))
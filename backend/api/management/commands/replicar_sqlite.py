@@ -0,0 +1,92 @@
+import collections
+import sqlite3
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Simula una réplica con retraso para probar api/replicas.py en local: "
+        "copia la BD SQLite primaria sobre las réplicas SQLite "
+        "(DATABASE_REPLICA_URLS) cada --intervalo segundos, aplicando la foto "
+        "tomada hace --retraso segundos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retraso",
+            type=float,
+            default=2.0,
+            help="Segundos que la réplica va detrás de la primaria.",
+        )
+        parser.add_argument(
+            "--intervalo",
+            type=float,
+            default=0.5,
+            help="Segundos entre fotos de la primaria.",
+        )
+        parser.add_argument(
+            "--una-vez",
+            action="store_true",
+            help="Copia la primaria a las réplicas (sin retraso) y termina.",
+        )
+
+    def _archivo(self, alias):
+        config = settings.DATABASES[alias]
+        if config["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError(f"{alias} no es SQLite.")
+        return str(config["NAME"])
+
+    def _foto(self, primaria):
+        # La API de backup de SQLite copia una vista consistente aunque
+        # haya escrituras en curso
+        foto = sqlite3.connect(":memory:", check_same_thread=False)
+        with closing(sqlite3.connect(primaria)) as origen:
+            origen.backup(foto)
+        return foto
+
+    def _aplicar(self, foto, replicas):
+        for archivo in replicas:
+            with closing(sqlite3.connect(archivo, timeout=30)) as destino:
+                foto.backup(destino)
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError("No hay réplicas: define DATABASE_REPLICA_URLS.")
+        primaria = self._archivo("default")
+        replicas = [self._archivo(alias) for alias in settings.DATABASE_REPLICAS]
+
+        if options["una_vez"]:
+            self._aplicar(self._foto(primaria), replicas)
+            self.stdout.write(f"Copiada {primaria} a {len(replicas)} réplica(s).")
+            return
+
+        retraso = options["retraso"]
+        intervalo = options["intervalo"]
+        self.stdout.write(
+            f"Replicando {primaria} -> {', '.join(replicas)} "
+            f"con {retraso}s de retraso (Ctrl+C para salir)."
+        )
+        pendientes = collections.deque()
+        try:
+            while True:
+                ahora = time.monotonic()
+                pendientes.append((ahora, self._foto(primaria)))
+                # Se aplica la foto más nueva que ya cumplió el retraso
+                lista = None
+                while pendientes and pendientes[0][0] <= ahora - retraso:
+                    if lista is not None:
+                        lista.close()
+                    lista = pendientes.popleft()[1]
+                if lista is not None:
+                    self._aplicar(lista, replicas)
+                    lista.close()
+                time.sleep(intervalo)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for _, foto in pendientes:
+                foto.close()
@@ -0,0 +1,98 @@
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from api.trabajos import cargar_tareas, ejecutar, tomar
+
+
+class Command(BaseCommand):
+    help = (
+        "Procesa la cola de trabajos de la BD (api/trabajos.py) con N hilos. "
+        "Termina limpio con SIGTERM/SIGINT: deja de tomar trabajos y espera "
+        "a que terminen los que están en curso."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hilos", type=int, default=4, help="Trabajos en paralelo.")
+        parser.add_argument(
+            "--espera",
+            type=float,
+            default=1.0,
+            help="Segundos entre consultas cuando la cola está vacía.",
+        )
+        parser.add_argument(
+            "--una-vez",
+            action="store_true",
+            help="Vacía la cola (lo que esté vencido) y termina.",
+        )
+
+    def handle(self, *args, **options):
+        cargar_tareas()
+        hilos = options["hilos"]
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        detener = threading.Event()
+
+        def al_recibir_senal(signum, frame):
+            self.stdout.write("Deteniendo: se terminan los trabajos en curso...")
+            detener.set()
+
+        signal.signal(signal.SIGTERM, al_recibir_senal)
+        signal.signal(signal.SIGINT, al_recibir_senal)
+
+        def correr(trabajo):
+            try:
+                return ejecutar(trabajo)
+            finally:
+                # Cada hilo tiene su conexión: se cierra si quedó rota o vieja
+                close_old_connections()
+
+        libres = threading.Semaphore(hilos)
+        completados = fallidos = 0
+        contador = threading.Lock()
+
+        def al_terminar(futuro):
+            nonlocal completados, fallidos
+            with contador:
+                if not futuro.exception() and futuro.result():
+                    completados += 1
+                else:
+                    fallidos += 1
+            libres.release()
+
+        self.stdout.write(f"Worker {worker_id} con {hilos} hilos.")
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            while not detener.is_set():
+                # Se espera un hilo libre sin dejar de atender la señal
+                if not libres.acquire(timeout=0.5):
+                    continue
+                cantidad = 1
+                while cantidad < hilos and libres.acquire(blocking=False):
+                    cantidad += 1
+
+                # La señal pudo llegar mientras se esperaba: no se toma nada más
+                if detener.is_set():
+                    for _ in range(cantidad):
+                        libres.release()
+                    break
+
+                trabajos = tomar(cantidad, worker_id)
+                for _ in range(cantidad - len(trabajos)):
+                    libres.release()
+                for trabajo in trabajos:
+                    pool.submit(correr, trabajo).add_done_callback(al_terminar)
+
+                if not trabajos:
+                    if options["una_vez"]:
+                        break
+                    detener.wait(options["espera"])
+
+        connections.close_all()
+        self.stdout.write(self.style.SUCCESS(
+            f"Trabajos completados: {completados}, con error: {fallidos}."
+        ))
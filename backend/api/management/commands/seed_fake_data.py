@@ -0,0 +1,154 @@
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import UserProfile, Cliente, Profesional, Clase
+
+
+NOMBRES = ["Ana", "José", "María", "Pedro", "Camila", "Luis", "Valentina", "Jorge", "Fernanda", "Diego"]
+APELLIDOS = ["González", "Muñoz", "Rojas", "Díaz", "Pérez", "Soto", "Contreras", "Silva", "Martínez", "Sepúlveda"]
+ESPECIALIDADES = ["Prevención de riesgos", "Ergonomía", "Seguridad industrial", "Primeros auxilios", "Trabajo en altura"]
+MODALIDADES = ["Presencial", "Online", "Mixta"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera datos de prueba con bulk_create por lotes: usuarios (con "
+        "perfil), clientes, profesionales y clases. Ej: --clases 100000."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--usuarios", type=int, default=100, help="Usuarios CLIENTE.")
+        parser.add_argument("--clientes", type=int, default=50)
+        parser.add_argument("--profesionales", type=int, default=20)
+        parser.add_argument("--clases", type=int, default=1000)
+        parser.add_argument("--lote", type=int, default=2000, help="Filas por INSERT.")
+        parser.add_argument("--semilla", type=int, default=None)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options["semilla"])
+        lote = options["lote"]
+        # Prefijo único por corrida: se puede ejecutar varias veces
+        prefijo = uuid.uuid4().hex[:6]
+        # Un solo hash para todos (password "fake"): hashear miles es lento
+        password = make_password("fake")
+        inicio = time.perf_counter()
+
+        def persona():
+            return rnd.choice(NOMBRES), rnd.choice(APELLIDOS)
+
+        with transaction.atomic():
+            # Usuarios: CLIENTE + PROFESIONAL
+            n_clientes_u = options["usuarios"]
+            n_prof = options["profesionales"]
+            usuarios = []
+            for i in range(n_clientes_u + n_prof):
+                nombre, apellido = persona()
+                usuarios.append(User(
+                    username=f"fake_{prefijo}_{i}",
+                    email=f"fake_{prefijo}_{i}@example.com",
+                    first_name=nombre,
+                    last_name=apellido,
+                    password=password,
+                ))
+            User.objects.bulk_create(usuarios, batch_size=lote)
+            if any(u.pk is None for u in usuarios):
+                ids = dict(
+                    User.objects.filter(username__startswith=f"fake_{prefijo}_")
+                    .values_list("username", "id")
+                )
+                for u in usuarios:
+                    u.pk = ids[u.username]
+
+            perfiles = []
+            for i, u in enumerate(usuarios):
+                rut = f"{rnd.randint(5_000_000, 25_000_000)}-{rnd.randint(0, 9)}"
+                perfiles.append(UserProfile(
+                    user=u,
+                    rut=rut,
+                    rol="CLIENTE" if i < n_clientes_u else "PROFESIONAL",
+                    busqueda=UserProfile.texto_busqueda(u, rut),
+                ))
+            UserProfile.objects.bulk_create(perfiles, batch_size=lote)
+
+            usuarios_cliente = usuarios[:n_clientes_u]
+            profesionales = Profesional.objects.bulk_create(
+                [
+                    Profesional(
+                        user=u,
+                        especialidad=rnd.choice(ESPECIALIDADES),
+                        disponible=rnd.random() < 0.8,
+                    )
+                    for u in usuarios[n_clientes_u:]
+                ],
+                batch_size=lote,
+            )
+
+            clientes = Cliente.objects.bulk_create(
+                [
+                    Cliente(
+                        nombre=f"Empresa {prefijo} {i}",
+                        rut=f"fake-{prefijo}-{i}",
+                        email=f"contacto{i}@empresa-{prefijo}.cl",
+                        usuario=rnd.choice(usuarios_cliente) if usuarios_cliente else None,
+                    )
+                    for i in range(options["clientes"])
+                ],
+                batch_size=lote,
+            )
+            if not clientes:
+                clientes = list(Cliente.objects.all()[:1])
+
+            n_clases = options["clases"]
+            if n_clases and not clientes:
+                self.stderr.write("No hay clientes: no se pueden crear clases.")
+                n_clases = 0
+
+            # Las pk solo hacen falta si el backend no devuelve ids (MySQL)
+            if clientes and clientes[0].pk is None:
+                clientes = list(Cliente.objects.filter(rut__startswith=f"fake-{prefijo}-"))
+            if profesionales and profesionales[0].pk is None:
+                profesionales = list(
+                    Profesional.objects.filter(user__in=usuarios[n_clientes_u:]).select_related("user")
+                )
+
+            estados = [e for e, _ in Clase.ESTADOS]
+            hoy = timezone.localdate()
+            creadas = 0
+            while creadas < n_clases:
+                tanda = min(lote, n_clases - creadas)
+                clases = []
+                for i in range(creadas, creadas + tanda):
+                    estado = rnd.choice(estados)
+                    clases.append(Clase(
+                        titulo=f"Capacitación {i}",
+                        descripcion="Generada por seed_fake_data.",
+                        fecha_solicitada=hoy + timedelta(days=rnd.randint(-180, 180)),
+                        modalidad=rnd.choice(MODALIDADES),
+                        cliente=rnd.choice(clientes),
+                        solicitada_por=rnd.choice(usuarios_cliente) if usuarios_cliente else None,
+                        profesional_asignado=(
+                            rnd.choice(profesionales)
+                            if profesionales and estado != "PENDIENTE"
+                            else None
+                        ),
+                        estado=estado,
+                    ))
+                    # bulk_create no llama a save(): los nombres se copian aquí
+                    clases[-1].asignar_nombres()
+                Clase.objects.bulk_create(clases, batch_size=lote)
+                creadas += tanda
+
+        if options["verbosity"]:
+            self.stdout.write(self.style.SUCCESS(
+                f"Creados {len(usuarios)} usuarios, {len(clientes)} clientes, "
+                f"{len(profesionales)} profesionales y {creadas} clases "
+                f"en {time.perf_counter() - inicio:.1f} s."
+            ))
@@ -0,0 +1,318 @@
+"""
+Métricas HTTP por ruta, compartidas entre los workers de gunicorn.
+
+Cada proceso escribe en su propio archivo mapeado en memoria
+(METRICAS_DIR/metricas_<pid>.db), así que en el camino caliente no hay locks
+entre procesos: sumar una observación son dos incrementos sobre un memoryview
+de uint64, bajo un threading.Lock por los hilos del worker (gthread).
+GET /api/metrics/ lee todos los archivos del directorio, los suma y
+responde en formato de texto de Prometheus. Antes de leer, los archivos de
+procesos que ya no existen se suman a metricas_acumulado.db y se borran: los
+contadores no retroceden y el directorio no crece con cada reinicio de worker.
+
+Formato del archivo (todo en palabras uint64):
+  [0]                  cantidad de slots usados
+  [1 + s * PALABRAS_SLOT ...] slot s:
+      clave (PALABRAS_CLAVE palabras, UTF-8 con ceros al final)
+      contadores por bucket (len(LIMITES) + 1, el último es +Inf)
+      suma de duraciones en microsegundos
+
+La clave es "ruta|método|clase de status" (ej. "clases-list|GET|2xx").
+Las rutas son los nombres de URL de Django/DRF. Los contadores simples
+(contar()) usan claves "#métrica|etiqueta=valor,..." y solo el bucket 0. El directorio debe vaciarse
+al (re)iniciar el servicio, igual que con prometheus_client multiproceso.
+"""
+import bisect
+import fcntl
+import glob
+import mmap
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+# Límites superiores de los buckets, en segundos
+LIMITES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PALABRAS_CLAVE = 12  # 96 bytes
+PALABRAS_SLOT = PALABRAS_CLAVE + len(LIMITES) + 1 + 1
+MAX_SLOTS = 512
+TAMANO_ARCHIVO = 8 * (1 + MAX_SLOTS * PALABRAS_SLOT)
+
+# Si se acaban los slots, el resto de las claves se acumulan aquí
+CLAVE_DESBORDE = "otras|*|*"
+
+PREFIJO_CONTADOR = "#"
+
+# Donde quedan los contadores de los procesos que terminaron
+ARCHIVO_ACUMULADO = "metricas_acumulado.db"
+
+
+def _directorio():
+    return getattr(settings, "METRICAS_DIR")
+
+
+def _codificar(clave):
+    datos = clave.encode()[: PALABRAS_CLAVE * 8]
+    return datos.ljust(PALABRAS_CLAVE * 8, b"\0")
+
+
+def _decodificar(datos):
+    return bytes(datos).rstrip(b"\0").decode(errors="replace")
+
+
+def _ruta_proceso(directorio, pid=None):
+    return os.path.join(directorio, f"metricas_{pid or os.getpid()}.db")
+
+
+class RegistroProceso:
+    """Archivo de métricas de un proceso (un único proceso escritor)."""
+
+    def __init__(self, ruta):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        self._lock = threading.Lock()
+        fd = os.open(ruta, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < TAMANO_ARCHIVO:
+                os.ftruncate(fd, TAMANO_ARCHIVO)
+            self._mmap = mmap.mmap(fd, TAMANO_ARCHIVO)
+        finally:
+            os.close(fd)
+        self._bytes = memoryview(self._mmap)
+        self._palabras = self._bytes.cast("Q")
+
+        # clave -> índice de la primera palabra de contadores del slot
+        self._slots = {}
+        for s in range(self._palabras[0]):
+            inicio = 1 + s * PALABRAS_SLOT
+            clave = _decodificar(self._bytes[inicio * 8:(inicio + PALABRAS_CLAVE) * 8])
+            self._slots[clave] = inicio + PALABRAS_CLAVE
+
+    def _nuevo_slot(self, clave):
+        usados = self._palabras[0]
+        if usados >= MAX_SLOTS - 1 and clave != CLAVE_DESBORDE:
+            return self._slots.get(CLAVE_DESBORDE) or self._nuevo_slot(CLAVE_DESBORDE)
+        inicio = 1 + usados * PALABRAS_SLOT
+        self._bytes[inicio * 8:(inicio + PALABRAS_CLAVE) * 8] = _codificar(clave)
+        # La clave se escribe antes de publicar el slot a los lectores
+        self._palabras[0] = usados + 1
+        self._slots[clave] = inicio + PALABRAS_CLAVE
+        return inicio + PALABRAS_CLAVE
+
+    def observar(self, clave, segundos):
+        bucket = bisect.bisect_left(LIMITES, segundos)
+        # Leer y escribir la palabra no es atómico entre hilos
+        with self._lock:
+            base = self._slots.get(clave)
+            if base is None:
+                base = self._nuevo_slot(clave)
+            palabras = self._palabras
+            palabras[base + bucket] += 1
+            palabras[base + len(LIMITES) + 1] += int(segundos * 1_000_000)
+
+    def sumar(self, clave, buckets, suma_us):
+        """Agrega contadores ya agregados (los de un proceso que terminó)."""
+        with self._lock:
+            base = self._slots.get(clave)
+            if base is None:
+                base = self._nuevo_slot(clave)
+            palabras = self._palabras
+            for i, cantidad in enumerate(buckets):
+                palabras[base + i] += cantidad
+            palabras[base + len(LIMITES) + 1] += suma_us
+
+    def cerrar(self):
+        self._palabras.release()
+        self._bytes.release()
+        self._mmap.close()
+
+
+_registro = None
+_registro_lock = threading.Lock()
+
+
+def _reiniciar_en_hijo():
+    # Tras un fork, el hijo debe escribir en su propio archivo
+    global _registro, _registro_lock
+    _registro = None
+    _registro_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reiniciar_en_hijo)
+
+
+def observar(clave, segundos):
+    global _registro
+    if _registro is None:
+        with _registro_lock:
+            if _registro is None:
+                _registro = RegistroProceso(_ruta_proceso(_directorio()))
+    _registro.observar(clave, segundos)
+
+
+def contar(metrica, **etiquetas):
+    """Incrementa un contador (ej. contar("nma_cache_total", resultado="hit"))."""
+    partes = ",".join(f"{k}={v}" for k, v in sorted(etiquetas.items()))
+    observar(f"{PREFIJO_CONTADOR}{metrica}|{partes}", 0)
+
+
+def _leer_archivo(ruta):
+    """clave -> (buckets, suma_us) de un archivo de métricas."""
+    with open(ruta, "rb") as f:
+        datos = f.read()
+    if len(datos) < TAMANO_ARCHIVO:
+        return {}
+    palabras = memoryview(datos).cast("Q")
+    contenido = {}
+    for s in range(min(palabras[0], MAX_SLOTS)):
+        inicio = 1 + s * PALABRAS_SLOT
+        clave = _decodificar(datos[inicio * 8:(inicio + PALABRAS_CLAVE) * 8])
+        base = inicio + PALABRAS_CLAVE
+        contenido[clave] = (list(palabras[base:base + len(LIMITES) + 1]), palabras[base + len(LIMITES) + 1])
+    return contenido
+
+
+def _pid_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _pid_de(ruta):
+    nombre = os.path.basename(ruta)[len("metricas_"):-len(".db")]
+    return int(nombre) if nombre.isdigit() else None
+
+
+@contextmanager
+def _candado(directorio, exclusivo):
+    # Entre procesos: el que consolida excluye a los que leen
+    os.makedirs(directorio, exist_ok=True)
+    fd = os.open(os.path.join(directorio, ".candado"), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusivo else fcntl.LOCK_SH)
+        yield
+    finally:
+        os.close(fd)
+
+
+def consolidar_muertos(directorio=None):
+    """
+    Suma los archivos de procesos que ya no existen a ARCHIVO_ACUMULADO y los
+    borra. Devuelve cuántos archivos consolidó.
+    """
+    directorio = directorio or _directorio()
+    with _candado(directorio, exclusivo=True):
+        muertos = [
+            ruta
+            for ruta in glob.glob(os.path.join(directorio, "metricas_*.db"))
+            if (pid := _pid_de(ruta)) is not None and not _pid_vivo(pid)
+        ]
+        if not muertos:
+            return 0
+        acumulado = RegistroProceso(os.path.join(directorio, ARCHIVO_ACUMULADO))
+        try:
+            for ruta in muertos:
+                for clave, (buckets, suma) in _leer_archivo(ruta).items():
+                    acumulado.sumar(clave, buckets, suma)
+                acumulado._mmap.flush()
+                os.remove(ruta)
+        finally:
+            acumulado.cerrar()
+        return len(muertos)
+
+
+def leer_metricas(directorio=None):
+    """Suma los archivos de todos los procesos: clave -> (buckets, suma_us)."""
+    directorio = directorio or _directorio()
+    consolidar_muertos(directorio)
+    totales = {}
+    with _candado(directorio, exclusivo=False):
+        for ruta in glob.glob(os.path.join(directorio, "metricas_*.db")):
+            for clave, (buckets, suma) in _leer_archivo(ruta).items():
+                if clave in totales:
+                    previos, suma_previa = totales[clave]
+                    buckets = [a + b for a, b in zip(previos, buckets)]
+                    suma += suma_previa
+                totales[clave] = (buckets, suma)
+    return totales
+
+
+def _escapar(valor):
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _formato_contadores(contadores):
+    lineas = []
+    for metrica in sorted({clave.partition("|")[0] for clave in contadores}):
+        lineas.append(f"# TYPE {metrica} counter")
+        for clave in sorted(contadores):
+            nombre, _, partes = clave.partition("|")
+            if nombre != metrica:
+                continue
+            etiquetas = ",".join(
+                f'{k}="{_escapar(v)}"'
+                for k, _, v in (p.partition("=") for p in partes.split(",") if p)
+            )
+            lineas.append(f"{metrica}{{{etiquetas}}} {sum(contadores[clave][0])}")
+    return lineas
+
+
+def formato_prometheus(totales):
+    contadores = {
+        clave[len(PREFIJO_CONTADOR):]: valor
+        for clave, valor in totales.items()
+        if clave.startswith(PREFIJO_CONTADOR)
+    }
+    totales = {c: v for c, v in totales.items() if not c.startswith(PREFIJO_CONTADOR)}
+    lineas = [
+        "# HELP nma_http_requests_total Requests HTTP por ruta, método y clase de status.",
+        "# TYPE nma_http_requests_total counter",
+    ]
+    filas = []
+    for clave in sorted(totales):
+        ruta, _, resto = clave.partition("|")
+        metodo, _, status = resto.partition("|")
+        etiquetas = f'ruta="{_escapar(ruta)}",metodo="{_escapar(metodo)}",status="{_escapar(status)}"'
+        buckets, suma_us = totales[clave]
+        filas.append((etiquetas, buckets, suma_us))
+        lineas.append(f"nma_http_requests_total{{{etiquetas}}} {sum(buckets)}")
+
+    lineas += [
+        "# HELP nma_http_request_duration_seconds Latencia de los requests HTTP.",
+        "# TYPE nma_http_request_duration_seconds histogram",
+    ]
+    for etiquetas, buckets, suma_us in filas:
+        acumulado = 0
+        for limite, cantidad in zip(LIMITES + ("+Inf",), buckets):
+            acumulado += cantidad
+            lineas.append(
+                f'nma_http_request_duration_seconds_bucket{{{etiquetas},le="{limite}"}} {acumulado}'
+            )
+        lineas.append(f"nma_http_request_duration_seconds_sum{{{etiquetas}}} {suma_us / 1_000_000}")
+        lineas.append(f"nma_http_request_duration_seconds_count{{{etiquetas}}} {acumulado}")
+    lineas += _formato_contadores(contadores)
+    return "\n".join(lineas) + "\n"
+
+
+class MetricasMiddleware:
+    """Registra latencia y status de cada request por nombre de ruta."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inicio = time.perf_counter()
+        response = self.get_response(request)
+        duracion = time.perf_counter() - inicio
+
+        match = request.resolver_match
+        ruta = (match.url_name or match.view_name) if match else "sin_ruta"
+        observar(f"{ruta}|{request.method}|{response.status_code // 100}xx", duracion)
+        return response
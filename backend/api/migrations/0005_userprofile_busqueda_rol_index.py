@@ -0,0 +1,56 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:54
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+LOTE = 1000
+
+
+def normalizar_busqueda(texto):
+    # Copia de api.models.normalizar_busqueda tal como era en esta migración:
+    # la migración no debe cambiar si el modelo cambia
+    texto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def calcular_busqueda(apps, schema_editor):
+    UserProfile = apps.get_model("api", "UserProfile")
+    # Por lotes de pk: no se carga la tabla completa en memoria
+    ultimo = 0
+    while True:
+        perfiles = list(
+            UserProfile.objects.select_related("user")
+            .filter(pk__gt=ultimo)
+            .order_by("pk")[:LOTE]
+        )
+        if not perfiles:
+            return
+        for perfil in perfiles:
+            u = perfil.user
+            partes = [u.username, u.email, u.first_name, u.last_name, perfil.rut]
+            perfil.busqueda = normalizar_busqueda(" ".join(p for p in partes if p))
+        UserProfile.objects.bulk_update(perfiles, ["busqueda"])
+        ultimo = perfiles[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_systemconfig'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='busqueda',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=600, verbose_name='Texto de búsqueda'),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='rol',
+            field=models.CharField(choices=[('ADMIN', 'Administrador'), ('CLIENTE', 'Cliente / Usuario'), ('PROFESIONAL', 'Profesional')], db_index=True, default='CLIENTE', help_text='Define el tipo de usuario dentro del sistema.', max_length=20, verbose_name='Rol'),
+        ),
+        migrations.RunPython(calcular_busqueda, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_userprofile_busqueda_rol_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profesional',
+            name='disponible',
+            field=models.BooleanField(db_index=True, default=True, verbose_name='Disponible'),
+        ),
+        migrations.AlterField(
+            model_name='profesional',
+            name='especialidad',
+            field=models.CharField(blank=True, db_index=True, help_text='Ej: Prevención de riesgos, Ergonomía, Seguridad industrial, etc.', max_length=150, verbose_name='Especialidad'),
+        ),
+        migrations.AddIndex(
+            model_name='clase',
+            index=models.Index(fields=['profesional_asignado', 'estado', 'fecha_solicitada'], name='clase_prof_estado_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.9 on 2026-10-19 13:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_profesional_carga_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trabajo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tarea', models.CharField(max_length=100, verbose_name='Tarea')),
+                ('argumentos', models.JSONField(blank=True, default=dict, verbose_name='Argumentos')),
+                ('prioridad', models.SmallIntegerField(default=0, help_text='Mayor número = se ejecuta antes.', verbose_name='Prioridad')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_CURSO', 'En curso'), ('COMPLETADO', 'Completado'), ('FALLIDO', 'Fallido')], default='PENDIENTE', max_length=20, verbose_name='Estado')),
+                ('ejecutar_desde', models.DateTimeField(default=django.utils.timezone.now, help_text='No se ejecuta antes de esta fecha (programados y reintentos).', verbose_name='Ejecutar desde')),
+                ('intentos', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('max_intentos', models.PositiveSmallIntegerField(default=3, verbose_name='Máximo de intentos')),
+                ('tomado_por', models.CharField(blank=True, max_length=64, verbose_name='Tomado por')),
+                ('tomado_en', models.DateTimeField(blank=True, null=True, verbose_name='Tomado en')),
+                ('ultimo_error', models.TextField(blank=True, verbose_name='Último error')),
+                ('creado_en', models.DateTimeField(auto_now_add=True, verbose_name='Creado en')),
+                ('terminado_en', models.DateTimeField(blank=True, null=True, verbose_name='Terminado en')),
+            ],
+            options={
+                'verbose_name': 'Trabajo',
+                'verbose_name_plural': 'Trabajos',
+                'ordering': ['-prioridad', 'ejecutar_desde', 'id'],
+                'indexes': [models.Index(fields=['estado', '-prioridad', 'ejecutar_desde'], name='trabajo_siguiente_idx')],
+            },
+        ),
+    ]
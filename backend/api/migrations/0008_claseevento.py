@@ -0,0 +1,34 @@
+# Generated by Django 5.2.9 on 2026-10-19 13:11
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_trabajo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaseEvento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado_anterior', models.CharField(blank=True, help_text='Vacío cuando el evento es la creación de la clase.', max_length=20, verbose_name='Estado anterior')),
+                ('estado_nuevo', models.CharField(max_length=20, verbose_name='Estado nuevo')),
+                ('ts', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha')),
+                ('actor', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Realizado por')),
+                ('clase', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='eventos', to='api.clase', verbose_name='Clase')),
+                ('profesional', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='api.profesional', verbose_name='Profesional asignado')),
+            ],
+            options={
+                'verbose_name': 'Evento de clase',
+                'verbose_name_plural': 'Eventos de clases',
+                'indexes': [models.Index(fields=['clase', 'ts'], name='claseevento_clase_ts_idx'), models.Index(fields=['ts', 'id'], name='claseevento_ts_idx')],
+            },
+        ),
+    ]
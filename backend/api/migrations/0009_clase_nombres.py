@@ -0,0 +1,67 @@
+# Generated by Django 5.2.9 on 2026-10-19 13:23
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, NullIf, Trim
+
+
+def copiar_nombres(apps, schema_editor):
+    # Un solo UPDATE con subconsultas, sin cargar las clases en memoria
+    Clase = apps.get_model("api", "Clase")
+    Cliente = apps.get_model("api", "Cliente")
+    Profesional = apps.get_model("api", "Profesional")
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+
+    # Igual que nombre_para_mostrar(): nombre completo o username
+    nombre = Coalesce(
+        NullIf(Trim(Concat("first_name", Value(" "), "last_name")), Value("")),
+        "username",
+    )
+
+    def nombre_usuario(user_id):
+        return Subquery(User.objects.filter(pk=user_id).annotate(n=nombre).values("n")[:1])
+
+    Clase.objects.update(
+        cliente_nombre=Subquery(
+            Cliente.objects.filter(pk=OuterRef("cliente_id")).values("nombre")[:1]
+        ),
+        solicitante_nombre=nombre_usuario(OuterRef("solicitada_por_id")),
+        profesional_nombre=nombre_usuario(
+            Subquery(
+                Profesional.objects.filter(pk=OuterRef(OuterRef("profesional_asignado_id")))
+                .values("user_id")[:1]
+            )
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_claseevento'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clase',
+            name='cliente_nombre',
+            field=models.CharField(blank=True, editable=False, max_length=150, verbose_name='Nombre del cliente'),
+        ),
+        migrations.AddField(
+            model_name='clase',
+            name='profesional_nombre',
+            field=models.CharField(blank=True, editable=False, max_length=301, null=True, verbose_name='Nombre del profesional'),
+        ),
+        migrations.AddField(
+            model_name='clase',
+            name='solicitante_nombre',
+            field=models.CharField(blank=True, editable=False, max_length=301, null=True, verbose_name='Nombre del solicitante'),
+        ),
+        migrations.AddIndex(
+            model_name='clase',
+            index=models.Index(fields=['-creado_en'], name='clase_creado_idx'),
+        ),
+        migrations.RunPython(copiar_nombres, migrations.RunPython.noop),
+    ]
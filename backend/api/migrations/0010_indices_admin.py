@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-19 13:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_clase_nombres'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clase',
+            index=models.Index(fields=['estado', '-creado_en'], name='clase_estado_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['activo', 'nombre'], name='cliente_activo_nombre_idx'),
+        ),
+    ]
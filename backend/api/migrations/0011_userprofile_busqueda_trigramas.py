@@ -0,0 +1,35 @@
+# Generated by Django 5.2.9 on 2026-10-19 14:10
+
+from django.db import migrations
+
+
+# El buscador del directorio de usuarios filtra con LIKE '%texto%' sobre
+# UserProfile.busqueda, que un índice B-tree no puede resolver. En PostgreSQL
+# un índice GIN de trigramas (pg_trgm) sí lo resuelve. En SQLite no hay
+# equivalente: la búsqueda recorre la columna, que es angosta.
+
+def crear_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS userprofile_busqueda_trgm_idx "
+        "ON api_userprofile USING gin (busqueda gin_trgm_ops)"
+    )
+
+
+def borrar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS userprofile_busqueda_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_indices_admin'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-19 14:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_userprofile_busqueda_trigramas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='claseevento',
+            index=models.Index(fields=['estado_nuevo', 'ts', 'id'], name='claseevento_estado_ts_idx'),
+        ),
+    ]
@@ -1,5 +1,22 @@
+import unicodedata
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+def normalizar_busqueda(texto):
+    """
+    Minúsculas y sin tildes, para comparar texto de búsqueda
+    ("Peña" y "pena" quedan iguales).
+    """
+    texto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def nombre_para_mostrar(user):
+    """Nombre completo del usuario o, si no tiene, su username."""
+    return user.get_full_name() or user.username
 
 
 class UserProfile(models.Model):
@@ -28,6 +45,16 @@ class UserProfile(models.Model):
         choices=ROLE_CHOICES,
         default="CLIENTE",
         help_text="Define el tipo de usuario dentro del sistema.",
+        db_index=True,
+    )
+    # Texto normalizado (username, correo, nombre, apellido y RUT) para que
+    # el buscador del directorio de usuarios filtre sobre una sola columna.
+    busqueda = models.CharField(
+        "Texto de búsqueda",
+        max_length=600,
+        blank=True,
+        editable=False,
+        db_index=True,
     )
 
     class Meta:
@@ -37,6 +64,18 @@ class UserProfile(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.get_rol_display()}"
 
+    @staticmethod
+    def texto_busqueda(user, rut=""):
+        partes = [user.username, user.email, user.first_name, user.last_name, rut]
+        return normalizar_busqueda(" ".join(p for p in partes if p))
+
+    def save(self, *args, **kwargs):
+        self.busqueda = self.texto_busqueda(self.user, self.rut)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "busqueda" not in update_fields:
+            kwargs["update_fields"] = list(update_fields) + ["busqueda"]
+        super().save(*args, **kwargs)
+
 
 class Cliente(models.Model):
     """
@@ -68,6 +107,10 @@ class Cliente(models.Model):
         verbose_name = "Cliente"
         verbose_name_plural = "Clientes"
         ordering = ["nombre"]
+        indexes = [
+            # Filtro "activo" del admin con el orden por defecto
+            models.Index(fields=["activo", "nombre"], name="cliente_activo_nombre_idx"),
+        ]
 
     def __str__(self):
         return self.nombre
@@ -89,6 +132,7 @@ class Profesional(models.Model):
         max_length=150,
         blank=True,
         help_text="Ej: Prevención de riesgos, Ergonomía, Seguridad industrial, etc.",
+        db_index=True,
     )
     registro_profesional = models.CharField(
         "Registro profesional",
@@ -96,7 +140,7 @@ class Profesional(models.Model):
         blank=True,
         help_text="Número de registro o certificación (si aplica).",
     )
-    disponible = models.BooleanField("Disponible", default=True)
+    disponible = models.BooleanField("Disponible", default=True, db_index=True)
 
     class Meta:
         verbose_name = "Profesional"
@@ -172,17 +216,149 @@ class Clase(models.Model):
         choices=ESTADOS,
         default="PENDIENTE",
     )
+
+    # Nombres para mostrar copiados al guardar, para que el listado no haga
+    # JOIN con clientes, profesionales y usuarios. Si cambia el nombre de
+    # origen, api/signals.py los actualiza con un UPDATE por tabla.
+    cliente_nombre = models.CharField(
+        "Nombre del cliente", max_length=150, blank=True, editable=False
+    )
+    profesional_nombre = models.CharField(
+        "Nombre del profesional", max_length=301, null=True, blank=True, editable=False
+    )
+    solicitante_nombre = models.CharField(
+        "Nombre del solicitante", max_length=301, null=True, blank=True, editable=False
+    )
+
     creado_en = models.DateTimeField("Creado en", auto_now_add=True)
     actualizado_en = models.DateTimeField("Actualizado en", auto_now=True)
 
+    # FK -> columna con su nombre para mostrar
+    NOMBRES = {
+        "cliente": "cliente_nombre",
+        "profesional_asignado": "profesional_nombre",
+        "solicitada_por": "solicitante_nombre",
+    }
+
     class Meta:
         verbose_name = "Clase"
         verbose_name_plural = "Clases"
         ordering = ["-creado_en"]
+        indexes = [
+            # Listado por defecto (más recientes primero)
+            models.Index(fields=["-creado_en"], name="clase_creado_idx"),
+            # Filtro por estado (API y admin) con el mismo orden
+            models.Index(fields=["estado", "-creado_en"], name="clase_estado_creado_idx"),
+            # Carga de trabajo por profesional (ver ProfesionalViewSet ?con_carga=1)
+            models.Index(
+                fields=["profesional_asignado", "estado", "fecha_solicitada"],
+                name="clase_prof_estado_fecha_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.titulo} ({self.get_estado_display()})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Estado leído de la BD: el historial compara contra este valor
+        instancia._estado_original = instancia.__dict__.get("estado")
+        # FKs leídas de la BD: los nombres solo se recalculan si cambian
+        instancia._fks_originales = {
+            fk: instancia.__dict__.get(f"{fk}_id") for fk in cls.NOMBRES
+        }
+        return instancia
+
+    def asignar_nombres(self, fks=NOMBRES):
+        """Copia los nombres para mostrar de las FKs dadas (por defecto todas)."""
+        if "cliente" in fks:
+            self.cliente_nombre = self.cliente.nombre if self.cliente_id else ""
+        if "profesional_asignado" in fks:
+            profesional = self.profesional_asignado
+            self.profesional_nombre = nombre_para_mostrar(profesional.user) if profesional else None
+        if "solicitada_por" in fks:
+            usuario = self.solicitada_por
+            self.solicitante_nombre = nombre_para_mostrar(usuario) if usuario else None
+
+    def save(self, *args, **kwargs):
+        originales = getattr(self, "_fks_originales", None)
+        fks = [
+            fk for fk in self.NOMBRES
+            if originales is None or getattr(self, f"{fk}_id") != originales[fk]
+        ]
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            fks = [fk for fk in fks if fk in update_fields or f"{fk}_id" in update_fields]
+            kwargs["update_fields"] = update_fields | {self.NOMBRES[fk] for fk in fks}
+        self.asignar_nombres(fks)
+        super().save(*args, **kwargs)
+        self._fks_originales = {fk: getattr(self, f"{fk}_id") for fk in self.NOMBRES}
+
+
+class ClaseEvento(models.Model):
+    """
+    Historial de cambios de estado de una Clase (solo se agregan filas).
+    Se escribe vía api/historial.py. Las FK no tienen constraint ni
+    cascada: el historial sobrevive aunque se borre la clase o el usuario.
+    """
+    clase = models.ForeignKey(
+        Clase,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="eventos",
+        verbose_name="Clase",
+    )
+    estado_anterior = models.CharField(
+        "Estado anterior",
+        max_length=20,
+        blank=True,
+        help_text="Vacío cuando el evento es la creación de la clase.",
+    )
+    estado_nuevo = models.CharField("Estado nuevo", max_length=20)
+    profesional = models.ForeignKey(
+        Profesional,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Profesional asignado",
+    )
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Realizado por",
+    )
+    ts = models.DateTimeField("Fecha", default=timezone.now)
+
+    class Meta:
+        verbose_name = "Evento de clase"
+        verbose_name_plural = "Eventos de clases"
+        indexes = [
+            models.Index(fields=["clase", "ts"], name="claseevento_clase_ts_idx"),
+            # id desempata en la paginación por cursor (ts, id)
+            models.Index(fields=["ts", "id"], name="claseevento_ts_idx"),
+            # /api/clases/eventos/?estado=: filtro + mismo orden que el cursor
+            models.Index(fields=["estado_nuevo", "ts", "id"], name="claseevento_estado_ts_idx"),
+        ]
+
+    def __str__(self):
+        return f"Clase {self.clase_id}: {self.estado_anterior or '-'} -> {self.estado_nuevo}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None and not self._state.adding:
+            raise ValueError("El historial de clases no se puede modificar.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("El historial de clases no se puede borrar.")
+
 class SystemConfig(models.Model):
     """
     Configuración global del sistema (solo debe existir un registro).
@@ -253,3 +429,61 @@ class SystemConfig(models.Model):
     def __str__(self):
         return self.nombre_sistema or "Configuración del sistema"
 
+
+
+class Trabajo(models.Model):
+    """
+    Trabajo en segundo plano (cola en la propia BD, ver api/trabajos.py).
+    Se encola con un INSERT y lo ejecuta `manage.py run_worker`.
+    """
+    PENDIENTE = "PENDIENTE"
+    EN_CURSO = "EN_CURSO"
+    COMPLETADO = "COMPLETADO"
+    FALLIDO = "FALLIDO"
+    ESTADOS = [
+        (PENDIENTE, "Pendiente"),
+        (EN_CURSO, "En curso"),
+        (COMPLETADO, "Completado"),
+        (FALLIDO, "Fallido"),
+    ]
+
+    tarea = models.CharField("Tarea", max_length=100)
+    argumentos = models.JSONField("Argumentos", default=dict, blank=True)
+    prioridad = models.SmallIntegerField(
+        "Prioridad",
+        default=0,
+        help_text="Mayor número = se ejecuta antes.",
+    )
+    estado = models.CharField(
+        "Estado",
+        max_length=20,
+        choices=ESTADOS,
+        default=PENDIENTE,
+    )
+    ejecutar_desde = models.DateTimeField(
+        "Ejecutar desde",
+        default=timezone.now,
+        help_text="No se ejecuta antes de esta fecha (programados y reintentos).",
+    )
+    intentos = models.PositiveSmallIntegerField("Intentos", default=0)
+    max_intentos = models.PositiveSmallIntegerField("Máximo de intentos", default=3)
+    tomado_por = models.CharField("Tomado por", max_length=64, blank=True)
+    tomado_en = models.DateTimeField("Tomado en", null=True, blank=True)
+    ultimo_error = models.TextField("Último error", blank=True)
+    creado_en = models.DateTimeField("Creado en", auto_now_add=True)
+    terminado_en = models.DateTimeField("Terminado en", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Trabajo"
+        verbose_name_plural = "Trabajos"
+        ordering = ["-prioridad", "ejecutar_desde", "id"]
+        indexes = [
+            # Búsqueda del próximo trabajo a tomar
+            models.Index(
+                fields=["estado", "-prioridad", "ejecutar_desde"],
+                name="trabajo_siguiente_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tarea} #{self.pk} ({self.get_estado_display()})"
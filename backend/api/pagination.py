@@ -0,0 +1,31 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class PaginacionOpcional(PageNumberPagination):
+    """
+    Paginación por número de página, solo si el cliente la pide.
+
+    - Sin ?page=  -> se devuelve la lista completa (compatibilidad).
+    - Con ?page=N -> {"count", "next", "previous", "results"}.
+    ?page_size= permite ajustar el tamaño (máximo max_page_size).
+    """
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_query_param not in request.query_params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class PaginacionCursorEventos(CursorPagination):
+    """
+    Paginación por cursor para el historial de clases (ClaseEvento).
+    No hace COUNT ni OFFSET: cada página es un rango sobre el índice (ts, id),
+    así que cuesta lo mismo en la primera página que en la millonésima.
+    """
+    ordering = ("ts", "id")
+    page_size = 100
+    page_size_query_param = "limite"
+    max_page_size = 1000
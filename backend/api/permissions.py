@@ -0,0 +1,177 @@
+"""
+Permisos por rol.
+
+La matriz PERMISOS declara, por recurso (viewset o vista), qué acciones
+puede ejecutar cada rol. Al importar el módulo se compila en un set de
+tuplas (rol, recurso, acción), así cada chequeo es una búsqueda O(1).
+
+ALCANCE define qué filas ve cada rol dentro de un recurso; se aplica en
+get_queryset para que el filtrado lo haga la base de datos. CAMPOS_ESCRIBIBLES
+limita qué campos puede cambiar un rol en las acciones que tiene permitidas.
+"""
+from rest_framework import exceptions, permissions
+
+
+ADMIN = "ADMIN"
+CLIENTE = "CLIENTE"
+PROFESIONAL = "PROFESIONAL"
+ANONIMO = "ANONIMO"
+
+TODAS = "*"
+LECTURA = ("list", "retrieve")
+
+# recurso -> rol -> acciones permitidas
+PERMISOS = {
+    "usuarios": {
+        ADMIN: TODAS,
+    },
+    "clientes": {
+        ADMIN: TODAS,
+        CLIENTE: LECTURA,
+        PROFESIONAL: LECTURA,
+    },
+    "profesionales": {
+        ADMIN: TODAS,
+        PROFESIONAL: LECTURA + ("me",),
+    },
+    "clases": {
+        ADMIN: TODAS,
+        CLIENTE: LECTURA + ("create", "historial"),
+        PROFESIONAL: LECTURA + ("partial_update", "historial"),
+    },
+    "config": {
+        ADMIN: TODAS,
+        CLIENTE: ("retrieve",),
+        PROFESIONAL: ("retrieve",),
+    },
+    "metricas": {
+        ADMIN: TODAS,
+    },
+    "dashboard_admin": {
+        ADMIN: ("retrieve",),
+    },
+    "dashboard_profesional": {
+        PROFESIONAL: ("retrieve",),
+    },
+    "dashboard_cliente": {
+        CLIENTE: ("retrieve",),
+    },
+}
+
+
+def _compilar(matriz):
+    tabla = set()
+    for recurso, por_rol in matriz.items():
+        for rol, acciones in por_rol.items():
+            if acciones == TODAS:
+                acciones = (TODAS,)
+            # OPTIONS (acción "metadata" en los ViewSet): cualquier rol con
+            # algún permiso sobre el recurso; DRF solo describe las acciones
+            # que el rol puede ejecutar
+            for accion in (*acciones, "metadata"):
+                tabla.add((rol, recurso, accion))
+    return frozenset(tabla)
+
+
+_TABLA = _compilar(PERMISOS)
+
+
+def puede(rol, recurso, accion):
+    """¿El rol puede ejecutar la acción sobre el recurso?"""
+    return (rol, recurso, accion) in _TABLA or (rol, recurso, TODAS) in _TABLA
+
+
+def rol_de(request):
+    """
+    Rol efectivo del usuario del request (ADMIN, CLIENTE, PROFESIONAL o
+    ANONIMO). Se calcula una sola vez y queda guardado en el request.
+    is_staff cuenta como ADMIN aunque el perfil diga otra cosa.
+    """
+    rol = getattr(request, "_rol_resuelto", None)
+    if rol is not None:
+        return rol
+
+    user = request.user
+    if not user or not user.is_authenticated:
+        rol = ANONIMO
+    elif user.is_staff:
+        rol = ADMIN
+    else:
+        profile = getattr(user, "profile", None)
+        rol = getattr(profile, "rol", None) or CLIENTE
+
+    request._rol_resuelto = rol
+    return rol
+
+
+# Acción equivalente para vistas que no son ViewSet
+_ACCION_POR_METODO = {
+    "GET": "retrieve",
+    "HEAD": "retrieve",
+    "OPTIONS": "retrieve",
+    "POST": "create",
+    "PUT": "update",
+    "PATCH": "partial_update",
+    "DELETE": "destroy",
+}
+
+
+class PermisoPorRol(permissions.BasePermission):
+    """
+    Permiso DRF basado en PERMISOS.
+    La vista debe declarar `recurso = "<nombre>"`.
+    """
+    message = "Tu rol no tiene permiso para realizar esta acción."
+
+    def has_permission(self, request, view):
+        accion = getattr(view, "action", None) or _ACCION_POR_METODO.get(request.method)
+        return puede(rol_de(request), view.recurso, accion)
+
+
+# recurso -> rol -> función(queryset, user) que restringe las filas visibles.
+# Los roles que no aparecen ven todo lo que su permiso les deja ver.
+ALCANCE = {
+    "clientes": {
+        CLIENTE: lambda qs, user: qs.filter(usuario=user),
+        PROFESIONAL: lambda qs, user: qs.filter(
+            clases__profesional_asignado__user=user
+        ).distinct(),
+    },
+    "clases": {
+        CLIENTE: lambda qs, user: qs.filter(cliente__usuario=user),
+        PROFESIONAL: lambda qs, user: qs.filter(profesional_asignado__user=user),
+    },
+}
+
+
+def filtrar_por_rol(qs, request, recurso):
+    """Aplica a `qs` el alcance del rol del request para el recurso."""
+    filtro = ALCANCE.get(recurso, {}).get(rol_de(request))
+    if filtro is None:
+        return qs
+    return filtro(qs, request.user)
+
+
+# recurso -> rol -> campos del modelo que el rol puede modificar.
+# Los roles que no aparecen escriben todo lo que acepta el serializer.
+CAMPOS_ESCRIBIBLES = {
+    "clases": {
+        # El profesional solo avanza el estado de sus clases
+        PROFESIONAL: frozenset({"estado"}),
+    },
+}
+
+
+def validar_campos(serializer, request, recurso):
+    """
+    Rechaza (403) el guardado si `serializer.validated_data` trae campos que
+    el rol del request no puede modificar en el recurso.
+    """
+    permitidos = CAMPOS_ESCRIBIBLES.get(recurso, {}).get(rol_de(request))
+    if permitidos is None:
+        return
+    prohibidos = sorted(set(serializer.validated_data) - permitidos)
+    if prohibidos:
+        raise exceptions.PermissionDenied(
+            f"Tu rol no puede modificar: {', '.join(prohibidos)}."
+        )
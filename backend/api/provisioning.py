@@ -0,0 +1,212 @@
+"""
+Alta masiva de profesionales (User + UserProfile + Profesional).
+
+Se usa desde el endpoint POST /api/profesionales/bulk/ y desde el comando
+`manage.py provisionar_profesionales`. Todo el lote se valida primero y
+luego se inserta con bulk_create dentro de una única transacción. Si entre
+la validación y el INSERT otro request crea uno de los usernames, el
+IntegrityError se traduce en el mismo error por fila.
+"""
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+
+from . import cache_respuestas
+from .models import UserProfile, Profesional
+from .serializers import ProfesionalBulkItemSerializer
+
+
+# Hilos para calcular los hashes (PBKDF2 libera el GIL dentro de hashlib)
+HASH_WORKERS = 8
+
+# Tamaño de lote para los INSERT
+BATCH_SIZE = 500
+
+
+def leer_csv(archivo):
+    """
+    Convierte un CSV (texto, bytes o archivo) en una lista de dicts.
+    La primera fila debe traer los nombres de columna
+    (username, password, first_name, last_name, email, rut, ...).
+    Si el archivo no es un CSV UTF-8 legible lanza ValueError.
+    """
+    if hasattr(archivo, "read"):
+        archivo = archivo.read()
+    if isinstance(archivo, bytes):
+        try:
+            archivo = archivo.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise ValueError("El archivo CSV debe estar codificado en UTF-8.")
+
+    lector = csv.DictReader(io.StringIO(archivo))
+    filas = []
+    try:
+        for fila in lector:
+            # Columnas vacías -> no se envían, para que apliquen los defaults
+            filas.append({
+                k.strip(): v.strip()
+                for k, v in fila.items()
+                if k and v not in (None, "")
+            })
+    except csv.Error as exc:
+        raise ValueError(f"CSV inválido (línea {lector.line_num}): {exc}")
+    return filas
+
+
+def _hashear(passwords):
+    if len(passwords) < 2:
+        return [make_password(p) for p in passwords]
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+        return list(pool.map(make_password, passwords))
+
+
+_YA_EXISTE = {"username": ["Este nombre de usuario ya existe."]}
+
+
+def _sin_existentes(validas, errores):
+    """Quita de `validas` los usernames que ya están en la BD (una consulta IN) y los agrega a `errores`."""
+    existentes = set(
+        User.objects.filter(
+            username__in=[d["username"] for _, d in validas]
+        ).values_list("username", flat=True)
+    )
+    if not existentes:
+        return validas
+    errores.extend(
+        {"fila": i, "errores": _YA_EXISTE}
+        for i, d in validas
+        if d["username"] in existentes
+    )
+    errores.sort(key=lambda e: e["fila"])
+    return [(i, d) for i, d in validas if d["username"] not in existentes]
+
+
+def provisionar_profesionales(filas, parcial=False):
+    """
+    Crea profesionales en bloque.
+
+    Devuelve (creados, errores):
+    - creados: lista de instancias Profesional (con .user cargado).
+    - errores: lista de {"fila": <índice>, "errores": {...}}.
+
+    Si hay errores y parcial=False no se crea nada.
+    Con parcial=True se crean solo las filas válidas.
+    En ambos casos la inserción es atómica: si falla un INSERT,
+    no queda ningún usuario a medio crear.
+    """
+    errores = []
+    validas = []
+
+    # 1) Validación por fila (sin consultas a la BD)
+    for i, fila in enumerate(filas):
+        serializer = ProfesionalBulkItemSerializer(data=fila)
+        if serializer.is_valid():
+            validas.append((i, serializer.validated_data))
+        else:
+            errores.append({"fila": i, "errores": serializer.errors})
+
+    # 2) Usernames repetidos dentro del mismo lote
+    vistos = set()
+    sin_repetir = []
+    for i, datos in validas:
+        if datos["username"] in vistos:
+            errores.append({
+                "fila": i,
+                "errores": {"username": ["Nombre de usuario repetido en el lote."]},
+            })
+        else:
+            vistos.add(datos["username"])
+            sin_repetir.append((i, datos))
+    validas = sin_repetir
+
+    # 3) Usernames ya existentes
+    errores.sort(key=lambda e: e["fila"])
+    validas = _sin_existentes(validas, errores)
+
+    if (errores and not parcial) or not validas:
+        return [], errores
+
+    # 4) Hash de contraseñas en paralelo (fuera de la transacción)
+    hashes = dict(zip(
+        (d["username"] for _, d in validas),
+        _hashear([d["password"] for _, d in validas]),
+    ))
+
+    # 5) Inserción en bloque, todo o nada
+    while True:
+        try:
+            return _insertar(validas, hashes), errores
+        except IntegrityError:
+            # Alguien creó uno de estos usernames después del paso 3
+            restantes = _sin_existentes(validas, errores)
+            if len(restantes) == len(validas):
+                raise
+            validas = restantes
+            if not parcial or not validas:
+                return [], errores
+
+
+def _insertar(validas, hashes):
+    usuarios = [
+        User(
+            username=d["username"],
+            password=hashes[d["username"]],
+            first_name=d.get("first_name", ""),
+            last_name=d.get("last_name", ""),
+            email=d.get("email", ""),
+        )
+        for _, d in validas
+    ]
+
+    with transaction.atomic():
+        User.objects.bulk_create(usuarios, batch_size=BATCH_SIZE)
+
+        # Backends sin RETURNING no devuelven las pk: las buscamos
+        if any(u.pk is None for u in usuarios):
+            ids = dict(
+                User.objects.filter(
+                    username__in=[u.username for u in usuarios]
+                ).values_list("username", "id")
+            )
+            for u in usuarios:
+                u.pk = ids[u.username]
+
+        UserProfile.objects.bulk_create(
+            [
+                UserProfile(
+                    user=u,
+                    rut=d.get("rut", ""),
+                    telefono=d.get("telefono", ""),
+                    direccion=d.get("direccion", ""),
+                    rol="PROFESIONAL",
+                    # bulk_create no llama a save(): calculamos el texto aquí
+                    busqueda=UserProfile.texto_busqueda(u, d.get("rut", "")),
+                )
+                for u, (_, d) in zip(usuarios, validas)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+        profesionales = Profesional.objects.bulk_create(
+            [
+                Profesional(
+                    user=u,
+                    especialidad=d.get("especialidad", ""),
+                    registro_profesional=d.get("registro_profesional", ""),
+                    disponible=d.get("disponible", True),
+                )
+                for u, (_, d) in zip(usuarios, validas)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+        # bulk_create no dispara signals: invalidamos la caché de respuestas
+        transaction.on_commit(
+            lambda: cache_respuestas.invalidar("usuarios", "profesionales")
+        )
+
+    return profesionales
@@ -0,0 +1,168 @@
+"""
+Renderer JSON rápido para la API.
+
+Si `orjson` está instalado se usa para serializar (datetime, date, time,
+UUID y dict/list nativos, en C). Si no, se usa la librería estándar con un
+encoder precompilado y reutilizado entre requests. La salida es la misma que
+la del JSONRenderer de DRF: compacta, UTF-8 y con U+2028/U+2029 escapados.
+"""
+
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+from .instrumentacion import medir
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+
+_ENCODER = JSONEncoder()
+
+# Un solo encoder para todos los requests (json.dumps crea uno por llamada)
+_ENCODER_COMPACTO = JSONEncoder(
+    ensure_ascii=False,
+    allow_nan=False,
+    separators=(",", ":"),
+)
+
+_U2028 = "\u2028".encode()
+_U2029 = "\u2029".encode()
+
+
+def _default(obj):
+    # Decimal, lazy strings, QuerySet, etc.: lo mismo que hace DRF
+    return _ENCODER.default(obj)
+
+
+def _escapar_separadores(ret):
+    # Igual que DRF: JSON que también sea un subconjunto estricto de JavaScript
+    if _U2028 in ret or _U2029 in ret:
+        ret = ret.replace(_U2028, b"\\u2028").replace(_U2029, b"\\u2029")
+    return ret
+
+
+def dumps(data):
+    """Serializa `data` a bytes JSON compactos con el backend más rápido disponible."""
+    if orjson is not None:
+        ret = orjson.dumps(
+            data,
+            default=_default,
+            option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+        )
+    else:
+        ret = _ENCODER_COMPACTO.encode(data).encode()
+    return _escapar_separadores(ret)
+
+
+class JSONRendererRapido(JSONRenderer):
+    """
+    JSONRenderer con backend rápido.
+    Con indentación (ej. `Accept: application/json; indent=4`) o con
+    UNICODE_JSON/COMPACT_JSON/STRICT_JSON cambiados, delega en DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        with medir("render"):
+            indent = self.get_indent(accepted_media_type, renderer_context or {})
+            if indent is not None or self.ensure_ascii or not self.compact or not self.strict:
+                return super().render(data, accepted_media_type, renderer_context)
+
+            return dumps(data)
+
+
+class NDJSONRenderer(JSONRendererRapido):
+    """
+    application/x-ndjson: un objeto JSON por línea. Los listados grandes se
+    mandan en streaming (ver api/streaming.py); esto cubre el resto de las
+    respuestas (detalle, errores) pedidas con el mismo Accept.
+    """
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        filas = data if isinstance(data, list) else [data]
+        return b"".join(dumps(fila) + b"\n" for fila in filas)
+
+
+def a_columnas(filas, diccionario=()):
+    """
+    Lista de dicts -> {"columnas", "filas", "diccionarios"}.
+
+    Las claves se mandan una sola vez y cada fila es una lista de valores en
+    ese orden. Las columnas de `diccionario` (strings muy repetidos, como
+    estado o nombres de cliente) se reemplazan por el índice del valor en
+    diccionarios[columna]; null queda null.
+    """
+    if not filas:
+        return {"columnas": [], "filas": [], "diccionarios": {}}
+    columnas = list(filas[0])
+    codificadas = [c for c in columnas if c in diccionario]
+    indices = {c: {} for c in codificadas}
+    posiciones = [(i, indices[c]) for i, c in enumerate(columnas) if c in indices]
+
+    salida = []
+    for fila in filas:
+        valores = [fila[c] for c in columnas]
+        for i, valores_columna in posiciones:
+            valor = valores[i]
+            if valor is not None:
+                valores[i] = valores_columna.setdefault(valor, len(valores_columna))
+        salida.append(valores)
+
+    return {
+        "columnas": columnas,
+        "filas": salida,
+        # dict conserva el orden de inserción: la posición es el índice
+        "diccionarios": {c: list(indices[c]) for c in codificadas},
+    }
+
+
+def _es_listado(data):
+    """Lista de dicts (o vacía): lo único que a_columnas sabe convertir."""
+    return isinstance(data, list) and (not data or isinstance(data[0], dict))
+
+
+class ColumnarRenderer(JSONRendererRapido):
+    """
+    application/vnd.nma.columnar+json (o ?formato=columnar): los listados van
+    en columnas (ver a_columnas). Las columnas codificadas con diccionario
+    salen del atributo `columnas_diccionario` de la vista. Con paginación se
+    convierte solo "results"; el detalle y los errores van como JSON normal.
+    """
+    media_type = "application/vnd.nma.columnar+json"
+    format = "columnar"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        view = renderer_context.get("view")
+        respuesta = renderer_context.get("response")
+        if respuesta is not None and respuesta.status_code >= 400:
+            # Errores (ej. ["..."] de un ValidationError) van tal cual
+            return super().render(data, accepted_media_type, renderer_context)
+        diccionario = getattr(view, "columnas_diccionario", ())
+        if _es_listado(data):
+            data = a_columnas(data, diccionario)
+        elif isinstance(data, dict) and _es_listado(data.get("results")):
+            data = {**data, "results": a_columnas(data["results"], diccionario)}
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class NegociacionConFormato(DefaultContentNegotiation):
+    """
+    Acepta ?formato=<format del renderer> además de ?format=. Un ?formato=
+    desconocido se ignora (decide el Accept) en vez de responder 404.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        formato = request.query_params.get("formato")
+        if not format_suffix and formato in {r.format for r in renderers}:
+            format_suffix = formato
+        return super().select_renderer(request, renderers, format_suffix)
@@ -0,0 +1,114 @@
+"""
+Lecturas en réplicas (DATABASE_REPLICA_URLS) con "read-your-writes".
+
+- ReplicasMiddleware marca cada request: GET/HEAD/OPTIONS pueden leer de
+  una réplica; cualquier otro método usa la primaria para todo.
+- RouterReplicas manda las lecturas marcadas a una réplica al azar y todo
+  lo demás (escrituras, transacciones abiertas, comandos, workers) a
+  "default".
+- Pegado a la primaria: tras un request de escritura, el mismo cliente
+  (token Authorization, cookie de sesión o IP) lee de la primaria durante
+  REPLICAS_VENTANA_SEGUNDOS, para ver sus propios cambios aunque la réplica
+  vaya atrasada. La marca vive en la caché (compartida entre workers con
+  DJANGO_CACHE_BACKEND=compartida). Si un GET escribe algo, el resto de
+  ese request también pasa a la primaria.
+- leyo_de_replica() dice si el request actual leyó de una réplica: la
+  caché de respuestas no guarda esas respuestas, que pueden ser anteriores
+  a una escritura que ya cambió la generación (ver api/cache_respuestas.py).
+
+Sin réplicas configuradas el router no interviene y el middleware solo
+llama a la vista.
+
+Para probarlo en local con dos archivos SQLite y retraso simulado, ver
+`manage.py replicar_sqlite`.
+"""
+import contextvars
+import hashlib
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+PRIMARIA = "default"
+
+# True: este contexto puede leer de réplicas. Fuera de un request (comandos,
+# workers, shell) vale False y todo va a la primaria.
+_puede_leer_replica = contextvars.ContextVar("puede_leer_replica", default=False)
+
+# True: este request ya leyó algo de una réplica
+_leyo_replica = contextvars.ContextVar("leyo_replica", default=False)
+
+
+def replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def leyo_de_replica():
+    return _leyo_replica.get()
+
+
+def _cache():
+    return caches[getattr(settings, "REPLICAS_CACHE_ALIAS", "default")]
+
+
+def _clave_cliente(request):
+    origen = (
+        request.META.get("HTTP_AUTHORIZATION")
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        or request.META.get("REMOTE_ADDR", "")
+    )
+    return "api:replicas:pegado:" + hashlib.sha1(origen.encode()).hexdigest()
+
+
+class RouterReplicas:
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if not aliases or not _puede_leer_replica.get():
+            return PRIMARIA
+        # Dentro de una transacción se lee lo que ella misma escribió
+        if connections[PRIMARIA].in_atomic_block:
+            return PRIMARIA
+        _leyo_replica.set(True)
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        # Lo que venga después en este request debe ver esta escritura
+        if _puede_leer_replica.get():
+            _puede_leer_replica.set(False)
+        return PRIMARIA
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primaria y réplicas tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas se migran por replicación, no con migrate
+        return db not in replicas()
+
+
+class ReplicasMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.ventana = getattr(settings, "REPLICAS_VENTANA_SEGUNDOS", 5)
+
+    def __call__(self, request):
+        if not replicas():
+            return self.get_response(request)
+
+        clave = _clave_cliente(request)
+        lectura = request.method in SAFE_METHODS
+        # Una escritura reciente de este cliente lo deja en la primaria
+        token = _puede_leer_replica.set(lectura and not _cache().get(clave))
+        token_leyo = _leyo_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            _puede_leer_replica.reset(token)
+            _leyo_replica.reset(token_leyo)
+
+        if not lectura:
+            _cache().set(clave, True, timeout=self.ventana)
+        return response
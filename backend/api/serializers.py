@@ -1,15 +1,16 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import UserProfile, Cliente, Profesional, Clase, SystemConfig
+from .instrumentacion import SerializacionMedida
+from .models import UserProfile, Cliente, Profesional, Clase, ClaseEvento, SystemConfig
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SerializacionMedida, serializers.ModelSerializer):
     class Meta:
         model = UserProfile
         fields = ["rut", "telefono", "rol"]
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SerializacionMedida, serializers.ModelSerializer):
     profile = UserProfileSerializer(read_only=True)
 
     class Meta:
@@ -17,7 +18,7 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ["id", "username", "first_name", "last_name", "email", "profile"]
 
 
-class UserAdminSerializer(serializers.ModelSerializer):
+class UserAdminSerializer(SerializacionMedida, serializers.ModelSerializer):
     # Campos del perfil (UserProfile)
     rut = serializers.CharField(
         source="profile.rut",
@@ -120,13 +121,13 @@ class UserAdminSerializer(serializers.ModelSerializer):
         return instance
 
 
-class ClienteSerializer(serializers.ModelSerializer):
+class ClienteSerializer(SerializacionMedida, serializers.ModelSerializer):
     class Meta:
         model = Cliente
         fields = "__all__"
 
 
-class ProfesionalSerializer(serializers.ModelSerializer):
+class ProfesionalSerializer(SerializacionMedida, serializers.ModelSerializer):
     username = serializers.CharField(source="user.username", read_only=True)
     nombre_completo = serializers.SerializerMethodField()
     email = serializers.EmailField(source="user.email", read_only=True)
@@ -152,15 +153,27 @@ class ProfesionalSerializer(serializers.ModelSerializer):
         return full or obj.user.username
 
 
-class ClaseSerializer(serializers.ModelSerializer):
-    cliente_nombre = serializers.CharField(source="cliente.nombre", read_only=True)
-    profesional_nombre = serializers.SerializerMethodField()
-    solicitante_nombre = serializers.SerializerMethodField()
+class ProfesionalCargaSerializer(ProfesionalSerializer):
+    """
+    Profesional + su carga de trabajo.
+    Los contadores vienen anotados en el queryset (ver ProfesionalViewSet).
+    """
+    carga_activa = serializers.IntegerField(read_only=True)
+    clases_proximas = serializers.IntegerField(read_only=True)
+
+    class Meta(ProfesionalSerializer.Meta):
+        fields = ProfesionalSerializer.Meta.fields + ["carga_activa", "clases_proximas"]
+
+
+class ClaseSerializer(SerializacionMedida, serializers.ModelSerializer):
+    # cliente_nombre, profesional_nombre y solicitante_nombre son columnas de
+    # Clase (copiadas al guardar): el listado no necesita select_related.
 
     # Para asignar profesional desde el frontend, enviamos solo el id
     profesional_asignado_id = serializers.PrimaryKeyRelatedField(
         source="profesional_asignado",
-        queryset=Profesional.objects.all(),
+        # Clase.save() copia el nombre del usuario
+        queryset=Profesional.objects.select_related("user"),
         write_only=True,
         required=False,
         allow_null=True,
@@ -196,7 +209,25 @@ class ClaseSerializer(serializers.ModelSerializer):
             "actualizado_en",
         ]
 
-class SystemConfigSerializer(serializers.ModelSerializer):
+
+class ClaseEventoSerializer(SerializacionMedida, serializers.ModelSerializer):
+    actor_username = serializers.CharField(source="actor.username", read_only=True, default=None)
+
+    class Meta:
+        model = ClaseEvento
+        fields = [
+            "id",
+            "clase",
+            "estado_anterior",
+            "estado_nuevo",
+            "profesional",
+            "actor",
+            "actor_username",
+            "ts",
+        ]
+
+
+class SystemConfigSerializer(SerializacionMedida, serializers.ModelSerializer):
     class Meta:
         model = SystemConfig
         fields = [
@@ -216,19 +247,7 @@ class SystemConfigSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "actualizado_en"]
 
 
-    def get_profesional_nombre(self, obj):
-        if obj.profesional_asignado and obj.profesional_asignado.user:
-            u = obj.profesional_asignado.user
-            nombre = u.get_full_name() or u.username
-            return nombre
-        return None
-
-    def get_solicitante_nombre(self, obj):
-        if obj.solicitada_por:
-            return obj.solicitada_por.get_full_name() or obj.solicitada_por.username
-        return None
-
-class RegistroClienteSerializer(serializers.Serializer):
+class RegistroClienteSerializer(SerializacionMedida, serializers.Serializer):
     username = serializers.CharField(max_length=150)
     password = serializers.CharField(write_only=True, min_length=4)
     first_name = serializers.CharField(required=False, allow_blank=True, max_length=150)
@@ -261,7 +280,7 @@ class RegistroClienteSerializer(serializers.Serializer):
 
         return user
 
-class ProfesionalAdminCreateSerializer(serializers.Serializer):
+class ProfesionalAdminCreateSerializer(SerializacionMedida, serializers.Serializer):
     # 🔹 Datos para CREAR (solo entrada, no se leen desde el modelo)
     username = serializers.CharField(max_length=150, write_only=True)
     password = serializers.CharField(write_only=True, min_length=4)
@@ -357,8 +376,19 @@ class ProfesionalAdminCreateSerializer(serializers.Serializer):
 
         return profesional
 
-    
-class ProfesionalDetalleSerializer(serializers.ModelSerializer):
+
+class ProfesionalBulkItemSerializer(ProfesionalAdminCreateSerializer):
+    """
+    Una fila del alta masiva de profesionales.
+    La unicidad del username se valida para todo el lote de una vez
+    (ver api/provisioning.py), no con una consulta por fila.
+    """
+
+    def validate_username(self, value):
+        return value
+
+
+class ProfesionalDetalleSerializer(SerializacionMedida, serializers.ModelSerializer):
     # Campos del usuario
     username = serializers.CharField(source="user.username", read_only=True)
     first_name = serializers.CharField(source="user.first_name", required=False)
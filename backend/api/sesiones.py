@@ -0,0 +1,90 @@
+"""
+Sesiones de Django solo donde hacen falta (admin y API navegable).
+
+- SesionMiddleware: reemplaza a SessionMiddleware. Si el request trae un
+  JWT (Authorization: Bearer ...) no se lee ni se escribe la sesión: el
+  request recibe una SesionVacia, AuthenticationMiddleware resuelve
+  AnonymousUser sin consultar la BD y la respuesta no lleva cookie de
+  sesión ni Vary: Cookie. DRF autentica después con el JWT.
+- El motor se elige con DJANGO_SESSION_ENGINE (ver settings): db, cache,
+  cached_db o firmada (cookie firmada, sin nada en el servidor).
+- purgar_sesiones_vencidas(): borra las sesiones vencidas de la BD en lotes
+  (`manage.py purgar_sesiones` o la tarea purgar_sesiones).
+"""
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import SessionBase
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+
+# Motores que guardan las sesiones en la tabla django_session
+MOTORES_BD = (
+    "django.contrib.sessions.backends.db",
+    "django.contrib.sessions.backends.cached_db",
+)
+
+
+def es_jwt(request):
+    partes = request.META.get("HTTP_AUTHORIZATION", "").split(None, 1)
+    return len(partes) == 2 and partes[0] in jwt_settings.AUTH_HEADER_TYPES
+
+
+class SesionVacia(SessionBase):
+    """Sesión de un request autenticado con JWT: siempre vacía, nunca se guarda."""
+
+    def exists(self, session_key):
+        return False
+
+    def create(self):
+        pass
+
+    def save(self, must_create=False):
+        pass
+
+    def delete(self, session_key=None):
+        pass
+
+    def load(self):
+        return {}
+
+
+class SesionMiddleware(SessionMiddleware):
+    def process_request(self, request):
+        if es_jwt(request):
+            request.session = SesionVacia()
+            return
+        super().process_request(request)
+
+    def process_response(self, request, response):
+        if isinstance(getattr(request, "session", None), SesionVacia):
+            return response
+        return super().process_response(request, response)
+
+
+def purga_aplica():
+    return settings.SESSION_ENGINE in MOTORES_BD
+
+
+def purgar_sesiones_vencidas(lote=1000, pausa=0.0):
+    """
+    Borra las sesiones vencidas de django_session de a `lote` filas (cada
+    lote en su propia transacción, para no bloquear la tabla), con `pausa`
+    segundos entre lotes. Devuelve cuántas borró.
+    """
+    from django.contrib.sessions.models import Session
+
+    ahora = timezone.now()
+    total = 0
+    while True:
+        claves = list(
+            Session.objects.filter(expire_date__lt=ahora)
+            .values_list("session_key", flat=True)[:lote]
+        )
+        if not claves:
+            return total
+        total += Session.objects.filter(session_key__in=claves).delete()[0]
+        if pausa:
+            time.sleep(pausa)
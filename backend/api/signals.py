@@ -1,36 +1,122 @@
-from django.db.models.signals import post_migrate
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 
-from .models import UserProfile
+from . import cache_respuestas, historial
+from .config import invalidar_config
+from .models import UserProfile, SystemConfig, Cliente, Profesional, Clase, nombre_para_mostrar
+from .sqlite import configurar_conexion
 
 
-@receiver(post_migrate)
-def crear_usuarios_por_defecto(sender, **kwargs):
+# Campos de User que forman parte de UserProfile.busqueda
+CAMPOS_BUSQUEDA_USER = {"username", "email", "first_name", "last_name"}
+
+# Campos de User que forman nombre_para_mostrar()
+CAMPOS_NOMBRE_USER = {"username", "first_name", "last_name"}
+
+
+@receiver(post_save, sender=User)
+def actualizar_busqueda_perfil(sender, instance, created, update_fields=None, **kwargs):
   """
-  Crea usuarios admin por defecto si no existen:
-  - admin / admin
-  - admin_2 / admin_2
-  Solo se ejecuta cuando se migran modelos de la app 'api'.
+  Mantiene al día UserProfile.busqueda cuando cambian los datos del usuario.
+  Los guardados parciales que no tocan esos campos (ej. last_login) se ignoran.
   """
-  if sender.name != "api":
+  if created:
+      return
+  if update_fields is not None and not CAMPOS_BUSQUEDA_USER & set(update_fields):
       return
 
-  usuarios_admin = [
-      ("admin", "admin"),
-      ("admin_2", "admin_2"),
-  ]
-
-  for username, password in usuarios_admin:
-      if not User.objects.filter(username=username).exists():
-          user = User.objects.create_superuser(
-              username=username,
-              email=f"{username}@nomasaccidentes.local",
-              password=password,
-          )
-          # Crear/actualizar perfil con rol ADMIN
-          UserProfile.objects.update_or_create(
-              user=user,
-              defaults={"rol": "ADMIN"},
-          )
-          print(f"⚙️ Usuario admin creado: {username}")
+  profile = UserProfile.objects.filter(user=instance).only("rut").first()
+  if profile is None:
+      return
+  UserProfile.objects.filter(pk=profile.pk).update(
+      busqueda=UserProfile.texto_busqueda(instance, profile.rut)
+  )
+
+
+@receiver(post_save, sender=Cliente)
+def propagar_nombre_cliente(sender, instance, created, update_fields=None, **kwargs):
+  """Actualiza Clase.cliente_nombre (un UPDATE) si cambió el nombre del cliente."""
+  if created or (update_fields is not None and "nombre" not in update_fields):
+      return
+  Clase.objects.filter(cliente_id=instance.pk).exclude(
+      cliente_nombre=instance.nombre
+  ).update(cliente_nombre=instance.nombre)
+
+
+@receiver(post_save, sender=User)
+def propagar_nombre_usuario(sender, instance, created, update_fields=None, **kwargs):
+  """Actualiza solicitante_nombre y profesional_nombre de sus clases si cambió su nombre."""
+  if created or (update_fields is not None and not CAMPOS_NOMBRE_USER & set(update_fields)):
+      return
+  nombre = nombre_para_mostrar(instance)
+  Clase.objects.filter(solicitada_por_id=instance.pk).exclude(
+      solicitante_nombre=nombre
+  ).update(solicitante_nombre=nombre)
+  Clase.objects.filter(profesional_asignado__user_id=instance.pk).exclude(
+      profesional_nombre=nombre
+  ).update(profesional_nombre=nombre)
+
+
+@receiver(pre_delete, sender=Profesional)
+def limpiar_nombre_profesional(sender, instance, **kwargs):
+  """profesional_asignado queda en NULL (SET_NULL): el nombre también."""
+  Clase.objects.filter(profesional_asignado_id=instance.pk).update(profesional_nombre=None)
+
+
+@receiver(pre_delete, sender=User)
+def limpiar_nombre_solicitante(sender, instance, **kwargs):
+  """solicitada_por queda en NULL (SET_NULL): el nombre también."""
+  Clase.objects.filter(solicitada_por_id=instance.pk).update(solicitante_nombre=None)
+
+
+@receiver(post_save, sender=SystemConfig)
+@receiver(post_delete, sender=SystemConfig)
+def invalidar_memo_config(sender, **kwargs):
+  """Cualquier cambio en SystemConfig invalida el memo de todos los workers."""
+  # Tras el commit, para que nadie recargue la fila vieja con la versión nueva
+  transaction.on_commit(invalidar_config)
+
+
+@receiver(post_save, sender=Clase)
+def registrar_cambio_estado(sender, instance, created, update_fields=None, **kwargs):
+  """Agrega un ClaseEvento (diferido, ver api/historial.py) si cambió el estado."""
+  if update_fields is not None and "estado" not in update_fields:
+      return
+  anterior = None if created else getattr(instance, "_estado_original", None)
+  if created or anterior != instance.estado:
+      historial.registrar(instance, anterior)
+  instance._estado_original = instance.estado
+
+
+# Modelo -> recurso de la caché de respuestas cuya generación cambia
+RECURSO_POR_MODELO = {
+  Cliente: "clientes",
+  Profesional: "profesionales",
+  Clase: "clases",
+  User: "usuarios",
+  UserProfile: "usuarios",
+  SystemConfig: "config",
+}
+
+
+def invalidar_respuestas(sender, update_fields=None, **kwargs):
+  """Nueva generación del recurso en la caché de respuestas (ver api/cache_respuestas.py)."""
+  # Guardar solo last_login (cada login) no cambia ninguna respuesta
+  if update_fields is not None and set(update_fields) <= {"last_login"}:
+      return
+  recurso = RECURSO_POR_MODELO[sender]
+  transaction.on_commit(lambda: cache_respuestas.invalidar(recurso))
+
+
+for _modelo in RECURSO_POR_MODELO:
+  post_save.connect(invalidar_respuestas, sender=_modelo, dispatch_uid=f"respuestas_save_{_modelo.__name__}")
+  post_delete.connect(invalidar_respuestas, sender=_modelo, dispatch_uid=f"respuestas_delete_{_modelo.__name__}")
+
+
+@receiver(connection_created)
+def pragmas_sqlite(sender, connection, **kwargs):
+  """PRAGMAs del perfil de producción de SQLite (ver api/sqlite.py)."""
+  configurar_conexion(connection)
@@ -0,0 +1,98 @@
+"""
+Perfil de producción para SQLite (DJANGO_SQLITE_PRODUCCION=True).
+
+- configurar_conexion(): aplica SQLITE_PRAGMAS (WAL, synchronous=NORMAL,
+  busy_timeout, mmap, caché, temp_store) a cada conexión nueva. Se llama
+  desde el signal connection_created (ver api/signals.py).
+- ReintentoEscrituraSQLiteMiddleware: ejecuta cada request de escritura
+  dentro de una transacción (BEGIN IMMEDIATE, ver settings) y la reintenta
+  si SQLite responde "database is locked".
+"""
+import io
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.http.request import RawPostDataException
+
+from . import idempotencia
+
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def perfil_activo(conn=None):
+    conn = conn or connection
+    return conn.vendor == "sqlite" and getattr(settings, "SQLITE_PRODUCCION", False)
+
+
+def configurar_conexion(conn):
+    """Ejecuta los PRAGMA configurados sobre una conexión SQLite recién abierta."""
+    if not perfil_activo(conn):
+        return
+    with conn.cursor() as cursor:
+        for pragma, valor in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma} = {valor}")
+
+
+def es_bloqueo(exc):
+    mensaje = str(exc).lower()
+    return "database is locked" in mensaje or "database table is locked" in mensaje
+
+
+class ReintentoEscrituraSQLiteMiddleware:
+    """
+    Con SQLite en modo producción, los POST/PUT/PATCH/DELETE corren dentro
+    de transaction.atomic() (que abre BEGIN IMMEDIATE: el lock de escritura
+    se toma al inicio y el busy_timeout espera por él). Si aun así la BD
+    está bloqueada, se reintenta la vista completa con espera exponencial.
+
+    Va al final de MIDDLEWARE: llama a la vista desde process_view.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.reintentos = getattr(settings, "SQLITE_REINTENTOS_ESCRITURA", 3)
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in SAFE_METHODS or not perfil_activo():
+            return None
+
+        cuerpo = self._cuerpo_releible(request)
+        reintentos = self.reintentos if cuerpo is not None else 0
+        espera = 0.05
+
+        for intento in range(reintentos + 1):
+            try:
+                # Si se revierte, el reintento puede volver a tomar la Idempotency-Key
+                with idempotencia.atomic():
+                    return view_func(request, *view_args, **view_kwargs)
+            except OperationalError as exc:
+                if not es_bloqueo(exc) or intento == reintentos:
+                    raise
+            request._stream = io.BytesIO(cuerpo)
+            time.sleep(espera * (1 + random.random()))
+            espera *= 2
+
+    @staticmethod
+    def _cuerpo_releible(request):
+        """
+        Cuerpo del request en memoria, para poder releerlo en cada intento.
+        None si ya se consumió (ej. formularios del admin) o si es demasiado
+        grande para guardarlo: en ese caso no se reintenta.
+        """
+        limite = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        try:
+            largo = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            return None
+        if limite is not None and largo > limite:
+            return None
+        try:
+            return request.body
+        except RawPostDataException:
+            return None
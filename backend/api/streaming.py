@@ -0,0 +1,89 @@
+"""
+Listados completos en streaming, con memoria constante.
+
+    GET /api/clases/?stream=1                      -> un array JSON
+    GET /api/clases/?stream=ndjson                 -> NDJSON (un objeto por línea)
+    GET /api/clases/  Accept: application/x-ndjson -> NDJSON
+
+El queryset se recorre con iterator(chunk_size) (cursor del lado del
+servidor en PostgreSQL, fetchmany en SQLite), cada fila se serializa sola y
+se escribe en bloques de ~BLOQUE_BYTES con StreamingHttpResponse. No se
+arma la lista de instancias, ni la lista de dicts, ni el string completo:
+la memoria del worker no depende de la cantidad de filas.
+
+Se ignora la paginación y no pasa por la caché de respuestas. Los filtros
+(?estado=, ...) y el alcance por rol son los mismos que en el listado normal.
+"""
+from django.http import StreamingHttpResponse
+
+from .renderers import dumps
+
+
+MEDIA_NDJSON = "application/x-ndjson"
+FILAS_POR_LOTE = 500
+BLOQUE_BYTES = 64 * 1024
+
+
+def formato_pedido(request):
+    """'ndjson', 'json' o None si el request no pide streaming."""
+    stream = request.query_params.get("stream", "").lower()
+    if stream == "ndjson" or getattr(request.accepted_renderer, "media_type", "") == MEDIA_NDJSON:
+        return "ndjson"
+    if stream in ("1", "true", "json"):
+        return "json"
+    return None
+
+
+def _bloques(filas, serializador, formato):
+    if formato == "ndjson":
+        inicio, separador, fin = b"", b"\n", b"\n"
+    else:
+        inicio, separador, fin = b"[", b",", b"]"
+
+    bloque = bytearray(inicio)
+    primera = True
+    for fila in filas:
+        if not primera:
+            bloque += separador
+        primera = False
+        bloque += dumps(serializador.to_representation(fila))
+        if len(bloque) >= BLOQUE_BYTES:
+            yield bytes(bloque)
+            bloque.clear()
+    if not primera or formato == "json":
+        bloque += fin
+    if bloque:
+        yield bytes(bloque)
+
+
+def respuesta_streaming(queryset, serializador, formato, chunk_size=FILAS_POR_LOTE):
+    """
+    StreamingHttpResponse con las filas de `queryset` serializadas una a una
+    con `serializador` (una instancia sin datos, reutilizada para cada fila).
+    """
+    # La BD se elige ahora: el cuerpo se genera después de los middlewares
+    # (ver api/replicas.py)
+    queryset = queryset.using(queryset.db)
+    filas = queryset.iterator(chunk_size=chunk_size)
+    respuesta = StreamingHttpResponse(
+        _bloques(filas, serializador, formato),
+        content_type=MEDIA_NDJSON if formato == "ndjson" else "application/json",
+    )
+    # Que nginx no junte todo el cuerpo antes de mandarlo
+    respuesta["X-Accel-Buffering"] = "no"
+    return respuesta
+
+
+class StreamingListMixin:
+    """
+    Mixin para ViewSets: list() responde en streaming con ?stream= o
+    Accept: application/x-ndjson. Va antes de CacheRespuestasMixin.
+    """
+
+    def list(self, request, *args, **kwargs):
+        formato = formato_pedido(request)
+        if formato is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        serializador = self.get_serializer()
+        return respuesta_streaming(queryset, serializador, formato)
@@ -0,0 +1,28 @@
+"""
+Tareas de la cola de trabajos (ver api/trabajos.py).
+Para agregar una: decorarla con @tarea() y encolarla con encolar().
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import Trabajo
+from .sesiones import purga_aplica, purgar_sesiones_vencidas
+from .trabajos import tarea
+
+
+@tarea()
+def purgar_trabajos(dias=30):
+    """Borra los trabajos terminados (completados o fallidos) hace más de `dias` días."""
+    limite = timezone.now() - timedelta(days=dias)
+    Trabajo.objects.filter(
+        estado__in=[Trabajo.COMPLETADO, Trabajo.FALLIDO],
+        terminado_en__lt=limite,
+    ).delete()
+
+
+@tarea()
+def purgar_sesiones(lote=1000):
+    """Borra las sesiones vencidas de la BD en lotes (ver api/sesiones.py)."""
+    if purga_aplica():
+        purgar_sesiones_vencidas(lote)
@@ -1,3 +1,1323 @@
-from django.test import TestCase
+import io
+import json
+import multiprocessing
+import os
+import signal
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, datetime, time as hora, timedelta, timezone as tz
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.client import encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.admin import ClaseAdmin, PaginadorEstimado
+from api.parsers import JSONParserRapido
+from api.renderers import ColumnarRenderer, JSONRendererRapido
+from api.cache_compartida import CacheMemoriaCompartida
+from api.management.commands.bench_arranque import medir_arranque
+from api import (
+    cache_compartida, config, dashboard, historial, idempotencia, instrumentacion, metricas, parsers,
+    provisioning, renderers, trabajos,
+)
+from api.models import Clase, ClaseEvento, Cliente, Profesional, SystemConfig, Trabajo, UserProfile
+from api.provisioning import provisionar_profesionales
+from api.serializers import ClaseSerializer
+from api.replicas import ReplicasMiddleware, RouterReplicas
+from api.sesiones import purgar_sesiones_vencidas
+from api.views import ClaseViewSet
+
+
+def setUpModule():
+    # Las métricas de los requests de prueba no van al METRICAS_DIR real, el
+    # historial se escribe en la transacción del test aunque el entorno pida
+    # el modo diferido y el registro muestreado de la instrumentación no
+    # ensucia la salida
+    global _metricas_dir, _metricas_settings
+    _metricas_dir = tempfile.TemporaryDirectory()
+    _metricas_settings = override_settings(
+        METRICAS_DIR=_metricas_dir.name,
+        HISTORIAL_DIFERIDO=False,
+        INSTRUMENTACION_MUESTREO=0,
+    )
+    _metricas_settings.enable()
+    metricas._registro = None
+
+
+def tearDownModule():
+    metricas._registro = None
+    _metricas_settings.disable()
+    _metricas_dir.cleanup()
+
+
+class ArranqueTests(SimpleTestCase):
+    """El arranque de un worker no debe tocar la BD y debe ser rápido."""
+
+    # Holgado para CI; el valor típico se ve con `manage.py bench_arranque`
+    PRESUPUESTO_SEGUNDOS = 3.0
+
+    def test_arranque_sin_acceso_a_bd(self):
+        segundos, codigo, stderr = medir_arranque(
+            sin_bd=True,
+            env={"DATABASE_URL": "sqlite:////ruta/que/no/existe/db.sqlite3"},
+        )
+        self.assertEqual(codigo, 0, stderr)
+        self.assertLess(segundos, self.PRESUPUESTO_SEGUNDOS)
+
+
+class DatosApi:
+    """Base de los tests contra la API: caché limpia, un admin autenticado con JWT y un cliente."""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin_test", "a@example.com", "x")
+        self.autenticar(self.admin)
+        self.cliente = Cliente.objects.create(nombre="Empresa", rut="1-9")
+
+    def autenticar(self, user):
+        """Los requests siguientes van con el JWT de `user` (None: sin Authorization)."""
+        if user is None:
+            self.client.defaults.pop("HTTP_AUTHORIZATION", None)
+            return
+        token = RefreshToken.for_user(user).access_token
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+
+
+class ApiTestCase(DatosApi, TestCase):
+    pass
+
+
+class CacheRespuestasTests(ApiTestCase):
+    """Las escrituras cambian la generación y el listado deja de venir de caché."""
+
+    def test_invalidacion_por_escritura(self):
+        self.assertEqual(self.client.get("/api/clientes/")["X-Cache"], "MISS")
+        self.assertEqual(self.client.get("/api/clientes/")["X-Cache"], "HIT")
+        self.assertEqual(self.client.get("/api/clientes/?q=1")["X-Cache"], "MISS")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                f"/api/clientes/{self.cliente.pk}/",
+                {"nombre": "Empresa Nueva"},
+                content_type="application/json",
+            )
+
+        respuesta = self.client.get("/api/clientes/")
+        self.assertEqual(respuesta["X-Cache"], "MISS")
+        self.assertEqual(respuesta.json()[0]["nombre"], "Empresa Nueva")
+
+
+class AltaMasivaProfesionalesTests(ApiTestCase):
+    URL = "/api/profesionales/bulk/"
+
+    def _fila(self, username, **extra):
+        return {
+            "username": username, "password": "clave", "first_name": "N",
+            "last_name": "A", "email": f"{username}@example.com", **extra,
+        }
+
+    def _post(self, filas, url=URL):
+        return self.client.post(url, filas, content_type="application/json")
+
+    def test_todo_o_nada_con_errores_por_fila(self):
+        User.objects.create_user("existente")
+        respuesta = self._post([
+            self._fila("p1"),
+            self._fila("p2", email="no-es-email"),
+            self._fila("p1"),
+            self._fila("existente"),
+        ])
+        self.assertEqual(respuesta.status_code, 400)
+        datos = respuesta.json()
+        self.assertEqual(datos["creados"], 0)
+        self.assertEqual([e["fila"] for e in datos["errores"]], [1, 2, 3])
+        self.assertIn("email", datos["errores"][0]["errores"])
+        self.assertIn("repetido", datos["errores"][1]["errores"]["username"][0])
+        self.assertIn("ya existe", datos["errores"][2]["errores"]["username"][0])
+        self.assertFalse(User.objects.filter(username="p1").exists())
+        self.assertEqual(Profesional.objects.count(), 0)
+
+    def test_falla_al_insertar_no_deja_usuarios(self):
+        with mock.patch.object(Profesional.objects, "bulk_create", side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                provisionar_profesionales([self._fila("p1"), self._fila("p2")])
+        self.assertFalse(User.objects.filter(username__in=["p1", "p2"]).exists())
+
+    def test_username_creado_durante_el_alta_es_error_por_fila(self):
+        hashear = provisioning._hashear
+
+        def registro_concurrente(passwords):
+            # Otro request registra "p2" después de la validación
+            User.objects.create_user("p2")
+            return hashear(passwords)
+
+        with mock.patch.object(provisioning, "_hashear", registro_concurrente):
+            respuesta = self._post([self._fila("p1"), self._fila("p2")])
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(
+            respuesta.json()["errores"],
+            [{"fila": 1, "errores": {"username": ["Este nombre de usuario ya existe."]}}],
+        )
+        self.assertFalse(User.objects.filter(username="p1").exists())
+
+        User.objects.filter(username="p2").delete()
+        with mock.patch.object(provisioning, "_hashear", registro_concurrente):
+            creados, errores = provisionar_profesionales([self._fila("p1"), self._fila("p2")], parcial=True)
+        self.assertEqual([p.user.username for p in creados], ["p1"])
+        self.assertEqual([e["fila"] for e in errores], [1])
+
+    def test_parcial_crea_solo_las_validas(self):
+        respuesta = self._post([self._fila("p1"), self._fila("p1")], url=self.URL + "?parcial=1")
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json()["creados"], 1)
+        self.assertEqual(Profesional.objects.get().user.profile.rol, "PROFESIONAL")
+
+    def test_csv(self):
+        csv = "username,password,first_name,last_name,email\np1,clave,Ñandú,A,p1@example.com\n"
+        respuesta = self.client.post(
+            self.URL, {"archivo": SimpleUploadedFile("p.csv", csv.encode("utf-8-sig"))}
+        )
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(User.objects.get(username="p1").first_name, "Ñandú")
+
+        respuesta = self.client.post(
+            self.URL, {"archivo": SimpleUploadedFile("p.csv", csv.replace("p1", "p2").encode("latin-1"))}
+        )
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn("UTF-8", respuesta.json()["detail"])
+
+
+class PermisosPorRolTests(ApiTestCase):
+    """Matriz de permisos (api/permissions.py) y alcance de filas por rol."""
+
+    def setUp(self):
+        super().setUp()
+        self.usuario_cliente = self._usuario("cli", "CLIENTE")
+        self.cliente.usuario = self.usuario_cliente
+        self.cliente.save()
+        otro = Cliente.objects.create(nombre="Otra", rut="2-7")
+        self.usuario_profesional = self._usuario("prof", "PROFESIONAL")
+        self.profesional = Profesional.objects.create(user=self.usuario_profesional)
+        self.propia = Clase.objects.create(
+            titulo="Propia", descripcion="D", cliente=self.cliente,
+            profesional_asignado=self.profesional, estado="ASIGNADA",
+        )
+        self.ajena = Clase.objects.create(titulo="Ajena", descripcion="D", cliente=otro)
+
+    def _usuario(self, username, rol, **extra):
+        user = User.objects.create_user(username, password="x", **extra)
+        UserProfile.objects.create(user=user, rol=rol)
+        return user
+
+    def _titulos(self):
+        return sorted(c["titulo"] for c in self.client.get("/api/clases/").json())
+
+    def _patch(self, clase, datos):
+        return self.client.patch(f"/api/clases/{clase.pk}/", datos, content_type="application/json")
+
+    def test_cliente(self):
+        self.autenticar(self.usuario_cliente)
+        self.assertEqual(self._titulos(), ["Propia"])
+        self.assertEqual(self.client.get(f"/api/clases/{self.ajena.pk}/").status_code, 404)
+        self.assertEqual([c["nombre"] for c in self.client.get("/api/clientes/").json()], ["Empresa"])
+        self.assertEqual(self._patch(self.propia, {"titulo": "X"}).status_code, 403)
+        self.assertEqual(self.client.delete(f"/api/clases/{self.propia.pk}/").status_code, 403)
+        self.assertEqual(self.client.get("/api/usuarios/").status_code, 403)
+        self.assertEqual(self.client.options("/api/clases/").status_code, 200)
+
+        datos = {"titulo": "Nueva", "descripcion": "D", "cliente": self.ajena.cliente_id}
+        self.assertEqual(self.client.post("/api/clases/", datos, content_type="application/json").status_code, 403)
+
+        # estado, profesional y solicitante no los elige el cliente
+        datos.update(
+            cliente=self.cliente.pk, estado="COMPLETADA",
+            profesional_asignado_id=self.profesional.pk, solicitada_por_id=self.admin.pk,
+        )
+        respuesta = self.client.post("/api/clases/", datos, content_type="application/json")
+        self.assertEqual(respuesta.status_code, 201)
+        clase = Clase.objects.get(pk=respuesta.json()["id"])
+        self.assertEqual(
+            (clase.estado, clase.profesional_asignado_id, clase.solicitada_por_id),
+            ("PENDIENTE", None, self.usuario_cliente.pk),
+        )
+
+    def test_profesional(self):
+        self.autenticar(self.usuario_profesional)
+        self.assertEqual(self._titulos(), ["Propia"])
+        self.assertEqual(self._patch(self.ajena, {"estado": "ACEPTADA"}).status_code, 404)
+        self.assertEqual(self._patch(self.propia, {"estado": "ACEPTADA"}).status_code, 200)
+        self.assertEqual(self._patch(self.propia, {"cliente": self.ajena.cliente_id}).status_code, 403)
+        self.assertEqual(self._patch(self.propia, {"profesional_asignado_id": None}).status_code, 403)
+        self.propia.refresh_from_db()
+        self.assertEqual(
+            (self.propia.estado, self.propia.cliente_id, self.propia.profesional_asignado_id),
+            ("ACEPTADA", self.cliente.pk, self.profesional.pk),
+        )
+        self.assertEqual(self.client.post("/api/clases/", {}, content_type="application/json").status_code, 403)
+        self.assertEqual(self.client.get("/api/profesionales/me/").status_code, 200)
+
+    def test_admin_y_anonimo(self):
+        self.assertEqual(self._titulos(), ["Ajena", "Propia"])
+        self.assertEqual(self.client.get("/api/usuarios/").status_code, 200)
+
+        # rol ADMIN sin is_staff: administra la API pero no las cuentas
+        self.autenticar(self._usuario("jefe", "ADMIN"))
+        self.assertEqual(self._titulos(), ["Ajena", "Propia"])
+        self.assertEqual(self.client.get("/api/usuarios/").status_code, 403)
+
+        self.autenticar(None)
+        self.assertEqual(self.client.get("/api/clases/").status_code, 401)
+
+
+class DirectorioUsuariosTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        for username, nombre, rol, activo in [
+            ("mpena", "María Peña", "CLIENTE", True),
+            ("jrojas", "Juan Rojas", "PROFESIONAL", True),
+            ("zeta", "Zoe Peñaloza", "PROFESIONAL", False),
+        ]:
+            nombre, apellido = nombre.split()
+            user = User.objects.create_user(
+                username, email=f"{username}@example.com", first_name=nombre,
+                last_name=apellido, is_active=activo,
+            )
+            UserProfile.objects.create(user=user, rol=rol, rut=f"{len(username)}-1")
+
+    def _usernames(self, query):
+        return [u["username"] for u in self.client.get(f"/api/usuarios/?{query}").json()]
+
+    def test_busqueda_sin_tildes_ni_mayusculas(self):
+        self.assertEqual(self._usernames("search=PENA"), ["mpena", "zeta"])
+        self.assertEqual(self._usernames("search=mar%C3%ADa"), ["mpena"])
+        self.assertEqual(self._usernames("search=jrojas@example"), ["jrojas"])
+        self.assertEqual(self._usernames("search=nadie"), [])
+
+    def test_filtros_y_orden(self):
+        self.assertEqual(self._usernames("rol=PROFESIONAL"), ["jrojas", "zeta"])
+        self.assertEqual(self._usernames("rol=PROFESIONAL&is_active=0"), ["zeta"])
+        self.assertEqual(self._usernames("ordering=-username&rol=PROFESIONAL"), ["zeta", "jrojas"])
+        # Campo fuera de la lista blanca: orden por username
+        self.assertEqual(self._usernames("ordering=password&is_active=1")[0], "admin_test")
+
+        pagina = self.client.get("/api/usuarios/?page=2&page_size=2&ordering=username").json()
+        self.assertEqual(pagina["count"], 4)
+        self.assertEqual([u["username"] for u in pagina["results"]], ["mpena", "zeta"])
+
+
+class CargaProfesionalesTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        hoy = timezone.localdate()
+        self.ocupado = Profesional.objects.create(user=User.objects.create_user("ocupado"))
+        self.libre = Profesional.objects.create(user=User.objects.create_user("libre"))
+        for estado, dias in [("ASIGNADA", 3), ("ACEPTADA", 60), ("COMPLETADA", 5)]:
+            Clase.objects.create(
+                titulo=estado, descripcion="D", cliente=self.cliente, estado=estado,
+                profesional_asignado=self.ocupado, fecha_solicitada=hoy + timedelta(days=dias),
+            )
+
+    def _carga(self, query=""):
+        datos = self.client.get(f"/api/profesionales/?con_carga=1{query}").json()
+        return [(p["username"], p["carga_activa"], p["clases_proximas"]) for p in datos]
+
+    def test_carga_y_orden(self):
+        self.assertEqual(self._carga(), [("libre", 0, 0), ("ocupado", 2, 1)])
+        self.assertEqual(self._carga("&ordering=-carga&semanas=10"), [("ocupado", 2, 2), ("libre", 0, 0)])
+        self.assertNotIn("carga_activa", self.client.get("/api/profesionales/").json()[0])
+
+    def test_semanas_fuera_de_rango(self):
+        self.assertEqual(self._carga("&semanas=1000000000")[1], ("ocupado", 2, 2))
+        self.assertEqual(self._carga("&semanas=0")[1], ("ocupado", 2, 1))
+        self.assertEqual(self._carga("&semanas=abc")[1], ("ocupado", 2, 1))
+
+
+@override_settings(SYSTEM_CONFIG_REVALIDAR_SEGUNDOS=0)
+class ConfigMemoTests(TestCase):
+    """Otro worker cambia la configuración: este proceso se entera al revalidar."""
+
+    def setUp(self):
+        config._memo = None
+        self.addCleanup(setattr, config, "_memo", None)
+        SystemConfig.objects.create(id=1, nombre_sistema="Original")
+
+    def _cambio_de_otro_worker(self):
+        # update() no dispara la signal: el memo de este proceso sigue vivo
+        SystemConfig.objects.filter(id=1).update(nombre_sistema="Nuevo", actualizado_en=timezone.now())
+
+    @override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+    def test_cache_local_compara_con_la_bd(self):
+        self.assertFalse(config._cache_compartida())
+        self.assertEqual(config.obtener_config().nombre_sistema, "Original")
+        self._cambio_de_otro_worker()
+        self.assertEqual(config.obtener_config().nombre_sistema, "Nuevo")
+
+    def test_cache_compartida_compara_la_version(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        backend = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": directorio.name}
+        with override_settings(CACHES={"default": backend}):
+            self.assertTrue(config._cache_compartida())
+            self.assertEqual(config.obtener_config().nombre_sistema, "Original")
+            self._cambio_de_otro_worker()
+            # Sin aviso en la caché no se consulta la BD
+            with self.assertNumQueries(0):
+                self.assertEqual(config.obtener_config().nombre_sistema, "Original")
+            cache.incr(config.CLAVE_VERSION)
+            self.assertEqual(config.obtener_config().nombre_sistema, "Nuevo")
+
+
+@override_settings(INSTRUMENTACION_ACTIVA=True, INSTRUMENTACION_MUESTREO=0, SQL_LENTO_UMBRAL_MS=0)
+class InstrumentacionTests(ApiTestCase):
+    def test_server_timing_y_sql_lento(self):
+        Clase.objects.create(titulo="T", descripcion="D", cliente=self.cliente)
+        with self.assertLogs("api.sql_lento", "WARNING") as logs:
+            respuesta = self.client.get("/api/clases/")
+
+        fases = [parte.split(";")[0] for parte in respuesta["Server-Timing"].split(", ")]
+        self.assertEqual(fases, ["db", "ser", "render", "total"])
+        self.assertIn('consultas"', respuesta["Server-Timing"])
+
+        consulta = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((consulta["vista"], consulta["accion"]), ("ClaseViewSet", "list"))
+        self.assertIn("api_clase", consulta["sql"])
+
+        with override_settings(SQL_LENTO_UMBRAL_MS=60000), self.assertNoLogs("api.sql_lento"):
+            self.client = self.client_class()
+            self.autenticar(self.admin)
+            self.client.get("/api/clases/")
+
+    @override_settings(SQL_LENTO_UMBRAL_MS=0)
+    def test_sql_del_cuerpo_en_streaming(self):
+        Clase.objects.create(titulo="T", descripcion="D", cliente=self.cliente)
+        with self.assertLogs("api.sql_lento", "WARNING") as logs:
+            respuesta = self.client.get("/api/clases/?stream=1")
+            antes = len(logs.records)
+            # La consulta del listado corre al recorrer el cuerpo
+            b"".join(respuesta.streaming_content)
+        self.assertGreater(len(logs.records), antes)
+        consulta = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((consulta["vista"], consulta["accion"]), ("ClaseViewSet", "list"))
+        self.assertIn("api_clase", consulta["sql"])
+
+    def test_serializers_de_la_api_suman_a_ser(self):
+        Clase.objects.create(titulo="T", descripcion="D", cliente=self.cliente)
+        for many in (False, True):
+            medicion = instrumentacion.Medicion(umbral_sql=1)
+            token = instrumentacion._medicion_actual.set(medicion)
+            try:
+                objeto = Clase.objects.all() if many else Clase.objects.get()
+                ClaseSerializer(objeto, many=many).data
+            finally:
+                instrumentacion._medicion_actual.reset(token)
+            self.assertGreater(medicion.ser, 0)
+
+
+def _incrementar(ruta, veces):
+    cache = CacheMemoriaCompartida(ruta, CacheMemoriaCompartidaTests.PARAMS)
+    for _ in range(veces):
+        cache.incr("contador")
+
+
+class CacheMemoriaCompartidaTests(SimpleTestCase):
+    PARAMS = {"OPTIONS": {"SLOTS": 32, "VIAS": 4, "TAMANO_SLOT": 512}}
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.ruta = os.path.join(directorio.name, "cache")
+        self.cache = CacheMemoriaCompartida(self.ruta, self.PARAMS)
+
+    def test_operaciones_basicas(self):
+        self.cache.set("a", {"x": [1, 2]})
+        self.assertEqual(self.cache.get("a"), {"x": [1, 2]})
+        self.assertFalse(self.cache.add("a", 1))
+        self.assertTrue(self.cache.delete("a"))
+        self.assertIsNone(self.cache.get("a"))
+
+        self.cache.set("vencida", 1, timeout=-1)
+        self.assertIsNone(self.cache.get("vencida"))
+
+
+    def test_valores_grandes_se_comprimen_o_se_descartan_con_aviso(self):
+        # No cabe en un slot de 512 bytes, pero comprimido sí
+        self.cache.set("api:resp:grande", b"x" * 4000)
+        self.assertEqual(self.cache.get("api:resp:grande"), b"x" * 4000)
+
+        # Ni comprimido cabe: no se guarda, se cuenta y se avisa
+        with mock.patch.object(cache_compartida, "contar") as contar, \
+                mock.patch.object(cache_compartida, "_avisados", set()), \
+                self.assertLogs("api.cache", "WARNING"):
+            self.cache.set("api:resp:grande", os.urandom(1000))
+            self.assertFalse(self.cache.add("api:idem:otra", os.urandom(1000)))
+        self.assertIsNone(self.cache.get("api:resp:grande"))
+        self.assertEqual(
+            [llamada.kwargs["prefijo"] for llamada in contar.call_args_list], ["api:resp", "api:idem"]
+        )
+
+    def test_expulsion_respeta_capacidad(self):
+        for i in range(200):
+            self.cache.set(f"k{i}", i)
+        vivas = [i for i in range(200) if self.cache.get(f"k{i}") is not None]
+        self.assertLessEqual(len(vivas), 32)
+        self.assertIn(199, vivas)
+
+    def test_incr_atomico_entre_procesos(self):
+        self.cache.set("contador", 0)
+        ctx = multiprocessing.get_context("fork")
+        procesos = [ctx.Process(target=_incrementar, args=(self.ruta, 500)) for _ in range(4)]
+        for p in procesos:
+            p.start()
+        for p in procesos:
+            p.join()
+        self.assertEqual(self.cache.get("contador"), 2000)
+
+
+@override_settings(LIMITES_TASA={"token_obtain_pair": ("6/min", 2)})
+class TokenBucketThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_rafaga_y_retry_after(self):
+        datos = {"username": "nadie", "password": "x"}
+        for _ in range(2):
+            respuesta = self.client.post("/api/token/", datos, content_type="application/json")
+            self.assertEqual(respuesta.status_code, 401)
+
+        respuesta = self.client.post("/api/token/", datos, content_type="application/json")
+        self.assertEqual(respuesta.status_code, 429)
+        # 6/min: un token cada 10 s (menos lo que tardaron los dos primeros)
+        self.assertIn(respuesta["Retry-After"], {"9", "10"})
+
+
+def _observar_en_proceso(directorio):
+    registro = metricas.RegistroProceso(metricas._ruta_proceso(directorio))
+    registro.observar("clases-list|GET|2xx", 0.02)
+    registro.observar("clases-list|GET|5xx", 3)
+
+
+class MetricasEndpointTests(ApiTestCase):
+    def test_ruta_y_alias(self):
+        for ruta in ("/api/metrics/", "/api/metricas/"):
+            respuesta = self.client.get(ruta)
+            self.assertEqual(respuesta.status_code, 200, ruta)
+            self.assertTrue(respuesta["Content-Type"].startswith("text/plain; version=0.0.4"))
+        # Las dos rutas cuentan bajo la misma etiqueta
+        self.assertIn('ruta="metricas"', self.client.get("/api/metrics/").content.decode())
+
+
+class MetricasTests(SimpleTestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = directorio.name
+        self.registro = metricas.RegistroProceso(metricas._ruta_proceso(self.directorio))
+        self.addCleanup(self.registro.cerrar)
+
+    def test_suma_procesos_y_consolida_los_terminados(self):
+        self.registro.observar("clases-list|GET|2xx", 0.001)
+        proceso = multiprocessing.get_context("fork").Process(
+            target=_observar_en_proceso, args=(self.directorio,)
+        )
+        proceso.start()
+        proceso.join()
+
+        totales = metricas.leer_metricas(self.directorio)
+        buckets, suma_us = totales["clases-list|GET|2xx"]
+        self.assertEqual(sum(buckets), 2)
+        self.assertEqual(suma_us, 21000)
+        self.assertEqual(sum(totales["clases-list|GET|5xx"][0]), 1)
+
+        # El archivo del proceso terminado pasó al acumulado, sin contar doble
+        archivos = sorted(os.listdir(self.directorio))
+        self.assertNotIn(f"metricas_{proceso.pid}.db", archivos)
+        self.assertIn(metricas.ARCHIVO_ACUMULADO, archivos)
+        self.assertEqual(metricas.leer_metricas(self.directorio), totales)
+
+    def test_hilos_no_pierden_observaciones(self):
+        def observar():
+            for _ in range(5000):
+                self.registro.observar("x|GET|2xx", 0)
+
+        hilos = [threading.Thread(target=observar) for _ in range(8)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(metricas.leer_metricas(self.directorio)["x|GET|2xx"][0][0], 40000)
+
+
+class ColaTrabajosTests(TestCase):
+    def setUp(self):
+        self.ejecutados = []
+
+        @trabajos.tarea("prueba_anotar")
+        def anotar(n):
+            self.ejecutados.append(n)
+
+        @trabajos.tarea("prueba_falla")
+        def falla():
+            raise RuntimeError("falla")
+
+        self.addCleanup(trabajos.TAREAS.pop, "prueba_anotar")
+        self.addCleanup(trabajos.TAREAS.pop, "prueba_falla")
+
+    def test_prioridad_y_toma_unica(self):
+        trabajos.encolar("prueba_anotar", n=1)
+        trabajos.encolar("prueba_anotar", n=2, prioridad=5)
+
+        tomados = trabajos.tomar(10, "w1")
+        self.assertEqual([t.argumentos["n"] for t in tomados], [2, 1])
+        self.assertEqual(trabajos.tomar(10, "w2"), [])
+
+        for trabajo in tomados:
+            self.assertTrue(trabajos.ejecutar(trabajo))
+        self.assertEqual(self.ejecutados, [2, 1])
+
+    def test_reintento_con_backoff_y_fallo_final(self):
+        trabajo = trabajos.encolar("prueba_falla", max_intentos=2)
+
+        with self.assertLogs("api.trabajos", "WARNING"):
+            self.assertFalse(trabajos.ejecutar(trabajos.tomar(1)[0]))
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, Trabajo.PENDIENTE)
+        self.assertGreater(trabajo.ejecutar_desde, trabajo.creado_en)
+        # Programado a futuro: todavía no se puede tomar
+        self.assertEqual(trabajos.tomar(1), [])
+
+        Trabajo.objects.filter(pk=trabajo.pk).update(ejecutar_desde=trabajo.creado_en)
+        with self.assertLogs("api.trabajos", "WARNING"):
+            self.assertFalse(trabajos.ejecutar(trabajos.tomar(1)[0]))
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, Trabajo.FALLIDO)
+        self.assertIn("RuntimeError", trabajo.ultimo_error)
+
+
+class RunWorkerTests(TransactionTestCase):
+    def setUp(self):
+        for senal in (signal.SIGTERM, signal.SIGINT):
+            self.addCleanup(signal.signal, senal, signal.getsignal(senal))
+
+        @trabajos.tarea("prueba_detener")
+        def detener():
+            # El worker ya está esperando un hilo libre cuando llega la señal
+            time.sleep(0.2)
+            os.kill(os.getpid(), signal.SIGTERM)
+            time.sleep(0.2)
+
+        self.addCleanup(trabajos.TAREAS.pop, "prueba_detener")
+
+    def test_tras_sigterm_no_toma_mas_trabajos(self):
+        primero = trabajos.encolar("prueba_detener", prioridad=1)
+        segundo = trabajos.encolar("prueba_detener")
+        call_command("run_worker", hilos=1, espera=0.1, stdout=io.StringIO())
+
+        primero.refresh_from_db()
+        segundo.refresh_from_db()
+        self.assertEqual(primero.estado, Trabajo.COMPLETADO)
+        self.assertEqual(segundo.estado, Trabajo.PENDIENTE)
+
+
+class HistorialClaseTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.clase = Clase.objects.create(titulo="T", descripcion="D", cliente=self.cliente)
+
+    def _patch(self, datos):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.patch(
+                f"/api/clases/{self.clase.pk}/", datos, content_type="application/json"
+            )
+
+    def test_registra_solo_cambios_de_estado_con_actor(self):
+        self._patch({"estado": "ASIGNADA"})
+        self._patch({"titulo": "Otro título"})
+        self._patch({"estado": "ACEPTADA"})
+
+        eventos = self.client.get(f"/api/clases/{self.clase.pk}/historial/").json()
+        self.assertEqual(
+            [(e["estado_anterior"], e["estado_nuevo"]) for e in eventos],
+            [("", "PENDIENTE"), ("PENDIENTE", "ASIGNADA"), ("ASIGNADA", "ACEPTADA")],
+        )
+        self.assertEqual(eventos[-1]["actor_username"], "admin_test")
+
+        pagina = self.client.get("/api/clases/eventos/?estado=ACEPTADA").json()
+        self.assertEqual(len(pagina["results"]), 1)
+
+    def test_fecha_inexistente_es_400(self):
+        for valor in ("2024-02-30", "2024-13-01T10:00:00", "ayer"):
+            respuesta = self.client.get(f"/api/clases/eventos/?desde={valor}")
+            self.assertEqual(respuesta.status_code, 400, valor)
+            self.assertIn("desde", respuesta.json())
+
+
+@override_settings(HISTORIAL_DIFERIDO=True, HISTORIAL_MAX_INTENTOS=2, HISTORIAL_MAX_PENDIENTES=3)
+class HistorialBufferTests(TestCase):
+    """Eventos que no se pueden guardar: reintento limitado, tope y descarte al log."""
+
+    def setUp(self):
+        historial._buffer = []
+        historial._fallos = 0
+        self.addCleanup(setattr, historial, "_buffer", [])
+        self.addCleanup(setattr, historial, "_fallos", 0)
+        # Sin el hilo: los vaciados los hace el test
+        patcher = mock.patch.object(historial, "_asegurar_hilo")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _evento(self, clase_id):
+        return ClaseEvento(clase_id=clase_id, estado_nuevo="PENDIENTE", ts=timezone.now())
+
+    def test_evento_invalido_se_descarta_sin_perder_el_resto(self):
+        bulk_create = ClaseEvento.objects.bulk_create
+
+        def falla_con_el_malo(eventos, **kwargs):
+            if any(e.clase_id == 666 for e in eventos):
+                raise IntegrityError("malo")
+            return bulk_create(eventos, **kwargs)
+
+        historial._agregar(self._evento(1))
+        historial._agregar(self._evento(666))
+        with mock.patch.object(ClaseEvento.objects, "bulk_create", side_effect=falla_con_el_malo):
+            with self.assertLogs("api.historial", "ERROR"):
+                self.assertEqual(historial.vaciar(), 0)
+            self.assertEqual(len(historial._buffer), 2)
+            with self.assertLogs("api.historial", "ERROR") as logs:
+                self.assertEqual(historial.vaciar(), 1)
+
+        self.assertEqual(historial._buffer, [])
+        self.assertEqual(list(ClaseEvento.objects.values_list("clase_id", flat=True)), [1])
+        self.assertIn('"clase_id": 666', logs.output[-1])
+
+    def test_tope_descarta_los_mas_antiguos(self):
+        with self.assertLogs("api.historial", "ERROR") as logs:
+            for clase_id in range(1, 5):
+                historial._agregar(self._evento(clase_id))
+        self.assertEqual([e.clase_id for e in historial._buffer], [2, 3, 4])
+        self.assertIn("buffer lleno", logs.output[0])
+        self.assertEqual(historial.vaciar(), 3)
+
+
+class SQLiteProduccionTests(ApiTestCase):
+    """Perfil de producción de SQLite: PRAGMAs al conectar y reintento de escrituras bloqueadas."""
+
+    def _pragmas(self):
+        # Conexión nueva sobre un archivo: WAL no aplica a una BD en memoria
+        with tempfile.TemporaryDirectory() as directorio:
+            conn = DatabaseWrapper(
+                {**connection.settings_dict, "NAME": os.path.join(directorio, "p.sqlite3")},
+                alias="pragmas",
+            )
+            try:
+                with conn.cursor() as cursor:
+                    return {
+                        pragma: cursor.execute(f"PRAGMA {pragma}").fetchone()[0]
+                        for pragma in ("journal_mode", "busy_timeout", "synchronous")
+                    }
+            finally:
+                conn.close()
+
+    def test_pragmas_al_conectar(self):
+        with override_settings(SQLITE_PRODUCCION=True):
+            # synchronous=NORMAL es 1
+            self.assertEqual(self._pragmas(), {
+                "journal_mode": "wal",
+                "busy_timeout": settings.SQLITE_PRAGMAS["busy_timeout"],
+                "synchronous": 1,
+            })
+        with override_settings(SQLITE_PRODUCCION=False):
+            self.assertEqual(self._pragmas()["journal_mode"], "delete")
+
+    @override_settings(SQLITE_PRODUCCION=True, IDEMPOTENCIA_ESPERA_SEGUNDOS=1)
+    def test_escritura_bloqueada_se_reintenta_y_suelta_la_clave(self):
+        finalizar = ClaseViewSet.finalize_response
+        tomar = idempotencia._tomar
+        intentos = []
+        tomas = []
+
+        def registrar_toma(*args):
+            tomas.append(tomar(*args))
+            return tomas[-1]
+
+        def bloqueada_la_primera_vez(vista, request, response, *args, **kwargs):
+            # La vista ya tomó la Idempotency-Key y creó la clase
+            intentos.append(response.status_code)
+            if len(intentos) == 1:
+                raise OperationalError("database is locked")
+            return finalizar(vista, request, response, *args, **kwargs)
+
+        with mock.patch.object(ClaseViewSet, "finalize_response", bloqueada_la_primera_vez), \
+                mock.patch.object(idempotencia, "_tomar", registrar_toma):
+            respuesta = self.client.post(
+                "/api/clases/",
+                {"titulo": "T", "descripcion": "D", "cliente": self.cliente.pk},
+                content_type="application/json",
+                HTTP_IDEMPOTENCY_KEY="clave-1",
+            )
+        self.assertEqual(intentos, [201, 201])
+        # El reintento toma la clave de una: la del intento revertido se soltó
+        self.assertEqual(tomas, [True, True])
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(Clase.objects.count(), 1)
+
+
+class IdempotenciaTests(ApiTestCase):
+    def _crear(self, titulo, clave="clave-1"):
+        # La respuesta se guarda al confirmarse la transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                "/api/clases/",
+                {"titulo": titulo, "descripcion": "D", "cliente": self.cliente.pk},
+                content_type="application/json",
+                HTTP_IDEMPOTENCY_KEY=clave,
+            )
+
+    def test_reintento_repite_la_respuesta_sin_crear_otra_clase(self):
+        primera = self._crear("T")
+        segunda = self._crear("T")
+
+        self.assertEqual(primera.status_code, 201)
+        self.assertEqual(segunda.status_code, 201)
+        self.assertEqual(segunda["Idempotent-Replayed"], "true")
+        self.assertEqual(segunda.content, primera.content)
+        self.assertEqual(Clase.objects.count(), 1)
+
+    def test_misma_clave_con_otro_cuerpo(self):
+        self._crear("T")
+        self.assertEqual(self._crear("Otro").status_code, 422)
+        self.assertEqual(self._crear("Otro", clave="clave-2").status_code, 201)
+
+    def _batch_con_alta(self, titulo, estado):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/api/batch/", {
+                "transaccion": True,
+                "requests": [
+                    {
+                        "method": "POST", "path": "/api/clases/", "headers": {"Idempotency-Key": "clave-1"},
+                        "body": {"titulo": titulo, "descripcion": "D", "cliente": self.cliente.pk},
+                    },
+                    {"method": "PATCH", "path": f"/api/clientes/{self.cliente.pk}/", "body": {"activo": estado}},
+                ],
+            }, content_type="application/json").json()
+
+    def test_alta_revertida_no_se_repite(self):
+        self.assertTrue(self._batch_con_alta("T", "no-es-booleano")["revertido"])
+        self.assertEqual(Clase.objects.count(), 0)
+
+        # El reintento ejecuta de nuevo: no devuelve el 201 de una clase que no existe
+        respuesta = self._crear("T")
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertFalse(respuesta.has_header("Idempotent-Replayed"))
+        self.assertTrue(Clase.objects.filter(pk=respuesta.json()["id"]).exists())
+
+    def test_alta_confirmada_se_repite(self):
+        self.assertFalse(self._batch_con_alta("T", True)["revertido"])
+        respuesta = self._crear("T")
+        self.assertEqual(respuesta["Idempotent-Replayed"], "true")
+        self.assertEqual(Clase.objects.count(), 1)
+
+    def test_respuesta_mas_grande_que_un_slot_no_suelta_la_clave(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        chica = {
+            "BACKEND": "api.cache_compartida.CacheMemoriaCompartida",
+            "LOCATION": os.path.join(directorio.name, "cache"),
+            "OPTIONS": {"SLOTS": 32, "VIAS": 4, "TAMANO_SLOT": 1024},
+        }
+        # Hex al azar: no entra en 1 KB ni comprimido
+        descripcion = os.urandom(4000).hex()
+        with override_settings(
+            CACHES={**settings.CACHES, "idem": chica}, IDEMPOTENCIA_CACHE_ALIAS="idem"
+        ), self.assertLogs("api.cache", "WARNING"):
+            respuestas = []
+            for _ in range(2):
+                with self.captureOnCommitCallbacks(execute=True):
+                    respuestas.append(self.client.post(
+                        "/api/clases/",
+                        {"titulo": "T", "descripcion": descripcion, "cliente": self.cliente.pk},
+                        content_type="application/json",
+                        HTTP_IDEMPOTENCY_KEY="clave-1",
+                    ))
+
+        primera, segunda = respuestas
+        self.assertEqual(primera.status_code, 201)
+        self.assertEqual(segunda.status_code, 201)
+        self.assertEqual(segunda["Idempotent-Replayed"], "true")
+        self.assertIn("detail", segunda.json())
+        self.assertEqual(Clase.objects.count(), 1)
+
+    def _crear_con_adjunto(self, contenido):
+        # Cada envío con su propio boundary, como un cliente real
+        boundary = uuid.uuid4().hex
+        cuerpo = encode_multipart(boundary, {
+            "titulo": "T", "descripcion": "D", "cliente": self.cliente.pk,
+            "adjunto": SimpleUploadedFile("a.txt", contenido),
+        })
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                "/api/clases/", cuerpo,
+                content_type=f"multipart/form-data; boundary={boundary}",
+                HTTP_IDEMPOTENCY_KEY="clave-1",
+            )
+
+    def test_multipart_se_compara_por_el_contenido_de_los_archivos(self):
+        self.assertEqual(self._crear_con_adjunto(b"uno").status_code, 201)
+        self.assertEqual(self._crear_con_adjunto(b"uno")["Idempotent-Replayed"], "true")
+        # Mismo nombre de archivo, otro contenido
+        self.assertEqual(self._crear_con_adjunto(b"dos").status_code, 422)
+        self.assertEqual(Clase.objects.count(), 1)
+
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_cuerpo_mas_grande_que_el_limite_de_django(self):
+        def crear():
+            with self.captureOnCommitCallbacks(execute=True):
+                return self.client.post(
+                    "/api/clases/",
+                    {"titulo": "T", "descripcion": "D" * 2000, "cliente": self.cliente.pk},
+                    content_type="application/json",
+                    HTTP_IDEMPOTENCY_KEY="clave-1",
+                )
+
+        self.assertEqual(crear().status_code, 201)
+        self.assertEqual(crear()["Idempotent-Replayed"], "true")
+        self.assertEqual(Clase.objects.count(), 1)
+
+
+@override_settings(BATCH_HILOS=1)
+class BatchTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clase = Clase.objects.create(titulo="T", descripcion="D", cliente=self.cliente)
+
+    def _batch(self, datos):
+        return self.client.post("/api/batch/", datos, content_type="application/json")
+
+    def test_sub_requests_en_orden(self):
+        respuesta = self._batch([
+            {"method": "PATCH", "path": f"/api/clases/{self.clase.pk}/", "body": {"titulo": "Nuevo"}},
+            {"method": "GET", "path": "/api/clases/"},
+            {"method": "GET", "path": "/api/no-existe/"},
+        ])
+        resultados = respuesta.json()["results"]
+        self.assertEqual([r["status"] for r in resultados], [200, 200, 404])
+        self.assertEqual(resultados[1]["body"][0]["titulo"], "Nuevo")
+
+    def test_transaccion_se_revierte_si_falla_uno(self):
+        respuesta = self._batch({
+            "transaccion": True,
+            "requests": [
+                {"method": "PATCH", "path": f"/api/clases/{self.clase.pk}/", "body": {"titulo": "Nuevo"}},
+                {"method": "PATCH", "path": f"/api/clases/{self.clase.pk}/", "body": {"estado": "INVALIDO"}},
+            ],
+        })
+        self.assertTrue(respuesta.json()["revertido"])
+        self.clase.refresh_from_db()
+        self.assertEqual(self.clase.titulo, "T")
+
+    def test_excepcion_en_una_vista_no_corta_el_batch(self):
+        with mock.patch.object(ClaseViewSet, "list", side_effect=RuntimeError("boom")), \
+                self.assertLogs("api.batch", "ERROR"):
+            respuesta = self._batch([
+                {"method": "PATCH", "path": f"/api/clases/{self.clase.pk}/", "body": {"titulo": "Nuevo"}},
+                {"method": "GET", "path": "/api/clases/"},
+                {"method": "GET", "path": f"/api/clases/{self.clase.pk}/"},
+            ])
+        resultados = respuesta.json()["results"]
+        self.assertEqual([r["status"] for r in resultados], [200, 500, 200])
+        self.assertEqual(resultados[2]["body"]["titulo"], "Nuevo")
+
+
+@override_settings(CACHE_RESPUESTAS_ACTIVA=False)
+class BatchInstrumentacionTests(DatosApi, TransactionTestCase):
+    """Los GET en paralelo de un batch cuentan en Server-Timing."""
+
+    def _consultas(self, hilos):
+        Clase.objects.create(titulo="T", descripcion="D", cliente=self.cliente)
+        with override_settings(BATCH_HILOS=hilos):
+            respuesta = self.client.post(
+                "/api/batch/",
+                [{"method": "GET", "path": "/api/clases/"}, {"method": "GET", "path": "/api/clientes/"}],
+                content_type="application/json",
+            )
+        self.assertEqual([r["status"] for r in respuesta.json()["results"]], [200, 200])
+        return int(respuesta["Server-Timing"].split('desc="')[1].split()[0])
+
+    def test_consultas_de_los_hilos_se_suman(self):
+        self.assertEqual(self._consultas(hilos=4), self._consultas(hilos=1))
+
+
+class BatchCacheTests(DatosApi, TransactionTestCase):
+    """Los sub-requests dentro de una transacción no leen ni llenan la caché de respuestas."""
+
+    def setUp(self):
+        super().setUp()
+        self.clase = Clase.objects.create(titulo="T", descripcion="D", cliente=self.cliente)
+
+    def _batch(self, datos):
+        return self.client.post("/api/batch/", datos, content_type="application/json")
+
+    def _titulos(self):
+        return [c["titulo"] for c in self.client.get("/api/clases/").json()]
+
+    def test_transaccion_revertida_no_deja_respuestas_en_cache(self):
+        respuesta = self._batch({
+            "transaccion": True,
+            "requests": [
+                {"method": "PATCH", "path": f"/api/clases/{self.clase.pk}/", "body": {"titulo": "FANTASMA"}},
+                {"method": "GET", "path": "/api/clases/"},
+                {"method": "GET", "path": "/api/clases/999999/"},
+            ],
+        })
+        resultados = respuesta.json()["results"]
+        self.assertEqual(resultados[1]["body"][0]["titulo"], "FANTASMA")
+        self.assertTrue(respuesta.json()["revertido"])
+        self.assertEqual(self._titulos(), ["T"])
+
+    @override_settings(SQLITE_PRODUCCION=True)
+    def test_patch_y_get_en_transaccion_sqlite(self):
+        self.assertEqual(self._titulos(), ["T"])
+        respuesta = self._batch([
+            {"method": "PATCH", "path": f"/api/clases/{self.clase.pk}/", "body": {"titulo": "Nuevo"}},
+            {"method": "GET", "path": "/api/clases/"},
+        ])
+        self.assertEqual(respuesta.json()["results"][1]["body"][0]["titulo"], "Nuevo")
+        self.assertEqual(self._titulos(), ["Nuevo"])
+
+
+class DashboardTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        Clase.objects.create(titulo="A", descripcion="D", cliente=self.cliente)
+        Clase.objects.create(titulo="B", descripcion="D", cliente=self.cliente, estado="ASIGNADA")
+
+    def test_dashboard_admin(self):
+        datos = self.client.get("/api/dashboard/admin/").json()
+        self.assertEqual(datos["me"]["username"], "admin_test")
+        self.assertEqual(datos["conteos"]["PENDIENTE"], 1)
+        self.assertEqual(datos["conteos"]["ASIGNADA"], 1)
+        self.assertEqual(datos["total_clases"], 2)
+        self.assertEqual(len(datos["clases"]), 2)
+        self.assertEqual([c["nombre"] for c in datos["roster"]["clientes"]], ["Empresa"])
+        self.assertTrue(datos["roster"]["completo"])
+
+    def test_roster_admin_acotado(self):
+        Cliente.objects.bulk_create(Cliente(nombre=f"Otra {i}", rut=f"{i}-0") for i in range(3))
+        with mock.patch.object(dashboard, "ROSTER_MAXIMO", 2):
+            roster = self.client.get("/api/dashboard/admin/").json()["roster"]
+        self.assertEqual([c["nombre"] for c in roster["clientes"]], ["Empresa", "Otra 0"])
+        self.assertFalse(roster["completo"])
+
+        # El resto se pide paginado, en el mismo orden
+        pagina = self.client.get("/api/clientes/?page=2&page_size=2").json()
+        self.assertEqual(pagina["count"], 4)
+        self.assertEqual([c["nombre"] for c in pagina["results"]], ["Otra 1", "Otra 2"])
+        self.assertIsNone(pagina["next"])
+        self.assertIn("results", self.client.get("/api/profesionales/?page=1").json())
+        # Sin ?page= sigue siendo la lista completa
+        self.assertEqual(len(self.client.get("/api/clientes/").json()), 4)
+
+    def test_cada_rol_solo_su_dashboard(self):
+        self.assertEqual(self.client.get("/api/dashboard/cliente/").status_code, 403)
+
+
+@override_settings(DATABASE_REPLICAS=["replica_1"], REPLICAS_VENTANA_SEGUNDOS=60)
+class ReplicasTests(SimpleTestCase):
+    """GET a la réplica, salvo que el cliente haya escrito hace poco."""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.router = RouterReplicas()
+        self.middleware = ReplicasMiddleware(self._vista)
+
+    def _vista(self, request):
+        self.alias = self.router.db_for_read(Clase)
+        return HttpResponse()
+
+    def _alias(self, metodo, token="a"):
+        request = getattr(self.factory, metodo)("/api/clases/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.middleware(request)
+        return self.alias
+
+    def test_lecturas_a_replica_y_escrituras_a_primaria(self):
+        self.assertEqual(self._alias("get"), "replica_1")
+        self.assertEqual(self._alias("post"), "default")
+        self.assertEqual(self.router.db_for_write(Clase), "default")
+        # Fuera de un request (comandos, workers) todo va a la primaria
+        self.assertEqual(self.router.db_for_read(Clase), "default")
+
+    def test_lee_de_primaria_tras_escribir(self):
+        self._alias("post", token="a")
+        self.assertEqual(self._alias("get", token="a"), "default")
+        # Otros clientes siguen leyendo de la réplica
+        self.assertEqual(self._alias("get", token="b"), "replica_1")
+
+
+# La primaria hace de réplica: basta para ver qué requests "leyeron de una réplica"
+@override_settings(DATABASE_REPLICAS=["default"], REPLICAS_VENTANA_SEGUNDOS=60)
+class ReplicasCacheTests(DatosApi, TransactionTestCase):
+    """Las respuestas leídas de una réplica no se guardan en la caché de respuestas."""
+
+    def test_no_cachea_lecturas_de_replica(self):
+        self.assertEqual(self.client.get("/api/clientes/")["X-Cache"], "MISS")
+        self.assertEqual(self.client.get("/api/clientes/")["X-Cache"], "MISS")
+
+        # Tras escribir, este cliente lee de la primaria y ahí sí se guarda
+        self.client.patch(f"/api/clientes/{self.cliente.pk}/", {"nombre": "Otra"}, content_type="application/json")
+        self.assertEqual(self.client.get("/api/clientes/")["X-Cache"], "MISS")
+        respuesta = self.client.get("/api/clientes/")
+        self.assertEqual(respuesta["X-Cache"], "HIT")
+        self.assertEqual(respuesta.json()[0]["nombre"], "Otra")
+
+
+class StreamingTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(3):
+            Clase.objects.create(titulo=f"C{i}", descripcion="D", cliente=self.cliente)
+        Clase.objects.create(titulo="X", descripcion="D", cliente=self.cliente, estado="ASIGNADA")
+
+    def _leer(self, respuesta):
+        self.assertTrue(respuesta.streaming)
+        return b"".join(respuesta.streaming_content)
+
+    def test_array_json_igual_al_listado(self):
+        normal = self.client.get("/api/clases/?estado=PENDIENTE").json()
+        cuerpo = self._leer(self.client.get("/api/clases/?estado=PENDIENTE&stream=1"))
+        self.assertEqual(json.loads(cuerpo), normal)
+
+    def test_ndjson_por_accept(self):
+        respuesta = self.client.get("/api/clases/", HTTP_ACCEPT="application/x-ndjson")
+        self.assertEqual(respuesta["Content-Type"], "application/x-ndjson")
+        lineas = self._leer(respuesta).splitlines()
+        self.assertEqual(len(lineas), 4)
+        self.assertEqual({json.loads(l)["titulo"] for l in lineas}, {"C0", "C1", "C2", "X"})
+
+    def test_lista_vacia(self):
+        self.assertEqual(self._leer(self.client.get("/api/clases/?estado=COMPLETADA&stream=1")), b"[]")
+        self.assertEqual(self._leer(self.client.get("/api/clases/?estado=COMPLETADA&stream=ndjson")), b"")
+
+
+class JSONRapidoTests(ApiTestCase):
+    """JSONRendererRapido y JSONParserRapido equivalen a los de DRF, con y sin orjson."""
+
+    DATOS = {
+        "decimal": Decimal("12.50"),
+        "utc": datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=tz.utc),
+        "offset": datetime(2024, 5, 1, 12, 30, tzinfo=tz(timedelta(hours=-4))),
+        "ingenua": datetime(2024, 5, 1, 12, 30),
+        "fecha": date(2024, 2, 29),
+        "hora": hora(8, 15, 30),
+        "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "lazy": gettext_lazy("Ñandú"),
+        "texto": "Año 2024 — señal\u2028fin\u2029",
+        "lista": [1, 2.5, None, True],
+    }
+
+    def _backends(self):
+        yield "orjson"
+        with mock.patch.object(renderers, "orjson", None), mock.patch.object(parsers, "orjson", None):
+            yield "stdlib"
+
+    def test_render_igual_a_drf(self):
+        esperado = JSONRenderer().render(self.DATOS)
+        for backend in self._backends():
+            with self.subTest(backend=backend):
+                self.assertEqual(JSONRendererRapido().render(self.DATOS), esperado)
+
+    def test_parse_igual_a_drf(self):
+        cuerpo = json.dumps({"texto": "Ñandú", "numeros": [1, 2.5], "nulo": None}).encode()
+        esperado = JSONParser().parse(io.BytesIO(cuerpo))
+        for backend in self._backends():
+            with self.subTest(backend=backend):
+                self.assertEqual(JSONParserRapido().parse(io.BytesIO(cuerpo)), esperado)
+
+    def test_json_invalido_es_parse_error(self):
+        for backend in self._backends():
+            for cuerpo in (b'{"titulo": ', b"NaN", "{\"a\": \"ñ\"}".encode("latin-1")):
+                with self.subTest(backend=backend, cuerpo=cuerpo), self.assertRaises(ParseError):
+                    JSONParserRapido().parse(io.BytesIO(cuerpo))
+
+    def test_json_invalido_es_400(self):
+        respuesta = self.client.post("/api/clases/", b'{"titulo": ', content_type="application/json")
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class ColumnarTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(3):
+            Clase.objects.create(titulo=f"C{i}", descripcion="D", cliente=self.cliente)
+
+    def test_columnar_equivale_al_listado(self):
+        normal = self.client.get("/api/clases/").json()
+        respuesta = self.client.get("/api/clases/?formato=columnar")
+        self.assertEqual(respuesta["Content-Type"], "application/vnd.nma.columnar+json")
+        datos = respuesta.json()
+        self.assertEqual(datos["diccionarios"]["cliente_nombre"], ["Empresa"])
+        self.assertEqual(datos["diccionarios"]["profesional_nombre"], [])
+
+        decodificadas = []
+        for fila in datos["filas"]:
+            obj = {}
+            for columna, valor in zip(datos["columnas"], fila):
+                dic = datos["diccionarios"].get(columna)
+                obj[columna] = dic[valor] if dic is not None and valor is not None else valor
+            decodificadas.append(obj)
+        self.assertEqual(decodificadas, normal)
+
+    def test_formato_desconocido_se_ignora(self):
+        respuesta = self.client.get("/api/clases/?formato=xml")
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta["Content-Type"], "application/json")
+
+    def test_errores_y_listas_de_escalares_van_como_json(self):
+        with mock.patch.object(ClaseViewSet, "list", side_effect=ValidationError("Filtro inválido.")):
+            respuesta = self.client.get("/api/clases/?formato=columnar")
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json(), ["Filtro inválido."])
+
+        self.assertEqual(json.loads(ColumnarRenderer().render(["a", "b"])), ["a", "b"])
+
+
+class NombresClaseTests(ApiTestCase):
+    """Clase guarda los nombres para mostrar y se actualizan al renombrar."""
+
+    def setUp(self):
+        super().setUp()
+        self.solicitante = User.objects.create_user("sol", first_name="Ana", last_name="Soto")
+        self.profesional = Profesional.objects.create(
+            user=User.objects.create_user("prof", first_name="Luis")
+        )
+        self.clase = Clase.objects.create(
+            titulo="T", descripcion="D", cliente=self.cliente, solicitada_por=self.solicitante
+        )
+
+    def _nombres(self):
+        self.clase.refresh_from_db()
+        return (self.clase.cliente_nombre, self.clase.profesional_nombre, self.clase.solicitante_nombre)
+
+    def test_copia_y_propaga_nombres(self):
+        self.assertEqual(self._nombres(), ("Empresa", None, "Ana Soto"))
+
+        self.clase.profesional_asignado = self.profesional
+        self.clase.save(update_fields=["profesional_asignado"])
+        self.assertEqual(self._nombres(), ("Empresa", "Luis", "Ana Soto"))
+
+        self.cliente.nombre = "Empresa SpA"
+        self.cliente.save()
+        self.profesional.user.last_name = "Rojas"
+        self.profesional.user.save()
+        self.assertEqual(self._nombres(), ("Empresa SpA", "Luis Rojas", "Ana Soto"))
+
+        self.profesional.delete()
+        self.solicitante.delete()
+        self.assertEqual(self._nombres(), ("Empresa SpA", None, None))
+
+    def test_listado_sin_joins(self):
+        with CaptureQueriesContext(connection) as consultas:
+            datos = self.client.get("/api/clases/").json()
+        self.assertEqual(datos[0]["solicitante_nombre"], "Ana Soto")
+        sql = [q["sql"] for q in consultas if '"api_clase"' in q["sql"]]
+        self.assertEqual(len(sql), 1)
+        self.assertNotIn("JOIN", sql[0])
+
+
+class SesionesTests(ApiTestCase):
+    def test_request_con_jwt_no_toca_la_sesion(self):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get("/api/auth/me/")
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn("sessionid", respuesta.cookies)
+        self.assertFalse(any("django_session" in q["sql"] for q in consultas))
+
+        # El admin sigue usando la sesión
+        self.autenticar(None)
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get("/admin/").status_code, 200)
+
+    def test_purga_solo_vencidas_en_lotes(self):
+        from django.contrib.sessions.models import Session
+
+        ahora = timezone.now()
+        Session.objects.bulk_create(
+            Session(session_key=f"k{i}", session_data="", expire_date=ahora + timedelta(days=1 if i < 2 else -1))
+            for i in range(7)
+        )
+        self.assertEqual(purgar_sesiones_vencidas(lote=2), 5)
+        self.assertEqual(set(Session.objects.values_list("session_key", flat=True)), {"k0", "k1"})
+
+
+class AdminTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        # El admin de Django va con sesión, no con JWT
+        self.autenticar(None)
+        self.client.force_login(self.admin)
+        self.clases = [
+            Clase.objects.create(titulo=f"C{i}", descripcion="D", cliente=self.cliente) for i in range(3)
+        ]
+
+    def test_listados_sin_count_de_la_tabla(self):
+        for modelo in ("clase", "cliente", "profesional", "userprofile", "claseevento", "trabajo"):
+            with CaptureQueriesContext(connection) as consultas:
+                respuesta = self.client.get(f"/admin/api/{modelo}/")
+            self.assertEqual(respuesta.status_code, 200, modelo)
+            self.assertFalse(
+                any(q["sql"].startswith("SELECT COUNT(*) AS") and "LIMIT" not in q["sql"] for q in consultas),
+                modelo,
+            )
+        # Un solo registro: su admin no necesita paginador
+        self.assertEqual(self.client.get("/admin/api/systemconfig/").status_code, 200)
+
+    def test_paginas_mas_alla_del_total_estimado(self):
+        Clase.objects.bulk_create(
+            Clase(titulo=f"X{i}", descripcion="D", cliente=self.cliente) for i in range(7)
+        )
+        with mock.patch.object(PaginadorEstimado, "TOPE", 4), \
+                mock.patch.object(ClaseAdmin, "list_per_page", 2):
+            # Con filtro el total queda en el tope (4 filas, 2 páginas): la 5 sigue accesible
+            respuesta = self.client.get("/admin/api/clase/?estado__exact=PENDIENTE&p=5")
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertEqual(len(respuesta.context["cl"].result_list), 2)
+
+            # MAX(id) cuenta filas borradas: la última página estimada está vacía
+            # y se muestra la última de verdad en vez de redirigir con ?e=1
+            ultima = Clase.objects.order_by("-pk").first()
+            Clase.objects.filter(pk__gte=ultima.pk - 5).exclude(pk=ultima.pk).delete()
+            respuesta = self.client.get("/admin/api/clase/?p=6")
+            self.assertEqual(respuesta.status_code, 200)
+            # Quedan 5 clases: 3 páginas, la última con una sola
+            cl = respuesta.context["cl"]
+            self.assertEqual((cl.page_num, cl.paginator.num_pages), (3, 3))
+            self.assertEqual(len(cl.result_list), 1)
+
+    def test_accion_masiva_de_estado_registra_historial(self):
+        respuesta = self.client.post("/admin/api/clase/", {
+            "action": "marcar_asignada",
+            "_selected_action": [c.pk for c in self.clases[:2]],
+        })
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(Clase.objects.filter(estado="ASIGNADA").count(), 2)
+        eventos = ClaseEvento.objects.filter(estado_nuevo="ASIGNADA")
+        self.assertEqual(eventos.count(), 2)
+        self.assertEqual({e.actor_id for e in eventos}, {self.admin.pk})
@@ -0,0 +1,111 @@
+"""
+Rate limiting con token bucket por ruta y por usuario (o IP si es anónimo).
+
+Cada ruta ("alcance") tiene una capacidad de ráfaga y una tasa de recarga
+configuradas en settings.LIMITES_TASA:
+
+    LIMITES_TASA = {
+        "token_obtain_pair": ("10/min", 5),   # tasa, ráfaga
+        "clases": ("120/min", 60),
+    }
+
+El alcance es `throttle_scope` de la vista, si no su `recurso`
+(PermisoPorRol), si no el nombre de la URL. Las rutas sin entrada no se
+limitan. El estado de cada bucket es (tokens, último acceso) y vive en la
+caché THROTTLE_CACHE_ALIAS:
+
+- Con CacheMemoriaCompartida la actualización es atómica entre todos los
+  workers (un candado por conjunto de slots, ver api/cache_compartida.py).
+- Con otros backends se serializa dentro del proceso; entre procesos la
+  lectura y escritura pueden intercalarse y dejar pasar algún request extra.
+
+Al rechazar, DRF responde 429 con el header Retry-After (wait()).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+from .metricas import contar
+
+
+DURACIONES = {"s": 1, "min": 60, "h": 3600, "d": 86400}
+
+_lock_local = threading.Lock()
+
+
+def parsear_tasa(tasa):
+    """"10/min" -> tokens por segundo."""
+    cantidad, _, periodo = tasa.partition("/")
+    return int(cantidad) / DURACIONES[periodo]
+
+
+def tomar_token(estado, ahora, capacidad, por_segundo):
+    """
+    Un paso del token bucket. Devuelve (estado nuevo, segundos de espera);
+    espera 0 significa que el request pasa.
+    """
+    tokens, ultimo = estado if estado is not None else (capacidad, ahora)
+    tokens = min(capacidad, tokens + (ahora - ultimo) * por_segundo)
+    if tokens >= 1:
+        return (tokens - 1, ahora), 0
+    return (tokens, ahora), (1 - tokens) / por_segundo
+
+
+def _actualizar(cache, clave, funcion, timeout):
+    actualizar = getattr(cache, "actualizar", None)
+    if actualizar is not None:
+        return actualizar(clave, funcion, timeout=timeout)
+    with _lock_local:
+        nuevo, resultado = funcion(cache.get(clave))
+        cache.set(clave, nuevo, timeout=timeout)
+        return resultado
+
+
+class TokenBucketThrottle(BaseThrottle):
+    def __init__(self):
+        self.espera = None
+
+    def alcance(self, request, view):
+        alcance = getattr(view, "throttle_scope", None) or getattr(view, "recurso", None)
+        if alcance:
+            return alcance
+        match = request.resolver_match
+        return match.url_name if match else None
+
+    def allow_request(self, request, view):
+        if not getattr(settings, "THROTTLE_ACTIVO", True):
+            return True
+        alcance = self.alcance(request, view)
+        limite = getattr(settings, "LIMITES_TASA", {}).get(alcance)
+        if limite is None:
+            return True
+
+        tasa, capacidad = limite
+        por_segundo = parsear_tasa(tasa)
+        user = request.user
+        if user and user.is_authenticated:
+            identidad = f"u{user.pk}"
+        else:
+            identidad = f"ip{self.get_ident(request)}"
+
+        clave = f"api:tasa:{alcance}:{identidad}"
+        ahora = time.time()
+        # Un bucket vacío se llena en capacidad / por_segundo: después se puede olvidar
+        timeout = int(capacidad / por_segundo) + 1
+
+        self.espera = _actualizar(
+            caches[getattr(settings, "THROTTLE_CACHE_ALIAS", "default")],
+            clave,
+            lambda estado: tomar_token(estado, ahora, capacidad, por_segundo),
+            timeout,
+        )
+        if self.espera:
+            contar("nma_throttle_rechazos_total", alcance=alcance)
+            return False
+        return True
+
+    def wait(self):
+        return self.espera
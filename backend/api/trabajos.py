@@ -0,0 +1,158 @@
+"""
+Cola de trabajos en segundo plano guardada en la BD del proyecto.
+
+Encolar es un INSERT (dentro de la transacción del request: si el request
+hace rollback, el trabajo tampoco existe):
+
+    from api.trabajos import encolar
+    encolar("purgar_trabajos", dias=30)
+    encolar("exportar", prioridad=5, ejecutar_en=timezone.now() + timedelta(hours=1))
+
+Las tareas se registran con el decorador @tarea en los módulos listados en
+settings.TRABAJOS_MODULOS (ver api/tareas.py) y las ejecuta
+`manage.py run_worker`.
+
+Tomar trabajos es atómico entre workers:
+- PostgreSQL/MySQL/Oracle: SELECT ... FOR UPDATE SKIP LOCKED y UPDATE de
+  esas filas en la misma transacción.
+- SQLite (sin SKIP LOCKED): un único UPDATE ... WHERE id IN (SELECT ...)
+  marcado con un identificador del worker. SQLite serializa las
+  escrituras, así que dos workers nunca marcan la misma fila.
+
+Un trabajo EN_CURSO cuyo worker murió se vuelve a tomar cuando pasan
+TRABAJOS_TIMEOUT_SEGUNDOS desde que se tomó. Si la tarea lanza una
+excepción se reintenta con backoff exponencial (TRABAJOS_BACKOFF_SEGUNDOS *
+2^intentos, con jitter) hasta max_intentos; después queda FALLIDO.
+"""
+import importlib
+import logging
+import random
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Trabajo
+
+
+logger = logging.getLogger("api.trabajos")
+
+# nombre -> función
+TAREAS = {}
+
+
+def tarea(nombre=None):
+    """Registra una función como tarea: @tarea() o @tarea("nombre")."""
+    def registrar(funcion):
+        clave = nombre or funcion.__name__
+        TAREAS[clave] = funcion
+        funcion.nombre_tarea = clave
+        return funcion
+    return registrar
+
+
+def cargar_tareas():
+    for modulo in getattr(settings, "TRABAJOS_MODULOS", ["api.tareas"]):
+        importlib.import_module(modulo)
+
+
+def encolar(tarea, *, prioridad=0, ejecutar_en=None, max_intentos=3, **argumentos):
+    """Encola una tarea (nombre o función decorada con @tarea). Un INSERT."""
+    nombre = getattr(tarea, "nombre_tarea", tarea)
+    return Trabajo.objects.create(
+        tarea=nombre,
+        argumentos=argumentos,
+        prioridad=prioridad,
+        ejecutar_desde=ejecutar_en or timezone.now(),
+        max_intentos=max_intentos,
+    )
+
+
+def _timeout():
+    return timedelta(seconds=getattr(settings, "TRABAJOS_TIMEOUT_SEGUNDOS", 600))
+
+
+def _disponibles(ahora):
+    # Pendientes ya vencidos, o en curso con el worker presumiblemente muerto
+    return Trabajo.objects.filter(
+        Q(estado=Trabajo.PENDIENTE, ejecutar_desde__lte=ahora)
+        | Q(estado=Trabajo.EN_CURSO, tomado_en__lt=ahora - _timeout())
+    ).order_by("-prioridad", "ejecutar_desde", "id")
+
+
+def tomar(cantidad, worker_id=None):
+    """
+    Marca hasta `cantidad` trabajos como EN_CURSO para este worker y los
+    devuelve. Nunca devuelve el mismo trabajo a dos workers.
+    """
+    ahora = timezone.now()
+    # Identificador único por llamada: separa los trabajos de esta toma
+    marca = f"{worker_id or 'worker'}:{uuid.uuid4().hex[:12]}"
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(
+                _disponibles(ahora)
+                .select_for_update(skip_locked=True)
+                .values_list("id", flat=True)[:cantidad]
+            )
+            Trabajo.objects.filter(id__in=ids).update(
+                estado=Trabajo.EN_CURSO, tomado_por=marca, tomado_en=ahora
+            )
+    else:
+        ids = _disponibles(ahora).values("id")[:cantidad]
+        # El WHERE se reevalúa dentro del UPDATE: si otro worker tomó la
+        # fila antes, ya no cumple el filtro
+        _disponibles(ahora).filter(id__in=ids).update(
+            estado=Trabajo.EN_CURSO, tomado_por=marca, tomado_en=ahora
+        )
+
+    return list(
+        Trabajo.objects.filter(tomado_por=marca, estado=Trabajo.EN_CURSO)
+        .order_by("-prioridad", "ejecutar_desde", "id")
+    )
+
+
+def _backoff(intentos):
+    base = getattr(settings, "TRABAJOS_BACKOFF_SEGUNDOS", 10)
+    segundos = base * 2 ** (intentos - 1)
+    return timedelta(seconds=segundos * random.uniform(0.8, 1.2))
+
+
+def ejecutar(trabajo):
+    """Ejecuta un trabajo ya tomado y guarda el resultado. Devuelve True si terminó bien."""
+    trabajo.intentos += 1
+    funcion = TAREAS.get(trabajo.tarea)
+    try:
+        if funcion is None:
+            raise LookupError(f"Tarea no registrada: {trabajo.tarea}")
+        funcion(**trabajo.argumentos)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Falló %s (intento %s): %s", trabajo, trabajo.intentos, error)
+        campos = {"intentos": trabajo.intentos, "ultimo_error": error[-4000:]}
+        if trabajo.intentos < trabajo.max_intentos:
+            campos.update(
+                estado=Trabajo.PENDIENTE,
+                ejecutar_desde=timezone.now() + _backoff(trabajo.intentos),
+                tomado_por="",
+                tomado_en=None,
+            )
+        else:
+            campos.update(estado=Trabajo.FALLIDO, terminado_en=timezone.now())
+        ok = False
+    else:
+        campos = {
+            "intentos": trabajo.intentos,
+            "estado": Trabajo.COMPLETADO,
+            "terminado_en": timezone.now(),
+        }
+        ok = True
+
+    # Solo si sigue siendo nuestro (no lo retomó otro worker por timeout)
+    Trabajo.objects.filter(pk=trabajo.pk, tomado_por=trabajo.tomado_por).update(**campos)
+    return ok
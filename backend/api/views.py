@@ -1,17 +1,35 @@
-from rest_framework import viewsets, permissions, decorators, response, status, generics
+from datetime import datetime, timedelta
+
+from django.db.models import Count, Q
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import viewsets, permissions, decorators, response, status, generics, exceptions
 from django.contrib.auth.models import User
-from .models import Cliente, Profesional, Clase, SystemConfig
+from . import batch, dashboard
+from .cache_respuestas import CacheRespuestasMixin
+from .config import obtener_config
+from .historial import actuando_como
+from .idempotencia import idempotente
+from .metricas import formato_prometheus, leer_metricas
+from .models import Cliente, Profesional, Clase, ClaseEvento, SystemConfig, normalizar_busqueda
 from .serializers import (
     UserSerializer,
     UserAdminSerializer,
     ClienteSerializer,
     ProfesionalSerializer,
+    ProfesionalCargaSerializer,
     ClaseSerializer,
+    ClaseEventoSerializer,
     RegistroClienteSerializer,
     ProfesionalAdminCreateSerializer,
     ProfesionalDetalleSerializer,
     SystemConfigSerializer
 )
+from .pagination import PaginacionCursorEventos, PaginacionOpcional
+from .permissions import PermisoPorRol, filtrar_por_rol, rol_de, validar_campos, ADMIN, CLIENTE, PROFESIONAL
+from .provisioning import leer_csv, provisionar_profesionales
+from .streaming import StreamingListMixin
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -31,26 +49,65 @@ class UserViewSet(viewsets.ModelViewSet):
 
     - Para admin: CRUD completo + reset password.
     - Para otros: idealmente solo lectura limitada (pero ya tienes /auth/me para eso).
+
+    Listado (directorio de usuarios):
+    - ?search=<texto>  busca en username, correo, nombre, apellido y RUT
+    - ?rol=<ROL>       ADMIN | CLIENTE | PROFESIONAL
+    - ?is_active=1|0
+    - ?ordering=<campo> (o -<campo>), ver ORDENAMIENTOS
+    - ?page=<n>&page_size=<m> para paginar
     """
-    queryset = User.objects.all().select_related("profile")
-
-    def get_permissions(self):
-        # Solo admin puede listar, crear, editar, borrar usuarios
-        if self.action in [
-            "list",
-            "retrieve",
-            "create",
-            "update",
-            "partial_update",
-            "destroy",
-            "reset_password",
-        ]:
-            return [permissions.IsAdminUser()]
-        return [permissions.IsAuthenticated()]
+    recurso = "usuarios"
+    # Administrar cuentas (contraseñas, is_staff) exige is_staff: un perfil
+    # con rol ADMIN sin is_staff no basta
+    permission_classes = [PermisoPorRol, permissions.IsAdminUser]
+    pagination_class = PaginacionOpcional
+
+    # Valor de ?ordering= -> campo real (lista blanca)
+    ORDENAMIENTOS = {
+        "id": "id",
+        "username": "username",
+        "email": "email",
+        "first_name": "first_name",
+        "last_name": "last_name",
+        "date_joined": "date_joined",
+        "rol": "profile__rol",
+    }
+
+    def get_queryset(self):
+        qs = User.objects.select_related("profile")
+
+        if self.action != "list":
+            return qs
+
+        params = self.request.query_params
+
+        search = normalizar_busqueda(params.get("search", "").strip())
+        if search:
+            # LIKE '%texto%': en PostgreSQL lo resuelve el índice de
+            # trigramas (migración 0011); en SQLite recorre la columna
+            qs = qs.filter(profile__busqueda__contains=search)
+
+        rol = params.get("rol")
+        if rol:
+            qs = qs.filter(profile__rol=rol)
+
+        is_active = params.get("is_active")
+        if is_active in ("1", "true", "True"):
+            qs = qs.filter(is_active=True)
+        elif is_active in ("0", "false", "False"):
+            qs = qs.filter(is_active=False)
+
+        ordering = params.get("ordering", "username")
+        campo = self.ORDENAMIENTOS.get(ordering.lstrip("-"), "username")
+        if ordering.startswith("-"):
+            campo = "-" + campo
+        # id como desempate para que la paginación sea estable
+        return qs.order_by(campo, "id")
 
     def get_serializer_class(self):
         # Admin usa el serializer extendido
-        if self.request and self.request.user.is_staff:
+        if self.request and rol_de(self.request) == ADMIN:
             return UserAdminSerializer
         # Para otros casos (si algún día los usas)
         return UserSerializer
@@ -84,15 +141,96 @@ class UserViewSet(viewsets.ModelViewSet):
 
 
 
-class ClienteViewSet(viewsets.ModelViewSet):
-    queryset = Cliente.objects.all()
+class ClienteViewSet(StreamingListMixin, CacheRespuestasMixin, viewsets.ModelViewSet):
+    """
+    Listado de clientes. ?page=<n>&page_size=<m> para paginar (el roster del
+    dashboard lo pide así cuando no vino completo).
+    """
     serializer_class = ClienteSerializer
-    permission_classes = [permissions.AllowAny]
+    recurso = "clientes"
+    permission_classes = [PermisoPorRol]
+    pagination_class = PaginacionOpcional
 
+    def get_queryset(self):
+        # CLIENTE: solo sus empresas. PROFESIONAL: las de sus clases.
+        # Orden total (como el roster) para que las páginas no se solapen
+        return filtrar_por_rol(
+            Cliente.objects.order_by("nombre", "id"), self.request, self.recurso
+        )
 
-class ProfesionalViewSet(viewsets.ModelViewSet):
+
+class ProfesionalViewSet(CacheRespuestasMixin, viewsets.ModelViewSet):
+    """
+    Listado de profesionales. Filtros:
+    - ?disponible=1|0
+    - ?especialidad=<texto exacto>
+    - ?con_carga=1  agrega carga_activa (clases ASIGNADA/ACEPTADA) y
+      clases_proximas (clases en las próximas ?semanas=N, por defecto 4, máx. 52),
+      y ordena por carga (?ordering=carga | -carga).
+    - ?page=<n>&page_size=<m> para paginar
+    """
     queryset = Profesional.objects.select_related("user", "user__profile").all()
-    permission_classes = [permissions.IsAuthenticated]
+    recurso = "profesionales"
+    permission_classes = [PermisoPorRol]
+    pagination_class = PaginacionOpcional
+
+    ESTADOS_ACTIVOS = ["ASIGNADA", "ACEPTADA"]
+    SEMANAS_PROXIMAS = 4
+    # Tope de ?semanas= (un año); más allá la fecha se sale de rango
+    SEMANAS_MAX = 52
+
+    def _con_carga(self):
+        return (
+            self.action == "list"
+            and self.request.query_params.get("con_carga") in ("1", "true", "True")
+        )
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action != "list":
+            return qs
+
+        params = self.request.query_params
+
+        disponible = params.get("disponible")
+        if disponible in ("1", "true", "True"):
+            qs = qs.filter(disponible=True)
+        elif disponible in ("0", "false", "False"):
+            qs = qs.filter(disponible=False)
+
+        especialidad = params.get("especialidad")
+        if especialidad:
+            qs = qs.filter(especialidad=especialidad)
+
+        if not self._con_carga():
+            return qs
+
+        try:
+            semanas = min(self.SEMANAS_MAX, max(1, int(params.get("semanas", self.SEMANAS_PROXIMAS))))
+        except ValueError:
+            semanas = self.SEMANAS_PROXIMAS
+        hoy = timezone.localdate()
+
+        # Una sola consulta: LEFT JOIN a clases_asignadas + GROUP BY profesional
+        qs = qs.annotate(
+            carga_activa=Count(
+                "clases_asignadas",
+                filter=Q(clases_asignadas__estado__in=self.ESTADOS_ACTIVOS),
+            ),
+            clases_proximas=Count(
+                "clases_asignadas",
+                filter=Q(
+                    clases_asignadas__fecha_solicitada__gte=hoy,
+                    clases_asignadas__fecha_solicitada__lt=hoy + timedelta(weeks=semanas),
+                )
+                & ~Q(clases_asignadas__estado__in=["RECHAZADA", "COMPLETADA"]),
+            ),
+        )
+
+        if params.get("ordering") == "-carga":
+            return qs.order_by("-carga_activa", "-clases_proximas", "user__username")
+        # Por defecto, los menos cargados primero
+        return qs.order_by("carga_activa", "clases_proximas", "user__username")
 
     def get_serializer_class(self):
         # Crear profesional (admin)
@@ -101,30 +239,24 @@ class ProfesionalViewSet(viewsets.ModelViewSet):
         # Perfil del propio profesional
         if self.action == "me":
             return ProfesionalDetalleSerializer
+        # Listado con carga de trabajo
+        if self._con_carga():
+            return ProfesionalCargaSerializer
         # Listado / detalle general
         return ProfesionalSerializer
 
-    @action(
-        detail=False,
-        methods=["get", "patch"],
-        url_path="me",
-        permission_classes=[permissions.IsAuthenticated],
-    )
+    @idempotente
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    @action(detail=False, methods=["get", "patch"], url_path="me")
     def me(self, request):
         """
         GET  /api/profesionales/me/   -> ver mis datos
         PATCH /api/profesionales/me/  -> actualizar mis datos
+        Solo PROFESIONAL o ADMIN (ver api/permissions.py).
         """
-        # ¿Tiene perfil de usuario?
-        profile = getattr(request.user, "profile", None)
-        rol = getattr(profile, "rol", None)
-
-        # Si no es profesional, no hay nada que hacer aquí
-        if rol != "PROFESIONAL" and not request.user.is_staff:
-            return Response(
-                {"detail": "Tu usuario no tiene un perfil de profesional asociado."},
-                status=status.HTTP_404_NOT_FOUND,
-            )
+        rol = rol_de(request)
 
         # Intentar obtener el Profesional existente
         try:
@@ -133,7 +265,7 @@ class ProfesionalViewSet(viewsets.ModelViewSet):
             ).get(user=request.user)
         except Profesional.DoesNotExist:
             # Si el rol es PROFESIONAL pero aún no hay registro, lo creamos
-            if rol == "PROFESIONAL":
+            if rol == PROFESIONAL:
                 profesional = Profesional.objects.create(
                     user=request.user,
                     especialidad="",
@@ -158,6 +290,48 @@ class ProfesionalViewSet(viewsets.ModelViewSet):
         serializer.save()
         return Response(serializer.data)
 
+    @action(detail=False, methods=["post"], url_path="bulk")
+    @idempotente
+    def bulk(self, request):
+        """
+        POST /api/profesionales/bulk/
+        Alta masiva de profesionales. Acepta:
+        - JSON: [ {...}, {...} ]  o  { "profesionales": [ ... ] }
+        - multipart con un CSV en el campo "archivo"
+        ?parcial=1 crea las filas válidas aunque otras tengan errores.
+        """
+        archivo = request.FILES.get("archivo")
+        if archivo is not None:
+            try:
+                filas = leer_csv(archivo)
+            except ValueError as exc:
+                return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        elif isinstance(request.data, list):
+            filas = request.data
+        else:
+            filas = request.data.get("profesionales")
+
+        if not isinstance(filas, list) or not filas:
+            return Response(
+                {"detail": "Debes enviar una lista de profesionales o un archivo CSV."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        parcial = request.query_params.get("parcial") in ("1", "true", "True")
+        creados, errores = provisionar_profesionales(filas, parcial=parcial)
+
+        data = {
+            "creados": len(creados),
+            "profesionales": [
+                {"profesional_id": p.pk, "profesional_username": p.user.username}
+                for p in creados
+            ],
+            "errores": errores,
+        }
+        if errores and not creados:
+            return Response(data, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data, status=status.HTTP_201_CREATED)
+
     def destroy(self, request, *args, **kwargs):
         """
         DELETE /api/profesionales/{id}/
@@ -167,17 +341,6 @@ class ProfesionalViewSet(viewsets.ModelViewSet):
         profesional = self.get_object()
         user = profesional.user
 
-        profile = getattr(request.user, "profile", None)
-        es_admin = request.user.is_staff or (
-            profile is not None and getattr(profile, "rol", None) == "ADMIN"
-        )
-
-        if not es_admin:
-            return Response(
-                {"detail": "No tienes permiso para eliminar profesionales."},
-                status=status.HTTP_403_FORBIDDEN,
-            )
-
         # Primero borramos el Profesional (para que DRF sea feliz)
         response = super().destroy(request, *args, **kwargs)
         # Luego borramos el usuario asociado
@@ -186,9 +349,14 @@ class ProfesionalViewSet(viewsets.ModelViewSet):
 
 
 
-class ClaseViewSet(viewsets.ModelViewSet):
+class ClaseViewSet(StreamingListMixin, CacheRespuestasMixin, viewsets.ModelViewSet):
     serializer_class = ClaseSerializer
-    permission_classes = [permissions.AllowAny]
+    recurso = "clases"
+    permission_classes = [PermisoPorRol]
+    # ?formato=columnar: strings repetidos en miles de filas (ver ColumnarRenderer)
+    columnas_diccionario = (
+        "estado", "modalidad", "cliente_nombre", "profesional_nombre", "solicitante_nombre",
+    )
 
     def get_queryset(self):
         """
@@ -196,10 +364,10 @@ class ClaseViewSet(viewsets.ModelViewSet):
         - ?cliente_id=<id>
         - ?profesional_id=<id>
         - ?estado=<ESTADO>
+        CLIENTE solo ve las clases de sus empresas y PROFESIONAL
+        solo las que tiene asignadas.
         """
-        qs = Clase.objects.select_related(
-            "cliente", "solicitada_por", "profesional_asignado"
-        )
+        qs = filtrar_por_rol(Clase.objects.all(), self.request, self.recurso)
 
         cliente_id = self.request.query_params.get("cliente_id")
         profesional_id = self.request.query_params.get("profesional_id")
@@ -216,18 +384,110 @@ class ClaseViewSet(viewsets.ModelViewSet):
 
         return qs
 
+    @idempotente
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
-        # Más adelante, cuando haya autenticación, aquí usaremos self.request.user
-        return serializer.save()
+        if rol_de(self.request) == CLIENTE:
+            # Un cliente solo puede solicitar clases para sus propias empresas
+            cliente = serializer.validated_data["cliente"]
+            if cliente.usuario_id != self.request.user.id:
+                raise exceptions.PermissionDenied(
+                    "No puedes solicitar clases para este cliente."
+                )
+            # La solicitud entra pendiente y sin asignar, a su nombre
+            with actuando_como(self.request.user):
+                return serializer.save(
+                    solicitada_por=self.request.user,
+                    estado=Clase._meta.get_field("estado").default,
+                    profesional_asignado=None,
+                )
+        with actuando_como(self.request.user):
+            return serializer.save()
+
+    def perform_update(self, serializer):
+        validar_campos(serializer, self.request, self.recurso)
+        # El historial (ClaseEvento) registra quién cambió el estado
+        with actuando_como(self.request.user):
+            serializer.save()
+
+    @action(detail=True, methods=["get"], url_path="historial")
+    def historial(self, request, pk=None):
+        """
+        GET /api/clases/<id>/historial/
+        Cambios de estado de la clase, del más antiguo al más reciente.
+        Con el historial diferido, un cambio recién hecho aparece tras
+        HISTORIAL_INTERVALO_MS (ver api/historial.py).
+        """
+        clase = self.get_object()
+        eventos = (
+            ClaseEvento.objects.filter(clase_id=clase.pk)
+            .select_related("actor")
+            .order_by("ts", "id")
+        )
+        return Response(ClaseEventoSerializer(eventos, many=True).data)
+
+    @action(detail=False, methods=["get"], url_path="eventos")
+    def eventos(self, request):
+        """
+        GET /api/clases/eventos/?desde=<fecha>&hasta=<fecha>&estado=<ESTADO>
+        Eventos de todas las clases en un rango de tiempo (solo ADMIN),
+        paginados por cursor (?limite=N, máx. 1000; seguir el link "next").
+        """
+        qs = ClaseEvento.objects.select_related("actor")
+        desde = self._fecha_param("desde")
+        hasta = self._fecha_param("hasta")
+        if desde:
+            qs = qs.filter(ts__gte=desde)
+        if hasta:
+            qs = qs.filter(ts__lt=hasta)
+        estado = request.query_params.get("estado")
+        if estado:
+            qs = qs.filter(estado_nuevo=estado)
+
+        paginador = PaginacionCursorEventos()
+        pagina = paginador.paginate_queryset(qs, request, view=self)
+        return paginador.get_paginated_response(
+            ClaseEventoSerializer(pagina, many=True).data
+        )
+
+    def _fecha_param(self, nombre):
+        valor = self.request.query_params.get(nombre)
+        if not valor:
+            return None
+        invalida = exceptions.ValidationError(
+            {nombre: "Fecha inválida (usar AAAA-MM-DD o ISO 8601)."}
+        )
+        # parse_* devuelven None si no calza el formato y lanzan ValueError
+        # si calza pero la fecha no existe (ej. 2024-02-30)
+        try:
+            fecha = parse_datetime(valor)
+            if fecha is None:
+                dia = parse_date(valor)
+                if dia is None:
+                    raise invalida
+                fecha = datetime.combine(dia, datetime.min.time())
+        except ValueError:
+            raise invalida
+        if timezone.is_naive(fecha):
+            fecha = timezone.make_aware(fecha)
+        return fecha
     
-class MeView(APIView):
+class MeView(CacheRespuestasMixin, APIView):
     """
     Devuelve la info del usuario autenticado + su perfil.
     GET /api/auth/me/
     """
     permission_classes = [permissions.IsAuthenticated]
+    # Caché de respuestas: depende de User/UserProfile, una entrada por usuario
+    recurso = "usuarios"
+    cache_por_usuario = True
 
     def get(self, request):
+        return self._respuesta_cacheada(self._me, request)
+
+    def _me(self, request):
         serializer = UserSerializer(request.user)
         return Response(serializer.data)
 
@@ -239,7 +499,14 @@ class RegistroClienteView(APIView):
     """
     permission_classes = [permissions.AllowAny]
 
+    @idempotente
     def post(self, request):
+        if not obtener_config().permitir_registro_publico_clientes:
+            return Response(
+                {"detail": "El registro público de clientes está deshabilitado."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
         serializer = RegistroClienteSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
@@ -253,21 +520,97 @@ class ConfigView(generics.RetrieveUpdateAPIView):
     - GET /api/config/  -> obtiene la configuración
     - PUT /api/config/  -> actualiza todo
     - PATCH /api/config/ -> actualiza campos puntuales
-    Solo ADMIN (is_staff) puede editar. Otros podrían ser solo lectura si quisieras.
+    Solo ADMIN puede editar; CLIENTE y PROFESIONAL solo pueden leer.
     """
 
     serializer_class = SystemConfigSerializer
+    recurso = "config"
+    # GET: cualquier usuario autenticado. PUT/PATCH: solo admin.
+    permission_classes = [PermisoPorRol]
 
     def get_object(self):
         # Siempre devolvemos el único registro de configuración.
+        if self.request.method in permissions.SAFE_METHODS:
+            return obtener_config()
+        # Para editar, la fila fresca de la BD (el memo se invalida al guardar)
         config, _ = SystemConfig.objects.get_or_create(id=1)
         return config
 
-    def get_permissions(self):
-        # GET: cualquier usuario autenticado puede leer (si quieres)
-        # PUT/PATCH: solo admin
-        if self.request.method in ["PUT", "PATCH"]:
-            return [permissions.IsAdminUser()]
-        return [permissions.IsAuthenticated()]
+
+class MetricasView(APIView):
+    """
+    Métricas de requests (todos los workers) en formato Prometheus.
+    GET /api/metrics/  -> solo ADMIN (alias: /api/metricas/)
+    """
+    recurso = "metricas"
+    permission_classes = [PermisoPorRol]
+
+    def get(self, request):
+        return HttpResponse(
+            formato_prometheus(leer_metricas()),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
+
+class BatchView(APIView):
+    """
+    Varios requests de la API en un solo viaje (ver api/batch.py).
+    POST /api/batch/
+    Body: {
+      "requests": [{"method": "PATCH", "path": "/api/clases/3/", "body": {...}},
+                   {"method": "GET", "path": "/api/clases/"}],
+      "transaccion": false
+    }
+    Respuesta: {"results": [{"status": 200, "body": ...}, ...], "revertido": false}
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        datos = request.data
+        if isinstance(datos, list):
+            operaciones, en_transaccion = datos, False
+        else:
+            operaciones = datos.get("requests")
+            en_transaccion = bool(datos.get("transaccion", False))
+
+        try:
+            operaciones = batch.validar(operaciones)
+        except batch.ErrorBatch as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        resultados, revertido = batch.ejecutar(request, operaciones, en_transaccion)
+        return Response({"results": resultados, "revertido": revertido})
+
+
+class DashboardView(CacheRespuestasMixin, APIView):
+    """
+    Todo lo que necesita la página inicial de un rol en una respuesta
+    (ver api/dashboard.py). Cacheado por usuario.
+    """
+    permission_classes = [PermisoPorRol]
+    cache_por_usuario = True
+    rol = None
+
+    def get(self, request):
+        return self._respuesta_cacheada(self._armar, request)
+
+    def _armar(self, request):
+        return Response(dashboard.armar(request, self.rol))
+
+
+class DashboardAdminView(DashboardView):
+    """GET /api/dashboard/admin/"""
+    recurso = "dashboard_admin"
+    rol = ADMIN
+
+
+class DashboardProfesionalView(DashboardView):
+    """GET /api/dashboard/profesional/"""
+    recurso = "dashboard_profesional"
+    rol = PROFESIONAL
 
 
+class DashboardClienteView(DashboardView):
+    """GET /api/dashboard/cliente/"""
+    recurso = "dashboard_cliente"
+    rol = CLIENTE
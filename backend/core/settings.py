@@ -10,27 +10,16 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+import tempfile
 from pathlib import Path
 
 from dotenv import load_dotenv
 import dj_database_url
 
-from django.contrib.auth import get_user_model
-
+# Importar settings no debe tocar la BD: los datos iniciales (usuarios admin,
+# configuración) se crean con `python manage.py bootstrap` en cada deploy.
 load_dotenv()
 
-try:
-    User = get_user_model()
-    if not User.objects.filter(username="admin").exists():
-        User.objects.create_superuser(
-            username="admin",
-            email="admin@example.com",
-            password="admin",
-        )
-except Exception:
-    # Puede fallar durante migraciones iniciales; lo ignoramos
-    pass
-
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -65,13 +54,22 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # GET a réplicas, escrituras a la primaria (ver api/replicas.py)
+    'api.replicas.ReplicasMiddleware',
+    # Latencia/status por ruta, compartido entre workers (ver api/metricas.py)
+    'api.metricas.MetricasMiddleware',
+    # Server-Timing + log muestreado + SQL lento (ver api/instrumentacion.py)
+    'api.instrumentacion.InstrumentacionMiddleware',
     'corsheaders.middleware.CorsMiddleware',           # CORS SIEMPRE ARRIBA (antes de CommonMiddleware)
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    # SessionMiddleware que no toca la sesión con JWT (ver api/sesiones.py)
+    'api.sesiones.SesionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Debe ir al final: ejecuta la vista (solo activo con SQLITE_PRODUCCION)
+    'api.sqlite.ReintentoEscrituraSQLiteMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -105,6 +103,50 @@ DATABASES = {
     )
 }
 
+# Perfil de producción para sitios que corren sobre SQLite (ver api/sqlite.py):
+# WAL + PRAGMAs por conexión, BEGIN IMMEDIATE y reintento de escrituras
+# bloqueadas. No tiene efecto si la BD no es SQLite.
+SQLITE_PRODUCCION = os.getenv("DJANGO_SQLITE_PRODUCCION", "False") == "True"
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "mmap_size": 128 * 1024 * 1024,
+    "cache_size": -32000,  # en KiB (negativo) -> ~32 MB
+    "temp_store": "MEMORY",
+}
+
+SQLITE_REINTENTOS_ESCRITURA = 3
+
+if SQLITE_PRODUCCION and DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    DATABASES["default"].setdefault("OPTIONS", {}).update({
+        # El lock de escritura se pide al abrir la transacción, no a mitad
+        "transaction_mode": "IMMEDIATE",
+        "timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000,
+    })
+
+# Réplicas de solo lectura (ver api/replicas.py): URLs separadas por coma,
+# cada una queda como alias replica_1, replica_2, ... Los GET leen de una
+# réplica; las escrituras y los requests de un cliente que escribió hace
+# menos de REPLICAS_VENTANA_SEGUNDOS van a la primaria.
+DATABASE_REPLICAS = []
+for _i, _url in enumerate(
+    (u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()),
+    start=1,
+):
+    _alias = f"replica_{_i}"
+    DATABASES[_alias] = dj_database_url.parse(_url, conn_max_age=600, ssl_require=False)
+    # En tests las réplicas apuntan a la BD de prueba de la primaria
+    DATABASES[_alias]["TEST"] = {"MIRROR": "default"}
+    if SQLITE_PRODUCCION and DATABASES[_alias]["ENGINE"] == "django.db.backends.sqlite3":
+        DATABASES[_alias].setdefault("OPTIONS", {})["timeout"] = SQLITE_PRAGMAS["busy_timeout"] / 1000
+    DATABASE_REPLICAS.append(_alias)
+
+DATABASE_ROUTERS = ["api.replicas.RouterReplicas"]
+REPLICAS_VENTANA_SEGUNDOS = int(os.getenv("REPLICAS_VENTANA_SEGUNDOS", "5"))
+REPLICAS_CACHE_ALIAS = "default"
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -151,6 +193,106 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # CORS (de momento abierto, luego lo afinamos con dominios de frontend)
 CORS_ALLOW_ALL_ORIGINS = True  # Para desarrollo
+# Idempotency-Key: los clientes web reintentan POST con este header
+from corsheaders.defaults import default_headers  # noqa: E402
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
+
+# Métricas por ruta: un archivo mmap por worker. Vaciar al reiniciar el servicio.
+METRICAS_DIR = os.getenv("METRICAS_DIR", os.path.join(tempfile.gettempdir(), "nma_metricas"))
+
+# Instrumentación por request (ver api/instrumentacion.py)
+INSTRUMENTACION_ACTIVA = os.getenv("DJANGO_INSTRUMENTACION", "True") == "True"
+# Fracción de requests que se registran en el logger "api.rendimiento"
+INSTRUMENTACION_MUESTREO = float(os.getenv("INSTRUMENTACION_MUESTREO", "0.01"))
+# Consultas más lentas que esto van al logger "api.sql_lento"
+SQL_LENTO_UMBRAL_MS = float(os.getenv("SQL_LENTO_UMBRAL_MS", "200"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "api.rendimiento": {"handlers": ["console"], "level": "INFO", "propagate": False},
+        "api.sql_lento": {"handlers": ["console"], "level": "WARNING", "propagate": False},
+        "api.trabajos": {"handlers": ["console"], "level": "INFO", "propagate": False},
+        "api.historial": {"handlers": ["console"], "level": "WARNING", "propagate": False},
+        "api.cache": {"handlers": ["console"], "level": "WARNING", "propagate": False},
+    },
+}
+
+# Cada cuántos segundos un worker comprueba si SystemConfig cambió en otro
+# proceso (ver api/config.py). Los cambios hechos por el propio worker se
+# ven al instante.
+SYSTEM_CONFIG_REVALIDAR_SEGUNDOS = int(os.getenv("SYSTEM_CONFIG_REVALIDAR_SEGUNDOS", "5"))
+
+# Caché de Django. Por defecto memoria local (propia de cada worker).
+# Para compartirla entre los workers del host sin Redis:
+# - DJANGO_CACHE_BACKEND=compartida: archivo mapeado en memoria (/dev/shm),
+#   ver api/cache_compartida.py
+# - DJANGO_CACHE_BACKEND=archivo: FileBasedCache de Django (un archivo por clave)
+DJANGO_CACHE_BACKEND = os.getenv("DJANGO_CACHE_BACKEND", "locmem")
+if DJANGO_CACHE_BACKEND == "compartida":
+    CACHES = {
+        "default": {
+            "BACKEND": "api.cache_compartida.CacheMemoriaCompartida",
+            "LOCATION": os.getenv(
+                "DJANGO_CACHE_DIR",
+                os.path.join(
+                    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+                    "nma_cache",
+                ),
+            ),
+            "OPTIONS": {
+                "SLOTS": int(os.getenv("DJANGO_CACHE_SLOTS", "4096")),
+                # Valores más grandes se guardan comprimidos; si aun así no
+                # caben se descartan y se cuentan (ver api/cache_compartida.py)
+                "TAMANO_SLOT": int(os.getenv("DJANGO_CACHE_TAMANO_SLOT", "65536")),
+                "VIAS": 8,
+            },
+        }
+    }
+elif DJANGO_CACHE_BACKEND == "archivo":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv(
+                "DJANGO_CACHE_DIR",
+                os.path.join(tempfile.gettempdir(), "nma_cache"),
+            ),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Sesiones: solo las usan el admin y la API navegable (los requests con JWT
+# no las tocan, ver api/sesiones.py). DJANGO_SESSION_ENGINE:
+# - db: tabla django_session (purgar con `manage.py purgar_sesiones`)
+# - cache: solo en la caché (usar con DJANGO_CACHE_BACKEND=compartida o archivo,
+#   con memoria local cada worker tendría sus propias sesiones)
+# - cached_db: caché con respaldo en la BD
+# - firmada: cookie firmada con SECRET_KEY, sin estado en el servidor
+MOTORES_SESION = {
+    "db": "django.contrib.sessions.backends.db",
+    "cache": "django.contrib.sessions.backends.cache",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "firmada": "django.contrib.sessions.backends.signed_cookies",
+}
+SESSION_ENGINE = MOTORES_SESION[os.getenv("DJANGO_SESSION_ENGINE", "db")]
+SESSION_CACHE_ALIAS = "default"
+
+# Caché de respuestas de list/retrieve (ver api/cache_respuestas.py).
+# Con memoria local las invalidaciones no llegan a los otros workers, así
+# que el TTL efectivo baja a CACHE_RESPUESTAS_TTL_LOCAL.
+CACHE_RESPUESTAS_ACTIVA = os.getenv("DJANGO_CACHE_RESPUESTAS", "True") == "True"
+CACHE_RESPUESTAS_ALIAS = "default"
+CACHE_RESPUESTAS_TTL = int(os.getenv("CACHE_RESPUESTAS_TTL", "300"))
+CACHE_RESPUESTAS_TTL_LOCAL = int(os.getenv("CACHE_RESPUESTAS_TTL_LOCAL", "5"))
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
@@ -160,6 +302,67 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.AllowAny",
     ),
+    # JSON con orjson si está instalado (ver api/renderers.py)
+    "DEFAULT_RENDERER_CLASSES": (
+        "api.renderers.JSONRendererRapido",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+        # Accept: application/x-ndjson (ver api/streaming.py)
+        "api.renderers.NDJSONRenderer",
+        # Listados en columnas: ?formato=columnar (ver api/renderers.py)
+        "api.renderers.ColumnarRenderer",
+    ),
+    "DEFAULT_CONTENT_NEGOTIATION_CLASS": "api.renderers.NegociacionConFormato",
+    "DEFAULT_PARSER_CLASSES": (
+        "api.parsers.JSONParserRapido",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
+    # Token bucket por ruta y usuario/IP (ver api/throttling.py y LIMITES_TASA)
+    "DEFAULT_THROTTLE_CLASSES": (
+        "api.throttling.TokenBucketThrottle",
+    ),
+    # Cantidad de proxies delante de Django: la IP real se toma de
+    # X-Forwarded-For. Sin proxies (None) se usa REMOTE_ADDR.
+    "NUM_PROXIES": int(os.environ["DJANGO_NUM_PROXIES"]) if os.getenv("DJANGO_NUM_PROXIES") else None,
+}
+
+# Cola de trabajos en la BD (ver api/trabajos.py y `manage.py run_worker`)
+TRABAJOS_MODULOS = ["api.tareas"]
+TRABAJOS_TIMEOUT_SEGUNDOS = int(os.getenv("TRABAJOS_TIMEOUT_SEGUNDOS", "600"))
+TRABAJOS_BACKOFF_SEGUNDOS = int(os.getenv("TRABAJOS_BACKOFF_SEGUNDOS", "10"))
+
+# Historial de estados de clases (ver api/historial.py). Por defecto cada
+# evento se inserta en la misma transacción que el cambio de estado: si el
+# cambio se confirmó, su evento también. Con True se insertan en lote desde
+# un hilo cada HISTORIAL_INTERVALO_MS (el request no paga el INSERT), pero
+# un SIGKILL o el timeout de un worker pierden los eventos del buffer.
+HISTORIAL_DIFERIDO = os.getenv("DJANGO_HISTORIAL_DIFERIDO", "False") == "True"
+HISTORIAL_INTERVALO_MS = int(os.getenv("HISTORIAL_INTERVALO_MS", "200"))
+HISTORIAL_LOTE = 500
+# Reintentos de un evento antes de descartarlo al log, y tope del buffer
+HISTORIAL_MAX_INTENTOS = int(os.getenv("HISTORIAL_MAX_INTENTOS", "10"))
+HISTORIAL_MAX_PENDIENTES = int(os.getenv("HISTORIAL_MAX_PENDIENTES", "50000"))
+
+# Idempotency-Key en POST (ver api/idempotencia.py). Conviene una caché
+# compartida para que los reintentos que caen en otro worker se detecten.
+IDEMPOTENCIA_CACHE_ALIAS = "default"
+IDEMPOTENCIA_TTL_SEGUNDOS = int(os.getenv("IDEMPOTENCIA_TTL_SEGUNDOS", "86400"))
+IDEMPOTENCIA_ESPERA_SEGUNDOS = 30
+
+# POST /api/batch/ (ver api/batch.py)
+BATCH_MAXIMO = 50
+BATCH_HILOS = int(os.getenv("BATCH_HILOS", "4"))
+
+# Rate limiting: alcance -> (tasa de recarga, ráfaga máxima).
+# El alcance es el `recurso` de la vista o el nombre de la URL.
+THROTTLE_ACTIVO = os.getenv("DJANGO_THROTTLE", "True") == "True"
+THROTTLE_CACHE_ALIAS = "default"
+LIMITES_TASA = {
+    "token_obtain_pair": ("10/min", 5),
+    "token_refresh": ("30/min", 10),
+    "registro_cliente": ("10/h", 3),
+    "clientes": ("300/min", 60),
+    "clases": ("300/min", 60),
 }
 
 
@@ -34,6 +34,22 @@ urlpatterns = [
     # Configuración del sistema
     path("api/config/", views.ConfigView.as_view(), name="system_config"),
 
+    # Datos de arranque de cada página, por rol
+    path("api/dashboard/admin/", views.DashboardAdminView.as_view(), name="dashboard_admin"),
+    path(
+        "api/dashboard/profesional/",
+        views.DashboardProfesionalView.as_view(),
+        name="dashboard_profesional",
+    ),
+    path("api/dashboard/cliente/", views.DashboardClienteView.as_view(), name="dashboard_cliente"),
+
+    # Varios requests en un solo viaje
+    path("api/batch/", views.BatchView.as_view(), name="batch"),
+
+    # Métricas (Prometheus). /api/metricas/ queda como alias
+    path("api/metrics/", views.MetricasView.as_view(), name="metricas"),
+    path("api/metricas/", views.MetricasView.as_view(), name="metricas"),
+
     # Rutas del router (usuarios, clientes, profesionales, clases)
     path("api/", include(router.urls)),
 ]
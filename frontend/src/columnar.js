@@ -0,0 +1,16 @@
+// Respuestas en formato columnar de la API (ver ColumnarRenderer en el backend).
+// { columnas, filas, diccionarios } -> lista de objetos como la de siempre.
+export const COLUMNAR = "application/vnd.nma.columnar+json";
+
+export function desdeColumnar({ columnas, filas, diccionarios }) {
+  const valores = columnas.map((c) => diccionarios[c]);
+  return filas.map((fila) => {
+    const obj = {};
+    for (let i = 0; i < columnas.length; i++) {
+      const dic = valores[i];
+      const v = fila[i];
+      obj[columnas[i]] = dic && v !== null ? dic[v] : v;
+    }
+    return obj;
+  });
+}
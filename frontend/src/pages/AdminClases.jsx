@@ -1,4 +1,5 @@
 import { useEffect, useState } from "react";
+import { COLUMNAR, desdeColumnar } from "../columnar";
 
 const API_URL = import.meta.env.VITE_API_URL;
 
@@ -25,6 +26,8 @@ function AdminClases() {
       const res = await fetch(`${API_URL}/api/clases/`, {
         headers: {
           Authorization: token ? `Bearer ${token}` : "",
+          // Nombres de campos y de clientes/profesionales una sola vez
+          Accept: COLUMNAR,
         },
       });
 
@@ -34,8 +37,7 @@ function AdminClases() {
         return;
       }
 
-      const data = await res.json();
-      setClases(data);
+      setClases(desdeColumnar(await res.json()));
     } catch (error) {
       console.error(error);
       setMensaje("Error al cargar las clases.");
@@ -50,13 +52,19 @@ function AdminClases() {
 
   async function actualizarClase(id, payload) {
     try {
-      const res = await fetch(`${API_URL}/api/clases/${id}/`, {
-        method: "PATCH",
+      // PATCH + recarga del listado en un solo viaje (POST /api/batch/)
+      const res = await fetch(`${API_URL}/api/batch/`, {
+        method: "POST",
         headers: {
           "Content-Type": "application/json",
           Authorization: token ? `Bearer ${token}` : "",
         },
-        body: JSON.stringify(payload),
+        body: JSON.stringify({
+          requests: [
+            { method: "PATCH", path: `/api/clases/${id}/`, body: payload },
+            { method: "GET", path: "/api/clases/" },
+          ],
+        }),
       });
 
       if (!res.ok) {
@@ -65,8 +73,19 @@ function AdminClases() {
         return;
       }
 
+      const [patch, listado] = (await res.json()).results;
+      if (patch.status >= 400) {
+        console.error("Error actualizando clase:", patch.body);
+        setMensaje("No se pudo actualizar la clase.");
+        return;
+      }
+
       setMensaje("Clase actualizada correctamente.");
-      cargarClases();
+      if (listado.status === 200) {
+        setClases(listado.body);
+      } else {
+        cargarClases();
+      }
     } catch (error) {
       console.error(error);
       setMensaje("Error al actualizar la clase.");
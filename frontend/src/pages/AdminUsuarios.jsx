@@ -1,6 +1,7 @@
 import { useEffect, useState } from "react";
 
 const API_URL = import.meta.env.VITE_API_URL;
+const TAMANO_PAGINA = 50;
 
 function AdminUsuarios() {
   const [usuarios, setUsuarios] = useState([]);
@@ -10,6 +11,12 @@ function AdminUsuarios() {
   const [modo, setModo] = useState("lista"); // lista | editar
   const [userActual, setUserActual] = useState(null);
 
+  // Búsqueda y paginación (las resuelve el backend)
+  const [busqueda, setBusqueda] = useState("");
+  const [filtroRol, setFiltroRol] = useState("");
+  const [pagina, setPagina] = useState(1);
+  const [totalUsuarios, setTotalUsuarios] = useState(0);
+
   const token = localStorage.getItem("token");
 
   // ======================
@@ -21,7 +28,14 @@ function AdminUsuarios() {
     setDetalleError("");
 
     try {
-      const res = await fetch(`${API_URL}/api/usuarios/`, {
+      const params = new URLSearchParams({
+        page: String(pagina),
+        page_size: String(TAMANO_PAGINA),
+      });
+      if (busqueda.trim()) params.set("search", busqueda.trim());
+      if (filtroRol) params.set("rol", filtroRol);
+
+      const res = await fetch(`${API_URL}/api/usuarios/?${params}`, {
         headers: {
           Authorization: token ? `Bearer ${token}` : "",
         },
@@ -34,7 +48,8 @@ function AdminUsuarios() {
       }
 
       const data = await res.json();
-      setUsuarios(data);
+      setUsuarios(data.results);
+      setTotalUsuarios(data.count);
     } catch (error) {
       console.error(error);
       setMensaje("Error al cargar los usuarios.");
@@ -46,7 +61,18 @@ function AdminUsuarios() {
   useEffect(() => {
     cargarUsuarios();
     // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, []);
+  }, [pagina, filtroRol]);
+
+  function handleBuscar(e) {
+    e.preventDefault();
+    if (pagina === 1) {
+      cargarUsuarios();
+    } else {
+      setPagina(1);
+    }
+  }
+
+  const totalPaginas = Math.max(1, Math.ceil(totalUsuarios / TAMANO_PAGINA));
 
   // ======================
   // Form editar
@@ -263,8 +289,31 @@ function AdminUsuarios() {
           marginTop: "0.5rem",
           display: "flex",
           justifyContent: "flex-end",
+          gap: "0.5rem",
         }}
       >
+        <form onSubmit={handleBuscar} style={{ display: "flex", gap: "0.5rem" }}>
+          <input
+            value={busqueda}
+            onChange={(e) => setBusqueda(e.target.value)}
+            placeholder="Buscar por usuario, nombre, correo o RUT"
+          />
+          <button className="btn-secundario" type="submit">
+            Buscar
+          </button>
+        </form>
+        <select
+          value={filtroRol}
+          onChange={(e) => {
+            setFiltroRol(e.target.value);
+            setPagina(1);
+          }}
+        >
+          <option value="">Todos los roles</option>
+          <option value="ADMIN">Administrador</option>
+          <option value="PROFESIONAL">Profesional</option>
+          <option value="CLIENTE">Cliente / Usuario</option>
+        </select>
         <button
           className="btn-secundario"
           type="button"
@@ -514,6 +563,36 @@ function AdminUsuarios() {
               </table>
             </div>
           )}
+
+          <div
+            style={{
+              marginTop: "0.6rem",
+              display: "flex",
+              alignItems: "center",
+              gap: "0.6rem",
+              fontSize: "0.9rem",
+            }}
+          >
+            <button
+              className="btn-secundario"
+              type="button"
+              disabled={pagina <= 1}
+              onClick={() => setPagina(pagina - 1)}
+            >
+              Anterior
+            </button>
+            <span>
+              Página {pagina} de {totalPaginas} ({totalUsuarios} usuarios)
+            </span>
+            <button
+              className="btn-secundario"
+              type="button"
+              disabled={pagina >= totalPaginas}
+              onClick={() => setPagina(pagina + 1)}
+            >
+              Siguiente
+            </button>
+          </div>
         </>
       )}
     </div>
@@ -9,11 +9,17 @@ function ClasesCliente() {
   const [loading, setLoading] = useState(false);
   const [mensajeError, setMensajeError] = useState("");
 
+  const token = localStorage.getItem("token");
+
   // Cargar clientes al inicio
   useEffect(() => {
     async function fetchClientes() {
       try {
-        const res = await fetch(`${API_URL}/api/clientes/`);
+        const res = await fetch(`${API_URL}/api/clientes/`, {
+          headers: {
+            Authorization: token ? `Bearer ${token}` : "",
+          },
+        });
         if (!res.ok) {
           throw new Error("No se pudo cargar la lista de clientes");
         }
@@ -46,7 +52,12 @@ function ClasesCliente() {
 
       try {
         const res = await fetch(
-          `${API_URL}/api/clases/?cliente_id=${clienteSeleccionado}`
+          `${API_URL}/api/clases/?cliente_id=${clienteSeleccionado}`,
+          {
+            headers: {
+              Authorization: token ? `Bearer ${token}` : "",
+            },
+          }
         );
         if (!res.ok) {
           throw new Error("No se pudo cargar la lista de clases");